@@ -2,21 +2,35 @@
 # Incorporates System Design
 
 import requests
+import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup
 import datetime
 import os
 import logging
 import tweepy
-from io import BytesIO
-from PIL import Image
-import pytesseract
-from selenium import webdriver
+from selenium.common.exceptions import TimeoutException as SeleniumTimeoutException
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
 import time
+import threading
 import json  # Import the json module
+from kariba_store import open_kariba_store
+from location_index import LocationIndex, normalize_location
+from hotspots import OutageClusterDetector
+from subscribers import SubscriberRegistry
+from sms_outbox import SmsOutbox
+from prediction_cache import PredictionCache
+from browser_pool import BrowserSessionPool
+from generation_sources import GenerationSource, GenerationSourceManager
+from generation_parser import parse_generation_data
+from ocr_pipeline import OcrPipeline
+from outage_model import context_features, load_outage_model
+from kariba_stats import KaribaTrendStats, slope_over
+from forecast import ForecastRefresher, build_forecast_table
+from metrics import stage, upstream
+from log_config import configure_logging
+from zra_client import FETCHED, ZraClient
 from concurrent.futures import ThreadPoolExecutor, TimeoutError  # For better performance
 
 
@@ -26,15 +40,14 @@ from concurrent.futures import ThreadPoolExecutor, TimeoutError  # For better pe
 # from infobip_sdk.api_client import ApiClient
 
 
-# Logging setup
-logging.basicConfig(
-    filename="power_prediction.log",
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
+# Logging is configured once by the entry point (see log_config)
 logger = logging.getLogger(__name__)
 
 
+# Fault note of locations.txt entries that have none
+NO_FAULT_INFORMATION = "No fault information available"
+
+
 # Your Twitter API credentials (Make sure you have these set up as environment variables!)
 consumer_key = os.environ.get("TWITTER_CONSUMER_KEY")
 consumer_secret = os.environ.get("TWITTER_CONSUMER_SECRET")
@@ -42,12 +55,38 @@ access_token = os.environ.get("TWITTER_ACCESS_TOKEN")
 access_token_secret = os.environ.get("TWITTER_ACCESS_TOKEN_SECRET")
 
 
+def default_generation_sources():
+    """
+    The generation sources used when GENERATION_SOURCES is not set: the
+    Twitter API and then the manual file when API credentials are configured,
+    otherwise the manual file alone (without credentials every API query
+    would only fail).
+    """
+    if all((consumer_key, consumer_secret, access_token, access_token_secret)):
+        return "api,manual"
+    return "manual"
+
+
+# Shared Twitter API client, created on first use so its connections are reused
+_twitter_api = None
+_twitter_api_lock = threading.Lock()
+
+
+def get_twitter_api():
+    """Returns the process-wide Twitter API client, creating it on first use."""
+    global _twitter_api
+    with _twitter_api_lock:
+        if _twitter_api is None:
+            auth = tweepy.OAuthHandler(consumer_key, consumer_secret)
+            auth.set_access_token(access_token, access_token_secret)
+            _twitter_api = tweepy.API(auth, timeout=10)  # Add timeout
+        return _twitter_api
+
+
 def get_latest_zpc_generation_tweet_text_api(twitter_handle="officialZPC"):
     """Fetches the latest tweet object from the specified Twitter handle using the API."""
     try:
-        auth = tweepy.OAuthHandler(consumer_key, consumer_secret)
-        auth.set_access_token(access_token, access_token_secret)
-        api = tweepy.API(auth, timeout=10)  # Add timeout
+        api = get_twitter_api()
         tweets = api.user_timeline(
             screen_name=twitter_handle, count=1, tweet_mode="extended"
         )
@@ -63,60 +102,143 @@ def get_latest_zpc_generation_tweet_text_api(twitter_handle="officialZPC"):
 
 
 
-def get_latest_zpc_generation_tweet_text_selenium(twitter_handle="officialZPC"):
+# Shared browser pool for the Selenium scraper, started on first use
+_browser_pool = None
+_browser_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """Returns the process-wide browser pool, creating it on first use."""
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is None:
+            _browser_pool = BrowserSessionPool(
+                size=int(os.environ.get("BROWSER_POOL_SIZE", "2")),
+                max_uses=int(os.environ.get("BROWSER_MAX_USES", "50")),
+            )
+        return _browser_pool
+
+
+def close_browser_pool():
+    """Quits every pooled browser."""
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is not None:
+            _browser_pool.close()
+            _browser_pool = None
+
+
+def get_latest_zpc_generation_tweet_text_selenium(
+    twitter_handle="officialZPC", base_url="https://twitter.com", wait_timeout=15
+):
     """Fetches the latest tweet text from the specified Twitter handle using Selenium."""
     try:
-        service = ChromeService(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service)
-        driver.set_page_load_timeout(15)  # Add timeout to page load
-        zpc_twitter_url = f"https://twitter.com/{twitter_handle}"
-        driver.get(zpc_twitter_url)
-        time.sleep(5)  # Wait for page to load
-        tweets = driver.find_elements(By.XPATH, "//article//div[@lang]")
-        for tweet in tweets:
-            text = tweet.text
-            if "MW" in text and (
-                "Kariba" in text or "Hwange" in text
-            ):  # Modified condition
-                logger.info("Latest Power Update Tweet Found via Selenium!")
-                driver.quit()
-                return text
-        driver.quit()
+        with get_browser_pool().session() as driver:
+            zpc_twitter_url = f"{base_url}/{twitter_handle}"
+            driver.get(zpc_twitter_url)
+            # Wait until tweets have rendered instead of sleeping a fixed time
+            WebDriverWait(driver, wait_timeout).until(
+                EC.presence_of_element_located((By.XPATH, "//article//div[@lang]"))
+            )
+            tweets = driver.find_elements(By.XPATH, "//article//div[@lang]")
+            for tweet in tweets:
+                text = tweet.text
+                if "MW" in text and (
+                    "Kariba" in text or "Hwange" in text
+                ):  # Modified condition
+                    logger.info("Latest Power Update Tweet Found via Selenium!")
+                    return text
+            return None
+    except SeleniumTimeoutException:
+        logger.warning("Timed out waiting for tweets to load via Selenium")
         return None
     except Exception as e:
         logger.error(f"Error fetching tweet text via Selenium: {e}")
-        if "driver" in locals():
-            driver.quit()
         return None
 
 
 
-def parse_generation_data(text):
-    """Parses the extracted text to find power generation figures."""
-    generation_data = {}
-    lines = text.split("\n")
-    for line in lines:
-        if "Hwange" in line:
-            parts = line.split()
-            for part in parts:
-                if "MW" in part:
-                    generation_data["Hwange"] = part.replace(",", "")  # Remove commas
-        elif "Kariba" in line:
-            parts = line.split()
-            for part in parts:
-                if "MW" in part:
-                    generation_data["Kariba"] = part.replace(",", "")  # Remove commas
-        elif "IPPS" in line or "IPPs" in line:
-            parts = line.split()
-            for part in parts:
-                if "MW" in part:
-                    generation_data["IPPS"] = part.replace(",", "")  # Remove commas
-        elif "TOTAL" in line:
-            parts = line.split()
-            for part in parts:
-                if "MW" in part:
-                    generation_data["TOTAL"] = part.replace(",", "")  # Remove commas
-    return generation_data
+# Shared OCR pipeline for image bulletins, started on first use
+_ocr_pipeline = None
+_ocr_pipeline_lock = threading.Lock()
+
+
+def get_ocr_pipeline():
+    """Returns the process-wide OCR pipeline, creating it on first use."""
+    global _ocr_pipeline
+    with _ocr_pipeline_lock:
+        if _ocr_pipeline is None:
+            _ocr_pipeline = OcrPipeline(
+                workers=int(os.environ.get("OCR_WORKERS", "2")),
+                cache_path=os.environ.get("OCR_CACHE_PATH", os.path.join("data", "ocr_cache.jsonl")),
+                timeout=float(os.environ.get("OCR_TIMEOUT", "60")),
+            )
+        return _ocr_pipeline
+
+
+def close_ocr_pipeline():
+    """Stops the OCR worker processes."""
+    global _ocr_pipeline
+    with _ocr_pipeline_lock:
+        if _ocr_pipeline is not None:
+            _ocr_pipeline.close()
+            _ocr_pipeline = None
+
+
+def get_tweet_images(tweet, timeout=10):
+    """Downloads the photos attached to a tweet, as encoded image bytes."""
+    media = (getattr(tweet, "extended_entities", None) or {}).get("media", [])
+    images = []
+    for item in media:
+        if item.get("type") != "photo":
+            continue
+        try:
+            response = requests.get(item["media_url_https"], timeout=timeout)
+            response.raise_for_status()
+            images.append(response.content)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Error downloading tweet image: {e}")
+    return images
+
+
+def fetch_generation_data_api():
+    """
+    Generation figures from the latest ZPC tweet via the Twitter API, or None.
+
+    When the tweet text has no Kariba figure, the bulletin is assumed to be an
+    image and the attached photos are OCR'd in the background; their figures
+    are used once cached, and the sources are re-queried as soon as they are.
+    """
+    tweet = get_latest_zpc_generation_tweet_text_api()
+    upstream("twitter_api", tweet is not None)
+    if tweet is None:
+        return None
+    text = getattr(tweet, "full_text", None) or getattr(tweet, "text", "")
+    generation_data = parse_generation_data(text)
+    if "Kariba" not in generation_data:
+        images = get_tweet_images(tweet)
+        if images:
+            with stage("ocr"):
+                generation_data.update(
+                    get_ocr_pipeline().cached_generation_data(images, on_ready=_ocr_ready)
+                )
+    return generation_data or None
+
+
+def _ocr_ready():
+    """Makes the shared engine re-query its generation sources for fresh OCR figures."""
+    engine = _engine
+    if engine is not None:
+        engine.generation_sources.invalidate()
+
+
+def fetch_generation_data_selenium():
+    """Generation figures from the latest ZPC tweet via the Selenium scraper, or None."""
+    text = get_latest_zpc_generation_tweet_text_selenium()
+    upstream("twitter_selenium", bool(text))
+    if not text:
+        return None
+    return parse_generation_data(text)
 
 
 
@@ -127,177 +249,332 @@ class KaribaDataCollector:
         self,
         data_dir="data",
         zra_url="https://www.zambezira.org/hydrology/lake-levels/1000",
+        store_backend="csv",
     ):
+        """
+        Initializes the KaribaDataCollector.
+
+        Args:
+            data_dir (str, optional): The directory to store data files. Defaults to "data".
+            zra_url (str, optional): The ZRA lake-levels page to scrape.
+            store_backend (str, optional): Kariba store backend, one of "csv",
+                "parquet" or "binary". Defaults to "csv".
+        """
         self.data_dir = data_dir
-        self.kariba_data_file = os.path.join(data_dir, "kariba_levels.csv")
         self.zra_url = zra_url
+        self.zra_client = ZraClient()  # Pooled, conditional ZRA requests
+        self._fetch_lock = threading.Lock()  # One ZRA fetch at a time
+        self.last_refreshed = None  # When ZRA data was last fetched successfully
+        self.refresh_scheduler = None  # Set by KaribaRefreshScheduler
+        self.data_version = 0  # Bumped whenever self.data changes
+        self.trend_stats = KaribaTrendStats()  # Rolling 7/30/90-day statistics
 
         if not os.path.exists(data_dir):
             os.makedirs(data_dir)
 
-        if os.path.exists(self.kariba_data_file):
-            self.data = pd.read_csv(self.kariba_data_file)
+        self.store = open_kariba_store(data_dir, store_backend)
+        self.kariba_data_file = self.store.path
+        self.load_data()
 
-            def parse_kariba_date(date_str):
-                """Helper function to parse dates with and without time."""
-                try:
-                    return pd.to_datetime(
-                        date_str, format="%d/%m/%Y %H:%M", dayfirst=True
-                    )
-                except ValueError:
-                    try:
-                        return pd.to_datetime(
-                            date_str, format="%d/%m/%Y", dayfirst=True
-                        )
-                    except ValueError:
-                        return pd.NaT  # Not a Time
+    def load_data(self):
+        """(Re)loads the Kariba level history from the store."""
+        with stage("data_load"):
+            self.data = self.store.load()
+        self.trend_stats.rebuild(self.data)
+        self.data_version += 1
+
+    def add_observation(self, date, level, percent_full):
+        """
+        Upserts one observation into the store and the in-memory history.
 
-            self.data["date"] = self.data["date"].apply(parse_kariba_date)
-            self.data = self.data.dropna(
-                subset=["date"]
-            )  # Remove rows with dates that couldn't be parsed
+        Args:
+            date (datetime.date or datetime.datetime): When the level was observed.
+            level (float): Lake level in metres.
+            percent_full (float): Percentage of live storage.
+        """
+        date = pd.Timestamp(date)
+        self.store.upsert([{"date": date, "level": level, "percent_full": percent_full}])
+        data = self.data
+        if not data.empty and data["date"].iloc[-1] == date:
+            data = data.copy()
+            data.iloc[-1, data.columns.get_indexer(["level", "percent_full"])] = [
+                level,
+                percent_full,
+            ]
+        elif data.empty or data["date"].iloc[-1] < date:
+            row = pd.DataFrame(
+                {"date": [date], "level": [level], "percent_full": [percent_full]}
+            )
+            data = pd.concat([data, row], ignore_index=True)
         else:
-            self.data = pd.DataFrame(columns=["date", "level", "percent_full"])
-            self.data.to_csv(self.kariba_data_file, index=False)
+            data = self.store.load()  # Back-dated observation; re-resolve history
+        self.data = data
+        if not self.trend_stats.add(date, level):
+            self.trend_stats.rebuild(data)
+        self.data_version += 1
 
     def fetch_zra_data(self):
-        """Fetches the latest Kariba water level data from the ZRA website."""
-        print("Attempting to fetch data from ZRA...")
+        """
+        Fetches the latest Kariba water level data from the ZRA website.
+
+        Fetches are conditional and reuse one pooled session (see ZraClient).
+        When the page has not changed and today's reading is already stored,
+        nothing is parsed or written.
+        """
+        logger.debug("Attempting to fetch data from ZRA...")
         try:
-            response = requests.get(self.zra_url, timeout=10)  # added timeout
-            response.raise_for_status()  # Raise HTTPError for bad responses (4xx or 5xx)
-            soup = BeautifulSoup(response.content, "html.parser")
-
-            # Updated to use the correct HTML elements
-            level_element = soup.find("td", class_="row_7 col_1")
-            percent_element = soup.find("td", class_="row_7 col_2")
-
-            if level_element and percent_element:
-                print("Found level and percentage elements.")
-                level_text = level_element.text.strip()
-                percent_text = percent_element.text.strip().replace(
-                    "%", ""
-                ).strip()  # Remove '%' and extra space
-                print(
-                    f"Level text: '{level_text}', Percentage text: '{percent_text}'"
-                )
-                try:
-                    level = float(level_text)
-                    percent_full = float(percent_text)
-                    print(
-                        f"Successfully converted level: {level}, percentage: {percent_full}"
-                    )
-                    today = datetime.date.today()
-                    new_data = pd.DataFrame(
-                        [
-                            {
-                                "date": today,
-                                "level": level,
-                                "percent_full": percent_full,
-                            }
-                        ]
-                    )
-                    self.data = pd.concat([self.data, new_data]).drop_duplicates(
-                        subset=["date"], keep="last"
-                    ).reset_index(
-                        drop=True
-                    )  # More efficient
-                    self.data.to_csv(self.kariba_data_file, index=False)
-                    logger.info(
-                        f"Successfully fetched and saved ZRA data for {today}: Level={level}, Percent Full={percent_full}"
-                    )
-                    return True
-                except ValueError:
-                    logger.error(
-                        f"Could not convert level or percentage to numbers: Level='{level_text}', Percent='{percent_text}'"
-                    )
-                    return False
-            else:
-                logger.warning(
-                    "Could not find water level or percentage elements on the ZRA website."
-                )
-                print(
-                    "Could not find level or percentage elements on the ZRA website."
-                )
-                return False
+            outcome, reading = self.zra_client.fetch(self.zra_url)
         except requests.exceptions.RequestException as e:
             logger.error(f"Error fetching data from ZRA website: {e}")
             return False
-        except TimeoutError:
-            logger.error("Timeout error while fetching data from ZRA.")
+
+        if reading is None:
+            logger.warning(
+                "Could not find water level or percentage elements on the ZRA website."
+            )
+            return False
+        level_text = reading.level_text
+        percent_text = reading.percent_text.replace("%", "").strip()  # Remove '%' and extra space
+        logger.debug("ZRA level text: %r, percentage text: %r (%s)", level_text, percent_text, outcome)
+        try:
+            level = float(level_text)
+            percent_full = float(percent_text)
+        except ValueError:
+            logger.error(
+                f"Could not convert level or percentage to numbers: Level='{level_text}', Percent='{percent_text}'"
+            )
+            return False
+
+        today = datetime.date.today()
+        data = self.data
+        if (
+            outcome != FETCHED
+            and not data.empty
+            and data["date"].iloc[-1].date() == today
+            and data["level"].iloc[-1] == level
+            and data["percent_full"].iloc[-1] == percent_full
+        ):
+            logger.debug("ZRA page unchanged and today's reading already stored.")
+            return True
+        self.add_observation(today, level, percent_full)
+        logger.info(
+            f"Successfully fetched and saved ZRA data for {today}: Level={level}, Percent Full={percent_full}"
+        )
+        return True
+
+    def refresh(self, wait=True):
+        """
+        Fetches ZRA data unless a fetch is already in progress.
+
+        Concurrent callers are deduplicated: only one fetch runs at a time, and
+        callers that arrive while it runs wait for it (or return immediately
+        when ``wait`` is False) instead of starting another.
+
+        Args:
+            wait (bool, optional): Wait for an in-flight fetch to finish. Defaults to True.
+
+        Returns:
+            bool: True if this call fetched data successfully.
+        """
+        if not self._fetch_lock.acquire(blocking=False):
+            if wait:
+                with self._fetch_lock:
+                    pass  # Piggyback on the in-flight fetch
             return False
+        try:
+            with stage("kariba_fetch"):
+                fetched = self.fetch_zra_data()
+            upstream("zra", fetched)
+            if fetched:
+                self.last_refreshed = datetime.datetime.now()
+                return True
+            return False
+        finally:
+            self._fetch_lock.release()
+
+    def is_stale(self):
+        """Returns True if there is no Kariba reading for today yet."""
+        data = self.data
+        return data.empty or data["date"].max().date() < datetime.date.today()
 
     def get_latest_data(self):
         """
         Returns the most recent water level data, fetching from ZRA if needed.
 
+        When a refresh scheduler is attached the last known value is returned
+        immediately and a stale reading only nudges the scheduler; otherwise a
+        stale reading is refreshed inline.
+
         Returns:
-            dict: A dictionary containing the latest water level data, or None if no data is available.
+            dict: A dictionary containing the latest water level data, plus
+                ``last_refreshed`` and ``is_stale``, or None if no data is available.
         """
-        if self.data.empty or (
-            not self.data.empty and self.data["date"].max().date() < datetime.date.today()
-        ):
-            self.fetch_zra_data()
-        if not self.data.empty:
-            return self.data.iloc[-1].to_dict()  # Get last row as dict
+        if self.is_stale():
+            if self.refresh_scheduler is not None:
+                self.refresh_scheduler.trigger()
+            else:
+                # If another thread is already fetching, serve what we have instead
+                # of queueing up behind a possibly slow ZRA response.
+                self.refresh(wait=False)
+        data = self.data
+        if not data.empty:
+            latest = data.iloc[-1].to_dict()  # Get last row as dict
+            latest["last_refreshed"] = self.last_refreshed
+            latest["is_stale"] = self.is_stale()
+            return latest
         return None
 
     def get_trend(self, days=7):
         """
-        Calculate water level trends over a specified number of days.
+        Least-squares water level trend over the last ``days`` days.
+
+        The 7, 30 and 90-day windows are maintained incrementally and read
+        without touching the history; other windows are computed on demand.
 
         Args:
             days (int, optional): The number of days to calculate the trend over. Defaults to 7.
 
         Returns:
-            float: The average change in water level per day over the specified period.
-                    Returns 0 if insufficient data is available.
+            float: The change in water level per day, fitted over the actual
+                observation dates. Returns 0 if insufficient data is available.
+        """
+        slope = self.trend_stats.slope(days)
+        if slope is None:
+            slope = slope_over(self.data, days)
+        return slope
+
+    def get_trend_stats(self):
+        """
+        Returns the rolling statistics for every tracked window.
+
+        Returns:
+            dict: ``latest`` reading and, per window, observations, span,
+                coverage, mean level, slope, change and volatility.
+        """
+        return self.trend_stats.snapshot()
+
+
+
+class KaribaRefreshScheduler:
+    """Refreshes Kariba data from ZRA in the background on a fixed interval."""
+
+    def __init__(self, collector, interval=3600, min_interval=60):
         """
-        if len(self.data) < 2:
-            return 0
-        recent_data = self.data.tail(days)
-        if len(recent_data) < 2:
-            return 0
-        first_level = recent_data.iloc[0]["level"]
-        last_level = recent_data.iloc[-1]["level"]
-        return (last_level - first_level) / days
+        Initializes the KaribaRefreshScheduler.
+
+        Args:
+            collector (KaribaDataCollector): The collector to keep fresh.
+            interval (float, optional): Seconds between refreshes. Defaults to 3600.
+            min_interval (float, optional): Minimum seconds between two fetches, so
+                stale reads during a ZRA outage cannot cause a fetch loop. Defaults to 60.
+        """
+        self.collector = collector
+        self.interval = interval
+        self.min_interval = min_interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Attaches to the collector and starts the refresh thread."""
+        if self._thread is not None:
+            return
+        self.collector.refresh_scheduler = self
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="kariba-refresh", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Kariba refresh scheduler started (every {self.interval}s).")
+
+    def stop(self):
+        """Stops the refresh thread and detaches from the collector."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=15)
+        self._thread = None
+        self.collector.refresh_scheduler = None
+
+    def trigger(self):
+        """Asks for a refresh as soon as possible without waiting for it."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            last_attempt = time.monotonic()
+            try:
+                self.collector.refresh(wait=False)
+            except Exception as e:
+                logger.error(f"Error refreshing Kariba data: {e}")
+            self._wake.clear()
+            self._wake.wait(self.interval)
+            remaining = self.min_interval - (time.monotonic() - last_attempt)
+            if remaining > 0:
+                self._stop.wait(remaining)
 
 
 
 class PowerOutagePrediction:
     """Generates power outage predictions based on Kariba data and ZPC tweets."""
 
-    def __init__(self, data_dir="data"):
+    def __init__(self, data_dir="data", store_backend="csv", model_path=None):
         """
         Initializes the PowerOutagePrediction.
 
         Args:
             data_dir (str, optional): The directory to store data files. Defaults to "data".
+            store_backend (str, optional): Kariba store backend. Defaults to "csv".
+            model_path (str, optional): Trained outage model artifact. Defaults to the
+                OUTAGE_MODEL_PATH environment variable, or data_dir/outage_model.json.
+                Without one the threshold rules are used.
         """
-        self.kariba_collector = KaribaDataCollector(data_dir)
+        self.data_dir = data_dir
+        self.kariba_collector = KaribaDataCollector(data_dir, store_backend=store_backend)
         self.manual_data_file = os.path.join(data_dir, "power_data.txt")
-        self.location_keywords = self.load_location_keywords()
+        self.locations_file = self.find_locations_file()
         self.location_fault_data = self.load_location_fault_data()  # Load fault data
+        self.location_index = LocationIndex.from_file(self.locations_file)
+        self.cluster_detector = OutageClusterDetector()
+        self.prediction_cache = PredictionCache()
+        self.outage_model = load_outage_model(
+            model_path
+            or os.environ.get("OUTAGE_MODEL_PATH")
+            or os.path.join(data_dir, "outage_model.json")
+        )
+        self.manual_generation_data = self.get_manual_generation_data()
         self.executor = ThreadPoolExecutor(max_workers=3)  # Using ThreadPoolExecutor
-
-    def load_location_keywords(self):
-        """Loads location keywords from the locations.txt file."""
-        keywords = []
-        try:
-            with open("locations.txt", "r") as f:
-                for line in f:
-                    keywords.append(line.strip().lower())  # Load and lowercase
-        except FileNotFoundError:
-            logger.error("locations.txt file not found.")
-            return []
-        return keywords
+        self.generation_sources = self.build_generation_sources()
+        self.kariba_scheduler = None
+        self.forecast_refresher = None
+        self.forecast_horizon = 14
+        self.locations_listeners = []  # Called after locations.txt is reloaded
+        self._reload_lock = threading.Lock()
+        self._data_file_mtimes = self.get_data_file_mtimes()
+
+    def find_locations_file(self):
+        """
+        Returns the locations.txt to read: data_dir/locations.txt, or the
+        locations.txt in the working directory that older deployments kept
+        next to MVP.py when data_dir has none.
+        """
+        path = os.path.join(self.data_dir, "locations.txt")
+        if not os.path.exists(path) and os.path.exists("locations.txt"):
+            logger.warning(
+                f"{path} not found; reading ./locations.txt. Move it into {self.data_dir}/."
+            )
+            return "locations.txt"
+        return path
 
     def load_location_fault_data(self):
         """Loads location keywords and fault data from the locations.txt file."""
         location_data = {}
         try:
-            with open("locations.txt", "r") as f:
+            with open(self.locations_file, "r") as f:
                 for line in f:
+                    if not line.strip():
+                        continue  # Skip blank lines
                     parts = line.strip().split(",")  # Split line by comma
                     if len(parts) == 2:
                         location = parts[0].strip().lower()
@@ -307,7 +584,7 @@ class PowerOutagePrediction:
                         )
                     elif len(parts) == 1:
                         location = parts[0].strip().lower()
-                        location_data[location] = "No fault information available"
+                        location_data[location] = NO_FAULT_INFORMATION
                     else:
                         logger.warning(
                             f"Skipping invalid line in locations.txt: {line.strip()}"
@@ -317,6 +594,205 @@ class PowerOutagePrediction:
             return {}
         return location_data
 
+    def build_generation_sources(self, names=None):
+        """
+        Builds the generation source layer on the engine's thread pool.
+
+        Args:
+            names (list of str, optional): Sources in priority order, from
+                "api", "selenium" and "manual". Defaults to the comma-separated
+                GENERATION_SOURCES environment variable, or
+                default_generation_sources().
+
+        Returns:
+            GenerationSourceManager: The source layer.
+        """
+        if names is None:
+            names = os.environ.get("GENERATION_SOURCES", default_generation_sources()).split(",")
+        fetchers = {
+            "api": fetch_generation_data_api,
+            "selenium": fetch_generation_data_selenium,
+            "manual": lambda: self.manual_generation_data,
+        }
+        sources = []
+        for priority, name in enumerate(name.strip() for name in names):
+            if name not in fetchers:
+                logger.warning(f"Ignoring unknown generation source '{name}'")
+                continue
+            sources.append(GenerationSource(name, fetchers[name], priority))
+        return GenerationSourceManager(
+            sources,
+            self.executor,
+            deadline=float(os.environ.get("GENERATION_DEADLINE", "3")),
+            max_age=float(os.environ.get("GENERATION_MAX_AGE", "600")),
+        )
+
+    def get_data_file_mtimes(self):
+        """
+        Returns the modification times of the data files the engine depends on.
+
+        Returns:
+            dict: File path -> mtime, or None for files that do not exist.
+        """
+        mtimes = {}
+        for path in (
+            self.kariba_collector.kariba_data_file,
+            self.manual_data_file,
+            self.locations_file,
+        ):
+            try:
+                mtimes[path] = os.path.getmtime(path)
+            except OSError:
+                mtimes[path] = None
+        return mtimes
+
+    def reload_if_changed(self):
+        """
+        Reloads any data file that changed on disk since it was last loaded.
+
+        Returns:
+            bool: True if anything was reloaded.
+        """
+        with self._reload_lock:
+            mtimes = self.get_data_file_mtimes()
+            changed = [
+                path for path, mtime in mtimes.items()
+                if mtime != self._data_file_mtimes.get(path)
+            ]
+            if not changed:
+                return False
+            kariba_file = self.kariba_collector.kariba_data_file
+            if (
+                kariba_file in changed
+                and mtimes[kariba_file] != self.kariba_collector.store.last_written_mtime
+            ):
+                self.kariba_collector.load_data()  # Changed by someone other than us
+            if self.locations_file in changed:
+                location_fault_data = self.load_location_fault_data()
+                self.location_index = LocationIndex.from_file(self.locations_file)
+                self.location_fault_data = location_fault_data
+                for listener in list(self.locations_listeners):
+                    try:
+                        listener()
+                    except Exception as e:
+                        logger.error(f"Error rebuilding state after a locations reload: {e}")
+            if self.manual_data_file in changed:
+                self.manual_generation_data = self.get_manual_generation_data()
+                self.generation_sources.invalidate()
+            self._data_file_mtimes = mtimes
+            logger.info(f"Reloaded changed data files: {changed}")
+            if self.forecast_refresher is not None:
+                self.forecast_refresher.trigger()
+            return True
+
+    def start_background_refresh(self, interval=3600):
+        """
+        Refreshes Kariba data in the background so predictions never wait on ZRA.
+
+        Args:
+            interval (float, optional): Seconds between refreshes. Defaults to 3600.
+        """
+        if self.kariba_scheduler is None:
+            self.kariba_scheduler = KaribaRefreshScheduler(self.kariba_collector, interval)
+            self.kariba_scheduler.start()
+
+    def start_forecasts(self, horizon=14, interval=60):
+        """
+        Keeps a precomputed multi-day forecast table current in the background.
+
+        Args:
+            horizon (int, optional): Days forecast, starting tomorrow. Defaults to 14.
+            interval (float, optional): Seconds between input checks. Defaults to 60.
+        """
+        if self.forecast_refresher is None:
+            self.forecast_horizon = horizon
+            self.forecast_refresher = ForecastRefresher(
+                self.build_forecast, self.forecast_inputs_version, interval
+            )
+            self.forecast_refresher.start()
+
+    def forecast_inputs_version(self):
+        """
+        Returns a stamp of every input the forecasts depend on. Unlike
+        input_version() it follows the generation sources' data rather than the
+        reading chosen right now, and includes the outage model.
+        """
+        return (
+            self.kariba_collector.data_version,
+            self._data_file_mtimes.get(self.manual_data_file),
+            self._data_file_mtimes.get(self.locations_file),
+            self.generation_sources.version,
+            self.outage_model.version if self.outage_model is not None else None,
+            datetime.date.today(),
+        )
+
+    def build_forecast(self, version=None):
+        """
+        Forecasts every location in locations.txt over the forecast horizon.
+
+        Args:
+            version (optional): Input version to tag the table with.
+
+        Returns:
+            ForecastTable: The forecasts.
+        """
+        collector = self.kariba_collector
+        kariba_data = collector.get_latest_data()
+        generation_data_to_use, _ = self.generation_sources.get()
+        trend = collector.get_trend(7)
+
+        def predict_day(kariba, day, locations):
+            return self.predict_base_hours(
+                kariba, generation_data_to_use, locations, when=day, trend=trend
+            )
+
+        return build_forecast_table(
+            predict_day,
+            kariba_data,
+            collector.get_trend_stats(),
+            list(self.location_fault_data),
+            horizon=self.forecast_horizon,
+            version=version,
+        )
+
+    def get_forecast(self, user_location):
+        """
+        Returns the precomputed forecast for a location.
+
+        Args:
+            user_location (str): The user's location.
+
+        Returns:
+            dict: The matched location, its fault note if any, and per day the
+                projected Kariba level, expected outage hours with a range, the
+                reason, and the outage probability for each hour; None until the
+                first table has been built.
+        """
+        table = self.forecast_refresher.table if self.forecast_refresher else None
+        if table is None:
+            return None
+        location_key = self.resolve_location_key(user_location)
+        fault = self.location_fault_data.get(location_key) if location_key else None
+        if fault == NO_FAULT_INFORMATION:
+            fault = None
+        return {
+            "location": user_location,
+            "matched": location_key,
+            "fault": fault,
+            "generated_at": table.generated_at,
+            "days": list(table.lookup(location_key)),
+        }
+
+    def close(self):
+        """Stops background refreshes and releases the worker threads held by the engine."""
+        if self.forecast_refresher is not None:
+            self.forecast_refresher.stop()
+            self.forecast_refresher = None
+        if self.kariba_scheduler is not None:
+            self.kariba_scheduler.stop()
+            self.kariba_scheduler = None
+        self.executor.shutdown(wait=False)
+
     def get_manual_generation_data(self):
         """
         Reads manual power generation data from a file.
@@ -357,33 +833,235 @@ class PowerOutagePrediction:
             logger.info("Manual power data file not found.")
         return manual_data
 
+    def input_version(self):
+        """
+        Returns a stamp of every input a prediction depends on: the Kariba
+        history (and its latest date), the manual generation and locations
+        files as loaded, the chosen generation reading, and today's date (which
+        decides whether Kariba data is stale). Report clusters are not part of
+        it: they are applied after the cache, so their counts are always live.
+        """
+        collector = self.kariba_collector
+        data = collector.data
+        return (
+            collector.data_version,
+            data["date"].iloc[-1] if not data.empty else None,
+            self._data_file_mtimes.get(self.manual_data_file),
+            self._data_file_mtimes.get(self.locations_file),
+            self.generation_sources.version_stamp(),
+            datetime.date.today(),
+        )
+
+    def cluster_version(self):
+        """
+        Returns a stamp of the active report clusters, which change reasons but
+        are applied after the cache. Clusters that aged out are expired first.
+        """
+        self.cluster_detector.hotspots()
+        return self.cluster_detector.version
+
     def predict_outage_hours(self, user_location):
         """
         Predicts the number of outage hours based on Kariba data and ZPC tweets.
 
+        Base predictions are cached per resolved location until any input
+        changes; fault notes and report clusters are applied on every call.
+
         Args:
             user_location (str): The user's location.
 
         Returns:
             int: The predicted number of outage hours.  Returns a default value if prediction fails.
         """
+        with stage("prediction"):
+            with stage("location_resolve"):
+                location_key = self.resolve_location_key(user_location)
+            cache_key = self.prediction_cache_key(user_location, location_key)
+            version = self.input_version()
+            base = self.prediction_cache.get(cache_key, version)
+            if base is None:
+                [base] = self.compute_base_many([location_key or user_location])
+                if self.input_version() == version:  # Inputs did not move while computing
+                    self.prediction_cache.put(cache_key, version, base)
+            return self.apply_location_reasons(user_location, location_key, base)
+
+    def compute_outage_hours(self, user_location):
+        """
+        Computes an outage prediction without consulting the cache.
+
+        Args:
+            user_location (str): The user's location.
+
+        Returns:
+            tuple: (predicted_hours, reason)
+        """
+        with stage("location_resolve"):
+            location_key = self.resolve_location_key(user_location)
+        [base] = self.compute_base_many([location_key or user_location])
+        return self.apply_location_reasons(user_location, location_key, base)
+
+    def prediction_cache_key(self, user_location, location_key):
+        """
+        Returns the key a base prediction is cached under: the locations.txt
+        entry the location resolved to, or else its normalized name (which is
+        what the outage model looks unresolved names up by).
+        """
+        if location_key is not None:
+            return ("location", location_key)
+        return ("name", normalize_location(user_location))
+
+    def compute_base_many(self, names):
+        """
+        Computes base predictions, before fault and cluster reasons.
+
+        Args:
+            names (list of str): Resolved location keys, or raw names.
+
+        Returns:
+            list of tuple: (predicted_hours, reason) per name.
+        """
         kariba_data = self.kariba_collector.get_latest_data()
-        manual_generation_data = self.get_manual_generation_data()
-        latest_tweet = None
-        zetdc_tweet_text = None  # Changed variable name
-        affected_locations = []
 
-        print("Latest Tweet Text:")
-        print(zetdc_tweet_text)  # Changed variable name
+        # Best available generation reading (tweets, scraper or manual file)
+        with stage("generation_lookup"):
+            generation_data_to_use, source = self.generation_sources.get()
+        logger.debug("Using %s generation data for prediction: %s", source, generation_data_to_use)
+
+        with stage("rule_evaluation"):
+            return self.predict_base_hours(kariba_data, generation_data_to_use, names)
+
+    def apply_location_reasons(self, user_location, location_key, base):
+        """
+        Applies the location's fault note and any active report cluster to a
+        base prediction.
+
+        Returns:
+            tuple: (predicted_hours, reason)
+        """
+        predicted_hours, reason = base
+        # Check for fault information in locations.txt
+        fault = self.location_fault_reason(user_location, location_key)
+        if fault is not None:
+            reason = fault
+            logger.debug("Fault information found in locations.txt: %s", reason)
+        reason = self.add_cluster_reason(user_location, reason)
+
+        logger.debug("Predicted outage hours: %s, reason: %s", predicted_hours, reason)
+        return predicted_hours, reason
+
+    def resolve_location_key(self, user_location):
+        """
+        Maps a user-entered location onto its locations.txt entry.
+
+        Exact (case-insensitive) names are used as-is; anything else goes
+        through the fuzzy location index, so "Samora Machel Ave" or a typo
+        still finds its entry.
+
+        Args:
+            user_location (str): The user's location.
+
+        Returns:
+            str: The matching key in location_fault_data, or None.
+        """
+        location_fault_data = self.location_fault_data
+        key = user_location.lower()
+        if key in location_fault_data:
+            return key
+        match = self.location_index.resolve(user_location)
+        if match is not None and match.key in location_fault_data:
+            return match.key
+        return None
+
+    def location_fault_reason(self, user_location, location_key):
+        """
+        Returns the locations.txt fault note that replaces the computed reason, or None.
+
+        An entry without a note has "No fault information available" in its
+        place. That only replaces the reason when the entry is named as it is
+        (up to case, punctuation and abbreviations), as before fuzzy matching
+        existed; a fuzzy match never hides the computed reason behind it.
+        """
+        if location_key is None:
+            return None
+        fault = self.location_fault_data[location_key]
+        named_exactly = normalize_location(user_location) == normalize_location(location_key)
+        if fault == NO_FAULT_INFORMATION and not named_exactly:
+            return None
+        return fault
+
+    def cluster_area(self, user_location):
+        """Returns the (location key, region) a report or prediction is counted under."""
+        match = self.location_index.resolve(user_location)
+        if match is None:
+            return normalize_location(user_location), None
+        if match.kind == "region":
+            return None, match.name
+        return match.key, match.region
+
+    def record_report(self, user_location):
+        """Counts an incoming outage report towards hotspot detection."""
+        location_key, region = self.cluster_area(user_location)
+        self.cluster_detector.record(location_key, region)
+
+    def add_cluster_reason(self, user_location, reason):
+        """Appends an active outage cluster around the location to the reason."""
+        location_key, region = self.cluster_area(user_location)
+        cluster = self.cluster_detector.cluster_for(location_key, region)
+        if cluster is None:
+            return reason
+        minutes = self.cluster_detector.window // 60
+        if cluster.area == region:
+            area_name = region
+        else:
+            match = self.location_index.resolve(user_location)
+            area_name = match.name if match is not None else location_key
+        return f"{reason} ({cluster.count} outage reports in {area_name} in the last {minutes} min)"
+
+    def predict_base_hours(
+        self, kariba_data, generation_data_to_use, locations, when=None, trend=None
+    ):
+        """
+        Predicts outage hours and a reason for each location, before fault and
+        cluster reasons are applied.
+
+        Uses the trained outage model when one is loaded, evaluating the shared
+        inputs once for the whole batch; otherwise (or if the model fails) every
+        location gets the threshold rules' answer.
+
+        Args:
+            kariba_data (dict): Latest Kariba reading, or None.
+            generation_data_to_use (dict): Generation figures such as {"Kariba": "485MW"}.
+            locations (list of str): Resolved location keys, or raw names.
+            when (datetime.date, optional): Day predicted. Defaults to today.
+            trend (float, optional): 7-day Kariba trend. Defaults to the current one.
+
+        Returns:
+            list of tuple: (predicted_hours, reason) per location.
+        """
+        if self.outage_model is not None:
+            try:
+                if trend is None:
+                    trend = self.kariba_collector.get_trend(7)
+                features = context_features(
+                    kariba_data, trend, generation_data_to_use, when
+                )
+                return self.outage_model.predict(features, locations)
+            except Exception as e:
+                logger.error(f"Outage model failed, using threshold rules: {e}")
+        return [self.predict_base_outage(kariba_data, generation_data_to_use)] * len(locations)
 
-        zetdc_generation_data = (
-            {}
-        )  # Changed variable name.  Initialize to empty dict.
+    def predict_base_outage(self, kariba_data, generation_data_to_use):
+        """
+        Applies the Kariba level and generation thresholds, before any
+        location-specific adjustment.
 
-        # Use manual data
-        generation_data_to_use = manual_generation_data  # Changed variable name
-        print("Using Manual Generation Data for Prediction:", generation_data_to_use)
+        Args:
+            kariba_data (dict): Latest Kariba reading, or None.
+            generation_data_to_use (dict): Generation figures such as {"Kariba": "485MW"}.
 
+        Returns:
+            tuple: (predicted_hours, reason)
+        """
         predicted_hours = 6  # Default prediction
         reason = "Unknown Reason"  # Default Reason
 
@@ -412,8 +1090,12 @@ class PowerOutagePrediction:
                 generation_data_to_use.get("IPPS", "0").replace("MW", "").strip()
             )
             total_generation_mw = kariba_mw + hwange_mw + ipps_mw
-            print(
-                f"Total Generation (Kariba: {kariba_mw}, Hwange: {hwange_mw}, IPPS: {ipps_mw}): {total_generation_mw} MW"
+            logger.debug(
+                "Total generation (Kariba: %s, Hwange: %s, IPPS: %s): %s MW",
+                kariba_mw,
+                hwange_mw,
+                ipps_mw,
+                total_generation_mw,
             )
 
             # Adjust prediction based on total generation compared to demand
@@ -443,31 +1125,210 @@ class PowerOutagePrediction:
 
         except Exception as e:
             logger.error(f"Error calculating total generation: {e}")
-            print(f"Error calculating total generation: {e}")
             predicted_hours = 6
             reason = "Error in Calculation"
 
-        # Check for fault information in locations.txt
-        if user_location.lower() in self.location_fault_data:
-            reason = self.location_fault_data[user_location.lower()]
-            print(f"Fault information found in locations.txt: {reason}")
-
-        print(f"Predicted outage hours: {predicted_hours}, Reason: {reason}")
         return predicted_hours, reason
 
+    def predict_many(self, locations):
+        """
+        Predicts outage hours for many locations at once.
+
+        Locations go through the same prediction cache as predict_outage_hours;
+        the base predictions not cached are computed together, once per
+        resolved location. Results are identical to calling
+        predict_outage_hours for each location.
+
+        Args:
+            locations (list of str): The locations to predict for.
+
+        Returns:
+            list of tuple: (predicted_hours, reason) per location, in input order.
+        """
+        if len(locations) == 0:
+            return []
+        with stage("location_resolve"):
+            keys = [self.resolve_location_key(location) for location in locations]
+        version = self.input_version()
+        cache_keys = [
+            self.prediction_cache_key(location, key) for location, key in zip(locations, keys)
+        ]
+        base = [self.prediction_cache.get(cache_key, version) for cache_key in cache_keys]
+        missing = {}  # Cache key -> name to compute it for
+        for i, result in enumerate(base):
+            if result is None:
+                missing.setdefault(cache_keys[i], keys[i] or locations[i])
+        if missing:
+            computed = dict(zip(missing, self.compute_base_many(list(missing.values()))))
+            cacheable = self.input_version() == version  # Inputs did not move while computing
+            if cacheable:
+                for cache_key, result in computed.items():
+                    self.prediction_cache.put(cache_key, version, result)
+            base = [
+                result if result is not None else computed[cache_key]
+                for cache_key, result in zip(cache_keys, base)
+            ]
+        return self.apply_location_reasons_many(locations, keys, base)
+
+    def apply_location_reasons_many(self, locations, keys, base):
+        """
+        Batch form of apply_location_reasons: fault notes are applied with one
+        vectorized map, then any active report clusters.
+
+        Args:
+            locations (list of str): The locations as entered.
+            keys (list of str): Their resolved location keys (None if unresolved).
+            base (list of tuple): Base (predicted_hours, reason) per location.
+
+        Returns:
+            list of tuple: (predicted_hours, reason) per location, in input order.
+        """
+        keys = pd.Series(keys, dtype=object)
+        fault_reasons = keys.map(self.location_fault_data)
+        # Placeholder notes only count for exactly named entries (see location_fault_reason)
+        fuzzy = pd.Series(
+            [
+                key is None or normalize_location(location) != normalize_location(key)
+                for location, key in zip(locations, keys)
+            ],
+            dtype=bool,
+        )
+        fault_reasons = fault_reasons.mask((fault_reasons == NO_FAULT_INFORMATION) & fuzzy)
+        base_reasons = np.array([reason for _, reason in base], dtype=object)
+        reasons = np.where(fault_reasons.notna(), fault_reasons, base_reasons)
+        reasons = [
+            self.add_cluster_reason(location, reason)
+            for location, reason in zip(locations, reasons.tolist())
+        ]
+        # Hours stay as computed: an array would turn integer hours into floats
+        return [(predicted_hours, reason) for (predicted_hours, _), reason in zip(base, reasons)]
+
+
+
+class RateLimiter:
+    """Thread-safe token bucket allowing ``rate`` acquisitions per second."""
+
+    def __init__(self, rate, burst=None):
+        """
+        Initializes the RateLimiter.
+
+        Args:
+            rate (float): Sustained acquisitions per second. 0 or None disables limiting.
+            burst (int, optional): Bucket size. Defaults to ``rate`` (at least 1).
+        """
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate or 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available."""
+        if not self.rate:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def format_alert_message(predicted_hours, reason, user_location):
+    """Builds the alert SMS text for a prediction."""
+    return f"Alert: Power outage expected for {predicted_hours} hours today in {user_location} due to {reason}. Prepare backup power."  # Include reason
 
 
 class AlertSystem:
     """Handles sending alerts (SMS, Email, etc.)."""
 
-    def __init__(self):
-        """Initializes the AlertSystem."""
-        self.prediction_engine = PowerOutagePrediction()
+    # Infobip responses worth retrying; anything else is a permanent failure
+    RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        prediction_engine=None,
+        max_concurrency=4,
+        rate_limit=10,
+        max_retries=3,
+        backoff_base=0.5,
+        destinations_per_request=500,
+        subscribers=None,
+        outbox_path=None,
+        outbox_workers=4,
+    ):
+        """
+        Initializes the AlertSystem.
+
+        Args:
+            prediction_engine (PowerOutagePrediction, optional): Engine to use.
+                Defaults to the shared process-wide engine.
+            max_concurrency (int, optional): Parallel Infobip requests in bulk mode. Defaults to 4.
+            rate_limit (float, optional): Infobip requests per second. Defaults to 10.
+            max_retries (int, optional): Retries for a failed Infobip request. Defaults to 3.
+            backoff_base (float, optional): First retry delay in seconds, doubled
+                on each further retry. Defaults to 0.5.
+            destinations_per_request (int, optional): Recipients packed into one
+                Infobip request in bulk mode. Defaults to 500.
+            subscribers (SubscriberRegistry, optional): Who to alert in
+                alert_subscribers(). Defaults to none.
+            outbox_path (str, optional): SQLite file for a durable SMS outbox.
+                With one, alerts are queued there and sent by background
+                workers with retries; without one they are sent inline.
+            outbox_workers (int, optional): Outbox sending threads. Defaults to 4.
+        """
+        self.prediction_engine = prediction_engine or get_prediction_engine()
+        self.subscribers = subscribers
         # Infobip Account Information (Replace with your actual credentials)
         self.infobip_api_key = os.environ.get("Ziermi")  # Updated environment variable name
         self.infobip_base_url = "4e4688.api.infobip.com/"  # Infobip base URL - changed
+        self.infobip_sms_url = os.environ.get(
+            "INFOBIP_SMS_URL", f"https://{self.infobip_base_url}sms/2/text/advanced"
+        )
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.destinations_per_request = destinations_per_request
+        self.rate_limiter = RateLimiter(rate_limit)
+
+        # One pooled keep-alive session for every Infobip call
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=max(1, max_concurrency)
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(
+            {
+                "Authorization": f"App {self.infobip_api_key}",
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+            }
+        )
 
+        self.outbox = None
+        if outbox_path:
+            self.outbox = SmsOutbox(
+                self.post_infobip_once,
+                outbox_path,
+                workers=outbox_workers,
+                batch_size=destinations_per_request,
+                max_attempts=max_retries + 5,
+                backoff_base=max(backoff_base, 1.0),
+            )
+            self.outbox.start()
 
+    def close(self):
+        """Stops the outbox workers (queued messages stay stored) and closes the session."""
+        if self.outbox is not None:
+            self.outbox.stop()
+        self.session.close()
 
     def send_alert(self, user_contact, user_location):
         """
@@ -481,30 +1342,28 @@ class AlertSystem:
             user_location
         )  # Get reason
         if predicted_hours is not None:
-            message = f"Alert: Power outage expected for {predicted_hours} hours today in {user_location} due to {reason}. Prepare backup power."  # Include reason
-            print(f"Sending SMS to {user_contact}: {message}")
+            message = format_alert_message(predicted_hours, reason, user_location)
+            logger.info(f"Sending SMS to {user_contact}: {message}")
             self.send_infobip_sms(user_contact, message)  # Send sms
         else:
-            print("Could not get power outage prediction.")
             logger.error("Failed to get power outage prediction.")
 
     def send_infobip_sms(self, to_phone_number, message):
         """Sends an SMS message using Infobip's API directly.
 
+        With an outbox the message is only queued there.
+
         Args:
             to_phone_number (str): The recipient's phone number (including country code, e.g., 2637...).
             message (str): The text message to send.
         """
+        if self.outbox is not None:
+            if self.outbox.enqueue(to_phone_number, message):
+                logger.info(f"SMS to {to_phone_number} queued for delivery")
+            return
         try:
             # Infobip API endpoint for sending SMS
-            url = f"https://{self.infobip_base_url}sms/2/text/advanced"  # Added https:// and corrected the f string
-            print(f"Infobip URL: {url}")  # debugging
-            # Set up the request headers with your API key
-            headers = {
-                "Authorization": f"App {self.infobip_api_key}",  #  "App YOUR_API_KEY"
-                "Content-Type": "application/json",
-                "Accept": "application/json",
-            }
+            url = self.infobip_sms_url
 
             # Construct the JSON payload with the message and recipient
             payload = {
@@ -519,9 +1378,15 @@ class AlertSystem:
             # Convert the payload to a JSON string
             json_payload = json.dumps(payload)
 
-            # Send the POST request to Infobip's API
-            response = requests.post(url, headers=headers, data=json_payload, timeout=10)  # added timeout
-            response.raise_for_status()  # Raise an exception for bad status codes
+            # Send the POST request to Infobip's API (auth headers live on the session)
+            try:
+                with stage("sms_send"):
+                    response = self.session.post(url, data=json_payload, timeout=10)  # added timeout
+                response.raise_for_status()  # Raise an exception for bad status codes
+            except requests.exceptions.RequestException:
+                upstream("infobip", False)
+                raise
+            upstream("infobip", True)
 
             # Parse the JSON response from Infobip
             response_json = response.json()
@@ -529,32 +1394,314 @@ class AlertSystem:
             if response_json and response_json.get("messages"):
                 message_id = response_json["messages"][0].get("messageId")  # safer
                 if message_id:
-                    print(f"SMS sent successfully! Message ID: {message_id}")
                     logger.info(
                         f"SMS sent to {to_phone_number} with ID: {message_id}"
                     )
                 else:
-                    print("SMS sent successfully, but no message ID received.")
                     logger.warning(
                         f"SMS sent to {to_phone_number}, but no message ID received."
                     )
             else:
-                print("Failed to send SMS.  Invalid or empty response.")
                 logger.error(f"Failed to send SMS to {to_phone_number}: Invalid response: {response_json}")
 
         except requests.exceptions.RequestException as e:
-            print(f"Error sending SMS: {e}")
             logger.error(f"Error sending SMS to {to_phone_number}: {e}")
         except json.JSONDecodeError:
-            print("Error decoding JSON response from Infobip.")
             logger.error("Error decoding JSON response from Infobip.")
         except Exception as e:
-            print(f"An unexpected error occurred: {e}")
             logger.error(f"An unexpected error occurred: {e}")
         except TimeoutError:
-            print("Timeout error while sending SMS.")
             logger.error("Timeout error while sending SMS.")
 
+    def post_infobip_payload(self, payload):
+        """
+        Posts one Infobip ``messages`` payload, retrying transient failures.
+
+        Requests are rate limited, and 429/5xx responses and connection errors
+        are retried with exponential backoff.
+
+        Args:
+            payload (dict): An Infobip advanced-SMS payload.
+
+        Returns:
+            dict: The parsed Infobip response, or None if every attempt failed.
+        """
+        json_payload = json.dumps(payload)
+        for attempt in range(self.max_retries + 1):
+            result, error, retryable = self.post_infobip_once(json_payload)
+            if result is not None:
+                return result
+            if not retryable:
+                logger.error(f"Infobip request failed permanently: {error}")
+                return None
+            if attempt < self.max_retries:
+                delay = self.backoff_base * (2 ** attempt)
+                logger.warning(
+                    f"Infobip request failed ({error}), retrying in {delay:.1f}s"
+                )
+                time.sleep(delay)
+        logger.error(f"Infobip request failed after {self.max_retries + 1} attempts: {error}")
+        return None
+
+    def post_infobip_once(self, payload):
+        """
+        Makes one rate-limited Infobip request, without retrying.
+
+        Args:
+            payload (dict or str): An Infobip advanced-SMS payload, or it as JSON.
+
+        Returns:
+            tuple: (response, error, retryable). ``response`` is the parsed
+            Infobip response, or None with ``error`` describing the failure and
+            ``retryable`` telling whether trying again later may succeed.
+        """
+        json_payload = payload if isinstance(payload, str) else json.dumps(payload)
+        self.rate_limiter.acquire()
+        try:
+            with stage("sms_send"):
+                response = self.session.post(
+                    self.infobip_sms_url, data=json_payload, timeout=10
+                )
+            if response.status_code not in self.RETRYABLE_STATUS_CODES:
+                response.raise_for_status()
+                result = response.json()
+                upstream("infobip", True)
+                return result, None, False
+            error, retryable = f"HTTP {response.status_code}", True
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            error, retryable = str(e), True
+        except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
+            error, retryable = str(e), False
+        upstream("infobip", False)
+        return None, error, retryable
+
+    def build_bulk_payloads(self, messages_by_text):
+        """
+        Packs recipients into Infobip payloads of at most
+        ``destinations_per_request`` destinations each.
+
+        Args:
+            messages_by_text (dict): Message text -> list of phone numbers.
+
+        Returns:
+            list of dict: Infobip payloads, each with one or more messages.
+        """
+        payloads = []
+        current, size = [], 0
+        for text, numbers in messages_by_text.items():
+            start = 0
+            while start < len(numbers):
+                take = min(self.destinations_per_request - size, len(numbers) - start)
+                chunk = numbers[start:start + take]
+                current.append(
+                    {"destinations": [{"to": number} for number in chunk], "text": text}
+                )
+                size += take
+                start += take
+                if size >= self.destinations_per_request:
+                    payloads.append({"messages": current})
+                    current, size = [], 0
+        if current:
+            payloads.append({"messages": current})
+        return payloads
+
+    def send_bulk_alerts(self, subscribers):
+        """
+        Sends alerts to many subscribers.
+
+        Each distinct location is predicted once (via predict_many) and its
+        message is fanned out to every subscriber there through dispatch_bulk().
+
+        Args:
+            subscribers (iterable): (phone_number, location) pairs.
+
+        Returns:
+            dict: Counts of ``requests``, ``sent`` and ``failed`` destinations.
+        """
+        numbers_by_location = {}
+        for phone_number, location in subscribers:
+            numbers_by_location.setdefault(location, []).append(phone_number)
+        if not numbers_by_location:
+            return {"requests": 0, "sent": 0, "failed": 0}
+
+        locations = list(numbers_by_location)
+        predictions = self.prediction_engine.predict_many(locations)
+        messages_by_text = {}
+        for location, (predicted_hours, reason) in zip(locations, predictions):
+            text = format_alert_message(predicted_hours, reason, location)
+            messages_by_text.setdefault(text, []).extend(numbers_by_location[location])
+        return self.dispatch_bulk(messages_by_text)
+
+    def dispatch_bulk(self, messages_by_text, failed_numbers=None, keys=None):
+        """
+        Sends prepared alert texts, each to its list of phone numbers.
+
+        Recipients are packed into multi-destination Infobip requests that are
+        sent concurrently over the pooled session, under the configured rate limit.
+
+        With an outbox the messages are only queued there, and ``queued``
+        counts the new ones; if the outbox cannot store them the error is raised.
+
+        Args:
+            messages_by_text (dict): Message text -> list of phone numbers.
+            failed_numbers (list, optional): Receives the phone numbers whose
+                request failed.
+            keys (dict, optional): (phone_number, text) -> outbox idempotency
+                key, so a retried alert event is queued once. Messages without
+                one are each a new message.
+
+        Returns:
+            dict: Counts of ``requests``, ``sent`` and ``failed`` destinations.
+        """
+        if self.outbox is not None:
+            queued = self.outbox.enqueue_many(
+                (number, text, keys.get((number, text)) if keys else None)
+                for text, numbers in messages_by_text.items()
+                for number in numbers
+            )
+            logger.info(f"Bulk alert dispatch: {queued} SMS queued")
+            return {"requests": 0, "sent": 0, "failed": 0, "queued": queued}
+        payloads = self.build_bulk_payloads(messages_by_text)
+        sent = failed = 0
+        with ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="infobip"
+        ) as pool:
+            for payload, response_json in zip(
+                payloads, pool.map(self.post_infobip_payload, payloads)
+            ):
+                count = sum(len(message["destinations"]) for message in payload["messages"])
+                if response_json and response_json.get("messages"):
+                    sent += count
+                else:
+                    failed += count
+                    if failed_numbers is not None:
+                        failed_numbers.extend(
+                            destination["to"]
+                            for message in payload["messages"]
+                            for destination in message["destinations"]
+                        )
+        logger.info(
+            f"Bulk alert dispatch: {sent} sent, {failed} failed in {len(payloads)} requests"
+        )
+        return {"requests": len(payloads), "sent": sent, "failed": failed}
+
+    def alert_subscribers(self, locations, hour=None):
+        """
+        Alerts every subscriber affected by a change at any of the given locations.
+
+        Recipients come from the subscriber registry's location index, so only
+        the affected subscribers are looked at. Someone subscribed to several
+        of the locations gets one alert, for the first of them.
+
+        Args:
+            locations (list of str): Locations whose prediction changed.
+            hour (int, optional): Local hour used to skip subscribers in their
+                quiet hours. Defaults to the current hour.
+
+        Returns:
+            dict: Counts of ``requests``, ``sent`` and ``failed`` destinations.
+        """
+        if self.subscribers is None:
+            raise ValueError("AlertSystem has no subscriber registry.")
+        if hour is None:
+            hour = datetime.datetime.now().hour
+        seen = set()
+        pairs = []
+        for location in locations:
+            for phone_number in self.subscribers.recipients(location, hour):
+                if phone_number not in seen:
+                    seen.add(phone_number)
+                    pairs.append((phone_number, location))
+        return self.send_bulk_alerts(pairs)
+
+
+
+# Process-wide prediction engine, shared by every request
+_engine = None
+_engine_lock = threading.Lock()
+_engine_watcher = None
+_engine_watcher_stop = threading.Event()
+
+
+def _watch_data_files(engine, interval):
+    """Polls the engine's data files and hot-reloads them when they change."""
+    while not _engine_watcher_stop.wait(interval):
+        try:
+            engine.reload_if_changed()
+        except Exception as e:
+            logger.error(f"Error reloading prediction data files: {e}")
+
+
+def start_prediction_engine(
+    data_dir="data",
+    reload_interval=5.0,
+    refresh_interval=3600,
+    store_backend="csv",
+    forecast_days=14,
+    forecast_interval=60,
+):
+    """
+    Builds the shared prediction engine and starts its background threads.
+
+    Args:
+        data_dir (str, optional): The directory holding the data files. Defaults to "data".
+        reload_interval (float, optional): Seconds between data-file change checks.
+            Set to 0 or None to disable hot-reload. Defaults to 5.0.
+        refresh_interval (float, optional): Seconds between background ZRA refreshes.
+            Set to 0 or None to fetch inline instead. Defaults to 3600.
+        store_backend (str, optional): Kariba store backend, one of "csv",
+            "parquet" or "binary". Defaults to "csv".
+        forecast_days (int, optional): Days of precomputed forecasts. Set to 0
+            or None to disable them. Defaults to 14.
+        forecast_interval (float, optional): Seconds between forecast input
+            checks. Defaults to 60.
+
+    Returns:
+        PowerOutagePrediction: The shared engine.
+    """
+    global _engine, _engine_watcher
+    with _engine_lock:
+        if _engine is None:
+            _engine = PowerOutagePrediction(data_dir, store_backend)
+            if refresh_interval:
+                _engine.start_background_refresh(refresh_interval)
+            if forecast_days:
+                _engine.start_forecasts(forecast_days, forecast_interval)
+            logger.info("Prediction engine started.")
+        if reload_interval and _engine_watcher is None:
+            _engine_watcher_stop.clear()
+            _engine_watcher = threading.Thread(
+                target=_watch_data_files,
+                args=(_engine, reload_interval),
+                name="data-file-watcher",
+                daemon=True,
+            )
+            _engine_watcher.start()
+        return _engine
+
+
+def get_prediction_engine():
+    """Returns the shared prediction engine, starting it on first use."""
+    engine = _engine
+    if engine is None:
+        engine = start_prediction_engine()
+    return engine
+
+
+def stop_prediction_engine():
+    """Stops the data-file watcher and releases the shared prediction engine."""
+    global _engine, _engine_watcher
+    with _engine_lock:
+        if _engine_watcher is not None:
+            _engine_watcher_stop.set()
+            _engine_watcher.join(timeout=5)
+            _engine_watcher = None
+        if _engine is not None:
+            _engine.close()
+            _engine = None
+            logger.info("Prediction engine stopped.")
+    close_browser_pool()
+    close_ocr_pipeline()
 
 
 def prediction_engine(data):
@@ -565,14 +1712,15 @@ def prediction_engine(data):
     Returns:
         dict: A dictionary containing the message, prediction, and user data.
     """
-    print("Prediction engine received:", data)
+    logger.debug("Prediction engine received: %s", data)
 
     try:
         location = data.get("location", "").strip()
         details = data.get("details", "")
 
         # Call the actual prediction logic
-        engine = PowerOutagePrediction()
+        engine = get_prediction_engine()
+        engine.record_report(location)
         predicted_hours, reason = engine.predict_outage_hours(location)
 
         prediction_text = f"Estimated outage duration in {location}: {predicted_hours} hours. Reason: {reason}"
@@ -584,7 +1732,7 @@ def prediction_engine(data):
         }
 
     except Exception as e:
-        print(f"Error in prediction engine: {e}")
+        logger.exception(f"Error in prediction engine: {e}")
         return {
             "message": "Outage report received, but prediction failed.",
             "prediction": "⚠️ Could not calculate prediction.",
@@ -594,13 +1742,20 @@ def prediction_engine(data):
 
 def main():
     """Main function to run the prediction and alert system."""
-    alert_system = AlertSystem()
-    # Simulate user input (replace with actual input method in a real application)
-    user_location = "Harare"  # Example location
-    user_contact = "+263771234567"  # Example phone number (replace with actual user number)
-    alert_system.send_alert(user_contact, user_location)
+    engine = get_prediction_engine()
+    subscribers = SubscriberRegistry(
+        os.environ.get("SUBSCRIBER_DB_PATH", os.path.join("data", "subscribers.db")),
+        resolve_area=engine.cluster_area,
+    )
+    if not len(subscribers):
+        # Example subscriber (replace with real sign-ups via POST /subscribe)
+        subscribers.subscribe("+263771234567", ["Harare"])
+    alert_system = AlertSystem(prediction_engine=engine, subscribers=subscribers)
+    alert_system.alert_subscribers(["Harare"])
+    subscribers.close()
 
 
 
 if __name__ == "__main__":
+    configure_logging()
     main()
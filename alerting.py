@@ -0,0 +1,272 @@
+# Change-driven alerting #
+# Alerts subscribers only when their area's prediction materially changes.
+#
+# The alerter remembers the last (hours, reason) it saw for every subscribed
+# area. Each cycle re-predicts those areas in one predict_many batch, diffs
+# the results against that state, and looks up recipients only for the areas
+# whose hours moved by at least min_delta or whose reason changed. When
+# neither the prediction inputs, the active report clusters nor the
+# subscriptions changed since the last cycle, the cycle stops before
+# predicting anything.
+#
+# An area seen for the first time only primes the state, so a restart does
+# not alert everyone. A subscriber alerted within dedup_window seconds, or in
+# their quiet hours, is not alerted yet: the change is kept pending for them
+# and delivered, with the area's latest prediction, on the first cycle after
+# the window or the quiet hours end. A subscriber only counts as alerted once
+# the SMS outbox (or Infobip) has accepted the message; a failed send stays
+# pending too.
+#
+# Every material change bumps the area's revision, and an alert's outbox key
+# is the alerter, subscriber, area and revision: a failed dispatch retried
+# later is queued once, while an area that goes back to an earlier
+# prediction is alerted again even though the text is the same.
+
+import datetime
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+
+from MVP import format_alert_message
+from sms_outbox import alert_key
+
+logger = logging.getLogger(__name__)
+
+PredictionChange = namedtuple("PredictionChange", ["area", "hours", "reason", "previous"])
+
+# add_cluster_reason() appends live report counts; a count ticking up is not a new reason
+_CLUSTER_COUNTS = re.compile(r"\(\d+ outage reports in (.+) in the last \d+ min\)")
+
+
+def reason_key(reason):
+    """The part of a reason that decides whether it changed (cluster counts left out)."""
+    return _CLUSTER_COUNTS.sub(r"(outage reports in \1)", str(reason))
+
+
+class ChangeDrivenAlerter:
+    """Diffs each prediction run against the last one and alerts on material changes."""
+
+    def __init__(self, alert_system, min_delta=1.0, dedup_window=3 * 3600, interval=300, clock=time.time):
+        """
+        Initializes the ChangeDrivenAlerter.
+
+        Args:
+            alert_system (AlertSystem): Sends the alerts; its prediction engine
+                and subscriber registry are used.
+            min_delta (float, optional): Change in predicted hours worth an alert. Defaults to 1.0.
+            dedup_window (float, optional): Seconds during which a subscriber gets
+                at most one alert. Defaults to 3 hours.
+            interval (float, optional): Seconds between cycles of the background
+                thread. Defaults to 300.
+            clock (callable, optional): Returns the current time in seconds.
+        """
+        if alert_system.subscribers is None:
+            raise ValueError("ChangeDrivenAlerter needs an AlertSystem with a subscriber registry.")
+        self.alert_system = alert_system
+        self.engine = alert_system.prediction_engine
+        self.subscribers = alert_system.subscribers
+        self.min_delta = min_delta
+        self.dedup_window = dedup_window
+        self.interval = interval
+        self.clock = clock
+        self.state = {}  # Area -> (hours, reason) last seen
+        self.revisions = {}  # Area -> material changes seen
+        self.alerter_id = uuid.uuid4().hex  # Keeps outbox keys unique across restarts
+        self.cycles = 0
+        self.alerts_dispatched = 0  # Sent, or queued when the AlertSystem has an outbox
+        self._last_alerted = OrderedDict()  # Phone number -> time, oldest first
+        self._pending = {}  # Phone number -> changed areas not yet alerted
+        self._last_versions = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def is_material(self, previous, hours, reason):
+        """True if a prediction moved far enough from ``previous`` to alert on."""
+        previous_hours, previous_reason = previous
+        return (
+            abs(hours - previous_hours) >= self.min_delta
+            or reason_key(reason) != reason_key(previous_reason)
+        )
+
+    def diff(self, areas, predictions):
+        """
+        Updates the state with a prediction run and returns what materially changed.
+
+        Args:
+            areas (list of str): Areas predicted.
+            predictions (list of tuple): (hours, reason) per area.
+
+        Returns:
+            list of PredictionChange: Areas seen before whose prediction changed.
+        """
+        changes = []
+        state = self.state
+        for area, (hours, reason) in zip(areas, predictions):
+            previous = state.get(area)
+            if previous is None:
+                state[area] = (hours, reason)
+            elif self.is_material(previous, hours, reason):
+                state[area] = (hours, reason)
+                self.revisions[area] = self.revisions.get(area, 0) + 1
+                changes.append(PredictionChange(area, hours, reason, previous))
+        return changes
+
+    def _expire_dedup(self, now):
+        last_alerted = self._last_alerted
+        while last_alerted:
+            phone_number, alerted_at = next(iter(last_alerted.items()))
+            if now - alerted_at < self.dedup_window:
+                break
+            last_alerted.popitem(last=False)
+
+    def _defer(self, phone_number, areas):
+        pending = self._pending.setdefault(phone_number, [])
+        for area in areas:
+            if area not in pending:
+                pending.append(area)
+
+    def _due(self, changes, hour):
+        """
+        Returns phone number -> areas to alert about now: pending changes whose
+        subscriber is out of quiet hours, plus this cycle's changes. Changes for
+        subscribers in their quiet hours are (re)deferred; pending changes for
+        areas a subscriber no longer follows are dropped.
+        """
+        due = {}
+        pending, self._pending = self._pending, {}
+        checked = {}  # Area -> (awake, quiet) phone numbers
+        for phone_number, areas in pending.items():
+            for area in areas:
+                if area not in checked:
+                    quiet = []
+                    awake = self.subscribers.recipients(area, hour, quiet=quiet)
+                    checked[area] = (set(awake), set(quiet))
+                awake, quiet = checked[area]
+                if phone_number in awake:
+                    due.setdefault(phone_number, []).append(area)
+                elif phone_number in quiet:
+                    self._defer(phone_number, [area])
+        for change in changes:
+            quiet = []
+            for phone_number in self.subscribers.recipients(change.area, hour, quiet=quiet):
+                areas = due.setdefault(phone_number, [])
+                if change.area not in areas:
+                    areas.append(change.area)
+            for phone_number in quiet:
+                self._defer(phone_number, [change.area])
+        return due
+
+    def run_cycle(self, force=False):
+        """
+        Predicts every subscribed area and alerts the subscribers of those that
+        changed, along with any pending alerts that have become due.
+
+        Args:
+            force (bool, optional): Predict even if no input or subscription changed.
+
+        Returns:
+            dict: Counts of ``areas`` predicted, ``changed`` areas, alert
+            ``recipients``, ``deduplicated`` subscribers and subscribers with
+            alerts still ``pending``, plus the dispatch's ``requests``,
+            ``sent`` and ``failed``.
+        """
+        result = {"areas": 0, "changed": 0, "recipients": 0, "deduplicated": 0, "pending": 0,
+                  "requests": 0, "sent": 0, "failed": 0}
+        with self._lock:
+            self.cycles += 1
+            versions = (
+                self.engine.input_version(),
+                self.engine.cluster_version(),
+                self.subscribers.version,
+            )
+            changes = []
+            if force or versions != self._last_versions:
+                areas = self.subscribers.areas()
+                changes = self.diff(areas, self.engine.predict_many(areas))
+                self._last_versions = versions
+                result["areas"], result["changed"] = len(areas), len(changes)
+            if not changes and not self._pending:
+                return result
+
+            now = self.clock()
+            self._expire_dedup(now)
+            hour = datetime.datetime.fromtimestamp(now).hour
+            last_alerted = self._last_alerted
+            messages_by_text = {}
+            keys = {}
+            recipients = {}
+            for phone_number, areas in self._due(changes, hour).items():
+                if phone_number in last_alerted:
+                    self._defer(phone_number, areas)
+                    result["deduplicated"] += 1
+                    continue
+                for area in areas:
+                    hours, reason = self.state[area]  # Latest prediction, even for older changes
+                    text = format_alert_message(hours, reason, area)
+                    messages_by_text.setdefault(text, []).append(phone_number)
+                    keys[phone_number, text] = alert_key(
+                        phone_number, self.alerter_id, area, self.revisions.get(area, 0)
+                    )
+                recipients[phone_number] = areas
+
+            if messages_by_text:
+                failed_numbers = []
+                try:
+                    result.update(
+                        self.alert_system.dispatch_bulk(
+                            messages_by_text, failed_numbers=failed_numbers, keys=keys
+                        )
+                    )
+                except Exception as e:
+                    logger.error(f"Alert dispatch failed; alerts stay pending: {e}")
+                    failed_numbers = recipients
+                failed_numbers = set(failed_numbers)
+                for phone_number, areas in recipients.items():
+                    if phone_number in failed_numbers:
+                        self._defer(phone_number, areas)
+                    else:
+                        last_alerted[phone_number] = now
+                        result["recipients"] += 1
+                self.alerts_dispatched += result["sent"] + result.get("queued", 0)
+            result["pending"] = len(self._pending)
+        logger.info(
+            f"Alert cycle: {result['changed']} of {result['areas']} areas changed, "
+            f"{result['recipients']} recipients, {result['deduplicated']} deduplicated, "
+            f"{result['pending']} pending"
+        )
+        return result
+
+    def start(self):
+        """Starts the background alert thread."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="change-alerts", daemon=True)
+        self._thread.start()
+        logger.info(f"Change-driven alerting started (every {self.interval}s).")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=15)
+        self._thread = None
+
+    def trigger(self):
+        """Asks for a cycle as soon as possible."""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_cycle()
+            except Exception as e:
+                logger.error(f"Error in alert cycle: {e}")
+            self._wake.clear()
+            self._wake.wait(self.interval)
@@ -0,0 +1,98 @@
+# Benchmark: change-driven alert cycles against a large subscriber base.
+#
+# Subscribes --subscribers numbers across a synthetic gazetteer, primes the
+# alerter, then runs cycles in which --changed areas move by more than the
+# alert delta. Predictions come from a stub engine and SMS go to the mock
+# Infobip server, so the timings are the alerter's own: they should follow
+# the number of changed areas, not the number of subscribers.
+#
+#   python benchmarks/bench_change_alerts.py --subscribers 1000000 --changed 1 10 100
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_location_index import gazetteer  # noqa: E402
+from bench_subscribers import area_resolver  # noqa: E402
+from location_index import LocationIndex  # noqa: E402
+from mock_servers import mock_infobip_server  # noqa: E402
+
+
+class StubEngine:
+    """Serves fixed predictions; bumping ``version`` stands in for new inputs."""
+
+    def __init__(self):
+        self.version = 0
+        self.hours = {}
+
+    def input_version(self):
+        return self.version
+
+    def cluster_version(self):
+        return 0
+
+    def predict_many(self, areas):
+        return [(self.hours.get(area, 4), "Low Kariba levels") for area in areas]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=1_000_000)
+    parser.add_argument("--regions", type=int, default=10)
+    parser.add_argument("--suburbs", type=int, default=100)
+    parser.add_argument("--roads", type=int, default=10)
+    parser.add_argument("--changed", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+
+    with mock_infobip_server() as infobip:
+        os.environ["INFOBIP_SMS_URL"] = f"{infobip.url}/sms/2/text/advanced"
+        from alerting import ChangeDrivenAlerter
+        from MVP import AlertSystem
+        from subscribers import SubscriberRegistry
+
+        lines, roads = gazetteer(args.regions, args.suburbs, args.roads)
+        registry = SubscriberRegistry(resolve_area=area_resolver(LocationIndex.from_lines(lines)))
+        rng = random.Random(3)
+        start = time.perf_counter()
+        for offset in range(0, args.subscribers, 50_000):
+            registry.subscribe_many(
+                (f"+2637{i:08d}", [rng.choice(roads)], None)
+                for i in range(offset, min(offset + 50_000, args.subscribers))
+            )
+        print(f"{len(registry):,} subscribers in {time.perf_counter() - start:.1f}s")
+
+        engine = StubEngine()
+        alerts = AlertSystem(prediction_engine=engine, subscribers=registry, rate_limit=0)
+        # A dedup window of 0 so every cycle alerts everyone behind a change
+        alerter = ChangeDrivenAlerter(alerts, dedup_window=0)
+        alerter.run_cycle()  # Primes the state
+        areas = registry.areas()
+
+        start = time.perf_counter()
+        engine.version += 1
+        result = alerter.run_cycle()
+        print(f"nothing changed: {(time.perf_counter() - start) * 1e3:.1f} ms over {result['areas']:,} areas")
+        start = time.perf_counter()
+        alerter.run_cycle()
+        print(f"inputs unchanged: {(time.perf_counter() - start) * 1e6:.1f} us")
+
+        for changed in args.changed:
+            engine.version += 1
+            for area in rng.sample(areas, changed):
+                engine.hours[area] = engine.hours.get(area, 4) + 2
+            start = time.perf_counter()
+            result = alerter.run_cycle()
+            elapsed = time.perf_counter() - start
+            print(
+                f"{result['changed']:>4} areas changed: {elapsed * 1e3:8.1f} ms, "
+                f"{result['recipients']:,} alerted in {result['requests']} requests"
+            )
+        print(f"mock Infobip saw {infobip.stats['destinations']:,} destinations")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Benchmark: ZPC generation bulletin parsing throughput.
+#
+# Replicates the bulletins in fixtures/zpc_bulletins.txt into a corpus of
+# --bulletins entries, then times the previous token-scanning parser, the
+# compiled parser one bulletin at a time, and the columnar backfill.
+#
+#   python benchmarks/bench_generation_parser.py --bulletins 20000
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generation_parser import (  # noqa: E402
+    parse_generation_bulletins,
+    parse_generation_data,
+    split_bulletins,
+)
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "zpc_bulletins.txt")
+
+
+def legacy_parse_generation_data(text):
+    """The line/token scanner parse_generation_data used to be, for comparison."""
+    generation_data = {}
+    for line in text.split("\n"):
+        for station, markers in (
+            ("Hwange", ("Hwange",)),
+            ("Kariba", ("Kariba",)),
+            ("IPPS", ("IPPS", "IPPs")),
+            ("TOTAL", ("TOTAL",)),
+        ):
+            if any(marker in line for marker in markers):
+                for part in line.split():
+                    if "MW" in part:
+                        generation_data[station] = part.replace(",", "")
+                break
+    return generation_data
+
+
+def rate(func, corpus):
+    start = time.perf_counter()
+    func(corpus)
+    elapsed = time.perf_counter() - start
+    return len(corpus) / elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bulletins", type=int, default=20000)
+    args = parser.parse_args()
+
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        samples = split_bulletins(f.read())
+    corpus = (samples * (args.bulletins // len(samples) + 1))[: args.bulletins]
+
+    print(f"{len(samples)} fixture bulletins, corpus of {len(corpus):,}")
+    for sample in samples:
+        print(f"  legacy {legacy_parse_generation_data(sample)}")
+        print(f"  new    {parse_generation_data(sample)}")
+
+    cases = {
+        "legacy": lambda texts: [legacy_parse_generation_data(text) for text in texts],
+        "compiled": lambda texts: [parse_generation_data(text) for text in texts],
+        "columnar": parse_generation_bulletins,
+    }
+    for label, func in cases.items():
+        per_second, elapsed = rate(func, corpus)
+        print(f"{label:>10}: {per_second:10,.0f} bulletins/s ({elapsed:.2f}s)")
+
+    table = parse_generation_bulletins(corpus)
+    print(f"table: {table.shape[0]:,} rows, columns {list(table.columns)}")
+
+
+if __name__ == "__main__":
+    main()
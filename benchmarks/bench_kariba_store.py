@@ -0,0 +1,109 @@
+# Benchmark: Kariba store load and append costs at 10k, 100k and 1M rows.
+#
+# Compares each kariba_store backend against the original approach of parsing
+# every date with a per-row apply() and rewriting the whole CSV per fetch.
+#
+#   python benchmarks/bench_kariba_store.py --rows 10000 100000 1000000
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from kariba_store import STORE_BACKENDS, open_kariba_store  # noqa: E402
+
+
+def synthetic_history(rows):
+    """Hourly Kariba levels ending now."""
+    dates = pd.date_range(end=pd.Timestamp.now().floor("h"), periods=rows, freq="h")
+    rng = np.random.default_rng(42)
+    level = 478 + np.cumsum(rng.normal(0, 0.001, rows))
+    return pd.DataFrame(
+        {"date": dates, "level": level, "percent_full": (level - 475.5) * 7}
+    )
+
+
+def legacy_parse(date_str):
+    try:
+        return pd.to_datetime(date_str, format="%d/%m/%Y %H:%M", dayfirst=True)
+    except ValueError:
+        try:
+            return pd.to_datetime(date_str, format="%d/%m/%Y", dayfirst=True)
+        except ValueError:
+            return pd.NaT
+
+
+def bench_legacy(data_dir, history):
+    path = os.path.join(data_dir, "legacy.csv")
+    history.to_csv(path, index=False, date_format="%d/%m/%Y %H:%M")
+
+    start = time.perf_counter()
+    data = pd.read_csv(path)
+    data["date"] = data["date"].apply(legacy_parse)
+    data = data.dropna(subset=["date"])
+    load = time.perf_counter() - start
+
+    new_row = pd.DataFrame(
+        [{"date": data["date"].iloc[-1] + pd.Timedelta(hours=1), "level": 478.0, "percent_full": 17.5}]
+    )
+    start = time.perf_counter()
+    data = pd.concat([data, new_row]).drop_duplicates(subset=["date"], keep="last").reset_index(drop=True)
+    data.to_csv(path, index=False)
+    append = time.perf_counter() - start
+    return load, append
+
+
+def bench_backend(data_dir, backend, history):
+    store = open_kariba_store(data_dir, backend)
+    store._rewrite(history)
+
+    start = time.perf_counter()
+    data = store.load()
+    load = time.perf_counter() - start
+    assert len(data) == len(history)
+
+    next_date = data["date"].iloc[-1] + pd.Timedelta(hours=1)
+    start = time.perf_counter()
+    store.upsert([{"date": next_date, "level": 478.0, "percent_full": 17.5}])
+    append = time.perf_counter() - start
+    return load, append
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument(
+        "--legacy-max-rows", type=int, default=100_000,
+        help="Skip the (slow) legacy apply() parse above this size",
+    )
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'backend':>8} {'load ms':>10} {'append ms':>10}")
+    for rows in args.rows:
+        history = synthetic_history(rows)
+        if rows <= args.legacy_max_rows:
+            data_dir = tempfile.mkdtemp(prefix="kariba-bench-")
+            load, append = bench_legacy(data_dir, history)
+            shutil.rmtree(data_dir)
+            print(f"{rows:>9} {'legacy':>8} {load * 1000:>10.1f} {append * 1000:>10.1f}")
+        for backend in STORE_BACKENDS:
+            data_dir = tempfile.mkdtemp(prefix="kariba-bench-")
+            try:
+                load, append = bench_backend(data_dir, backend, history)
+            except ImportError as e:
+                print(f"{rows:>9} {backend:>8} skipped: {e}")
+                continue
+            finally:
+                shutil.rmtree(data_dir)
+            print(f"{rows:>9} {backend:>8} {load * 1000:>10.1f} {append * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
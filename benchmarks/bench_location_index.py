@@ -0,0 +1,92 @@
+# Benchmark: location resolver lookups against a synthetic gazetteer.
+#
+# Builds --regions regions x --suburbs suburbs x --roads roads, then times
+# exact, abbreviated and misspelt lookups with the LRU cache bypassed.
+#
+#   python benchmarks/bench_location_index.py --regions 10 --suburbs 200 --roads 20
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from location_index import LocationIndex  # noqa: E402
+
+# Consonant-vowel syllables plus a few Shona/Ndebele clusters, so synthetic
+# names have roughly the trigram variety of real place names.
+SYLLABLES = [c + v for c in "bcdfghjklmnprstvwyz" for v in "aeiou"] + [
+    "mba", "mbe", "chi", "dza", "nya", "zvi", "tsa", "ngo", "hwa", "bvu",
+]
+ROAD_TYPES = ["Road", "Avenue", "Drive", "Street", "Close", "Crescent"]
+SHORT = {"Road": "Rd", "Avenue": "Ave", "Drive": "Dr", "Street": "St", "Close": "Cl", "Crescent": "Cres"}
+
+
+def word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+
+
+def gazetteer(regions, suburbs, roads, seed=1):
+    rng = random.Random(seed)
+    lines, road_names = [], []
+    for _ in range(regions):
+        lines.append(f"{word(rng)} Region")
+        for _ in range(suburbs):
+            lines.append(word(rng))
+            for _ in range(roads):
+                name = f"{word(rng)} {rng.choice(ROAD_TYPES)}"
+                lines.append(name)
+                road_names.append(name)
+    return lines, road_names
+
+
+def typo(rng, text):
+    i = rng.randrange(1, len(text) - 1)
+    return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+
+
+def time_lookups(index, queries):
+    start = time.perf_counter()
+    hits = sum(1 for query in queries if index._resolve(query) is not None)
+    return (time.perf_counter() - start) / len(queries) * 1e6, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--regions", type=int, default=10)
+    parser.add_argument("--suburbs", type=int, default=200)
+    parser.add_argument("--roads", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    lines, roads = gazetteer(args.regions, args.suburbs, args.roads)
+    start = time.perf_counter()
+    index = LocationIndex.from_lines(lines)
+    print(f"built index of {len(index):,} entries in {time.perf_counter() - start:.2f}s")
+
+    rng = random.Random(2)
+    sample = [rng.choice(roads) for _ in range(args.queries)]
+    cases = {
+        "exact": [name.upper() + "  " for name in sample],
+        "abbreviated": [
+            name.rsplit(" ", 1)[0] + " " + SHORT[name.rsplit(" ", 1)[1]] for name in sample
+        ],
+        "misspelt": [typo(rng, name) for name in sample],
+    }
+    for label, queries in cases.items():
+        micros, hits = time_lookups(index, queries)
+        print(f"{label:>12}: {micros:8.1f} us/lookup, {hits}/{len(queries)} resolved")
+
+    for query in cases["misspelt"]:
+        index.resolve(query)  # Warm the cache
+    start = time.perf_counter()
+    for query in cases["misspelt"]:
+        index.resolve(query)
+    cached = (time.perf_counter() - start) / len(sample) * 1e6
+    print(f"{'cached':>12}: {cached:8.1f} us/lookup (after warm-up)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# Benchmark: cost of the metrics instrumentation.
+#
+# Times each primitive (stage timer, upstream counter, histogram observe),
+# then the instrumentation a cached prediction pays (one "prediction" stage
+# around a location normalize and cache lookup) against the same work
+# uninstrumented, single-threaded and from --threads threads. Finally times
+# rendering /metrics.
+#
+#   python benchmarks/bench_metrics_overhead.py --iterations 200000 --threads 8
+
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from location_index import normalize_location  # noqa: E402
+from metrics import REGISTRY, STAGE_SECONDS, stage, upstream  # noqa: E402
+from prediction_cache import PredictionCache  # noqa: E402
+
+LOCATIONS = ["Ridgeview", "Eastcourt Rd", "Samora Machel Ave", "Borrowdale", "Avondale"]
+
+
+def per_call(func, iterations):
+    start = time.perf_counter()
+    func(iterations)
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+def timer_loop(n):
+    for _ in range(n):
+        with stage("bench"):
+            pass
+
+
+def counter_loop(n):
+    for _ in range(n):
+        upstream("bench", True)
+
+
+def observe_loop(n):
+    child = STAGE_SECONDS.labels("bench_observe")
+    for _ in range(n):
+        child.observe(0.003)
+
+
+def make_request_loops(cache):
+    version = ("v",)
+    for location in LOCATIONS:
+        cache.put(normalize_location(location), version, (6, "Low Kariba Water Levels"))
+
+    def bare(n):
+        for i in range(n):
+            cache.get(normalize_location(LOCATIONS[i % 5]), version)
+
+    def instrumented(n):
+        for i in range(n):
+            with stage("prediction"):
+                cache.get(normalize_location(LOCATIONS[i % 5]), version)
+
+    return bare, instrumented
+
+
+def threaded(func, iterations, threads):
+    share = iterations // threads
+    workers = [threading.Thread(target=func, args=(share,)) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (share * threads) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+    n = args.iterations
+
+    timer_ns = per_call(timer_loop, n)
+    observe_ns = per_call(observe_loop, n)
+    print("primitives (ns/call):")
+    print(f"  stage timer       {timer_ns:8.0f}")
+    print(f"  upstream counter  {per_call(counter_loop, n):8.0f}")
+    print(f"  histogram observe {observe_ns:8.0f}")
+    # An uncached /report-outage pays the HTTP observe plus four stage timers
+    print(f"  per uncached request: {(4 * timer_ns + observe_ns) / 1000:.1f} us")
+
+    bare, instrumented = make_request_loops(PredictionCache(clock=time.monotonic))
+    bare_ns = per_call(bare, n)
+    instrumented_ns = per_call(instrumented, n)
+    print("cached prediction (ns/request):")
+    print(
+        f"  1 thread : bare {bare_ns:8.0f}  instrumented {instrumented_ns:8.0f}  "
+        f"overhead {instrumented_ns - bare_ns:6.0f} ({(instrumented_ns / bare_ns - 1) * 100:.1f}%)"
+    )
+    bare_ns = threaded(bare, n, args.threads)
+    instrumented_ns = threaded(instrumented, n, args.threads)
+    print(
+        f"  {args.threads} threads: bare {bare_ns:8.0f}  instrumented {instrumented_ns:8.0f}  "
+        f"overhead {instrumented_ns - bare_ns:6.0f} ({(instrumented_ns / bare_ns - 1) * 100:.1f}%)"
+    )
+
+    for name in ["data_load", "kariba_fetch", "generation_lookup", "rule_evaluation", "sms_send"]:
+        with stage(name):
+            pass
+    start = time.perf_counter()
+    text = REGISTRY.render()
+    print(f"render /metrics: {(time.perf_counter() - start) * 1e3:.2f} ms, {len(text.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    main()
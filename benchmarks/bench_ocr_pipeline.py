@@ -0,0 +1,105 @@
+# Benchmark: OCR pipeline over rendered bulletin images.
+#
+# Renders every bulletin in fixtures/zpc_bulletins.txt to a PNG under
+# fixtures/ocr/ (alternating dark-on-light and light-on-dark, as ZPC posts
+# both), then OCRs them with one worker, with --workers workers, and again
+# from the warm cache. Parsed figures are checked against the parser's
+# reading of the source text. Needs Pillow, pytesseract and the tesseract
+# binary.
+#
+#   python benchmarks/bench_ocr_pipeline.py --workers 4 --copies 4
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFont  # noqa: E402
+
+from generation_parser import parse_generation_data, split_bulletins  # noqa: E402
+from ocr_pipeline import OcrPipeline  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE = os.path.join(HERE, "fixtures", "zpc_bulletins.txt")
+IMAGE_DIR = os.path.join(HERE, "fixtures", "ocr")
+
+
+def load_font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has no sized default font
+        return ImageFont.load_default()
+
+
+def render_bulletin(text, path, dark=False, font_size=28):
+    font = load_font(font_size)
+    lines = text.splitlines()
+    width = 60 + max(int(font.getlength(line)) for line in lines)
+    height = 60 + len(lines) * int(font_size * 1.5)
+    background, ink = ("#12306b", "white") if dark else ("white", "black")
+    image = Image.new("RGB", (width + 200, height + 150), background)  # Room for the crop to find
+    draw = ImageDraw.Draw(image)
+    for row, line in enumerate(lines):
+        draw.text((130, 100 + row * int(font_size * 1.5)), line, fill=ink, font=font)
+    image.save(path)
+
+
+def build_fixtures():
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        bulletins = split_bulletins(f.read())
+    os.makedirs(IMAGE_DIR, exist_ok=True)
+    fixtures = []
+    for i, text in enumerate(bulletins):
+        path = os.path.join(IMAGE_DIR, f"bulletin_{i}.png")
+        render_bulletin(text, path, dark=i % 2 == 1)
+        with open(path, "rb") as f:
+            fixtures.append((f.read(), parse_generation_data(text)))
+    return fixtures
+
+
+def timed(pipeline, images):
+    start = time.perf_counter()
+    texts = pipeline.ocr_many(images)
+    return time.perf_counter() - start, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--copies", type=int, default=4, help="Distinct re-encodings of each fixture")
+    args = parser.parse_args()
+
+    fixtures = build_fixtures()
+    # Re-encode each image a few times so the cold runs see distinct bytes
+    images, expected = [], []
+    for copy in range(args.copies):
+        for data, figures in fixtures:
+            images.append(data + b"\0" * copy)  # Trailing bytes: same picture, new hash
+            expected.append(figures)
+    print(f"{len(fixtures)} fixture images in {IMAGE_DIR}, {len(images)} OCR jobs")
+
+    for workers in (1, args.workers):
+        pipeline = OcrPipeline(workers=workers)
+        elapsed, texts = timed(pipeline, images)
+        correct = sum(
+            1 for text, figures in zip(texts, expected) if text and parse_generation_data(text) == figures
+        )
+        print(
+            f"{workers:>2} workers: {len(images) / elapsed:6.1f} images/s ({elapsed:.2f}s), "
+            f"{correct}/{len(images)} parsed exactly"
+        )
+        if workers == 1:
+            for text, figures in zip(texts[: len(fixtures)], expected):
+                got = parse_generation_data(text or "")
+                if got != figures:
+                    print(f"  mismatch: expected {figures}, got {got}")
+        else:
+            elapsed, _ = timed(pipeline, images)
+            print(f"  warm cache: {len(images) / elapsed:,.0f} images/s, {pipeline.stats()}")
+        pipeline.close()
+
+
+if __name__ == "__main__":
+    main()
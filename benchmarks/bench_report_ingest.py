@@ -0,0 +1,78 @@
+# Benchmark: sustained outage-report ingestion rate.
+#
+# --producers threads submit reports as fast as the store accepts them for
+# --seconds, then the store is closed (flushing the queue) and the stored row
+# count is checked against the accepted count.
+#
+#   python benchmarks/bench_report_ingest.py --producers 8 --seconds 10
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from report_store import OutageReportStore, ReportQueueFull  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--producers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--max-queue", type=int, default=10000)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="zirrmi-reports-")
+    store = OutageReportStore(
+        os.path.join(data_dir, "reports.db"),
+        batch_size=args.batch_size,
+        max_queue=args.max_queue,
+    )
+    store.start()
+
+    accepted = [0] * args.producers
+    rejected = [0] * args.producers
+    deadline = time.perf_counter() + args.seconds
+
+    def produce(worker):
+        i = 0
+        while time.perf_counter() < deadline:
+            try:
+                store.submit(
+                    f"Suburb {i % 500}", "No power since 6am", f"2637{worker:02d}{i:06d}",
+                    timeout=0.01,
+                )
+                accepted[worker] += 1
+            except ReportQueueFull:
+                rejected[worker] += 1
+            i += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=produce, args=(w,)) for w in range(args.producers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.close()
+    elapsed = time.perf_counter() - start
+
+    stored = store.count()
+    total = sum(accepted)
+    print(
+        f"accepted={total} rejected={sum(rejected)} stored={stored} "
+        f"batches={store.batches} in {elapsed:.2f}s"
+    )
+    print(f"{stored / elapsed:,.0f} reports/s sustained, {stored / max(store.batches, 1):.0f} per commit")
+    shutil.rmtree(data_dir)
+    if stored != total:
+        print("FAIL: accepted reports were lost")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
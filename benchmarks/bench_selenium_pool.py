@@ -0,0 +1,52 @@
+# Benchmark: pooled vs. fresh Chrome sessions for the tweet scraper.
+#
+# Serves benchmarks/fixtures/zpc_timeline.html on localhost and scrapes it
+# --scrapes times through the shared browser pool, then the same number of
+# times launching a fresh browser per scrape. Needs Chrome and chromedriver
+# (set CHROMEDRIVER_PATH to skip webdriver-manager).
+#
+#   python benchmarks/bench_selenium_pool.py --scrapes 20
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import MVP  # noqa: E402
+from browser_pool import BrowserSessionPool  # noqa: E402
+from mock_servers import static_fixture_server  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def run(label, scrapes, base_url):
+    start = time.perf_counter()
+    found = 0
+    for _ in range(scrapes):
+        text = MVP.get_latest_zpc_generation_tweet_text_selenium(
+            "zpc_timeline.html", base_url=base_url
+        )
+        found += text is not None
+    elapsed = time.perf_counter() - start
+    print(f"{label:>7}: {elapsed / scrapes * 1000:8.0f} ms/scrape, {found}/{scrapes} found")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scrapes", type=int, default=10)
+    args = parser.parse_args()
+
+    with static_fixture_server(FIXTURES) as fixture:
+        MVP._browser_pool = BrowserSessionPool(size=1, max_uses=1000)
+        run("pooled", args.scrapes, fixture.url)
+        MVP.close_browser_pool()
+
+        MVP._browser_pool = BrowserSessionPool(size=1, max_uses=1)  # Fresh browser each time
+        run("fresh", args.scrapes, fixture.url)
+        MVP.close_browser_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# Benchmark: durable SMS outbox throughput and crash recovery.
+#
+# Throughput: queues --messages SMS, starts --workers outbox workers against
+# the mock Infobip server (with --failure-rate injected 503s) and times how
+# long the outbox takes to drain.
+#
+# Crash recovery (--crash): a child process queues the messages and starts
+# sending, and is killed with SIGKILL after --kill-after seconds. A fresh
+# outbox then opens the same database and drains it. Every message must
+# reach the mock exactly once by messageId, except the ones in flight at the
+# kill, which may arrive twice under the same id.
+#
+#   python benchmarks/bench_sms_outbox.py --messages 20000 --workers 4 --failure-rate 0.05
+#   python benchmarks/bench_sms_outbox.py --crash --messages 5000 --latency 0.05
+
+import argparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_servers import mock_infobip_server  # noqa: E402
+
+
+class NoEngine:
+    """The outbox only needs AlertSystem's Infobip session, not predictions."""
+
+
+def open_outbox(db_path, args):
+    import MVP
+    from sms_outbox import SmsOutbox
+
+    alerts = MVP.AlertSystem(prediction_engine=NoEngine(), rate_limit=0)
+    return SmsOutbox(
+        alerts.post_infobip_once,
+        db_path,
+        workers=args.workers,
+        batch_size=args.batch,
+        backoff_base=0.05,
+        backoff_max=1.0,
+        poll_interval=0.05,
+    )
+
+
+def queue_messages(outbox, count):
+    return outbox.enqueue_many(
+        (f"+2637{i:08d}", f"Alert: test message {i % 50}", f"bench-{i}") for i in range(count)
+    )
+
+
+def run_child(args):
+    outbox = open_outbox(args.db, args)
+    queue_messages(outbox, args.messages)
+    outbox.start()
+    time.sleep(3600)  # Until the parent kills us
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=100, help="messages per Infobip request")
+    parser.add_argument("--latency", type=float, default=0.02, help="mock Infobip latency (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--crash", action="store_true", help="kill a sending process and recover")
+    parser.add_argument("--kill-after", type=float, default=1.0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        return run_child(args)
+
+    data_dir = tempfile.mkdtemp(prefix="zirrmi-outbox-")
+    db_path = os.path.join(data_dir, "sms_outbox.db")
+    with mock_infobip_server(delay=args.latency, failure_rate=args.failure_rate) as infobip:
+        os.environ["INFOBIP_SMS_URL"] = f"{infobip.url}/sms/2/text/advanced"
+        if args.crash:
+            child = subprocess.Popen(
+                [sys.executable, __file__, "--child", "--db", db_path,
+                 "--messages", str(args.messages), "--workers", str(args.workers),
+                 "--batch", str(args.batch)],
+                env={**os.environ, "LOG_LEVEL": "WARNING"},
+            )
+            time.sleep(args.kill_after)
+            child.send_signal(signal.SIGKILL)
+            child.wait()
+            before = infobip.stats["destinations"]
+            print(f"killed sender after {args.kill_after}s with {before:,} delivered")
+
+        outbox = open_outbox(db_path, args)
+        if not args.crash:
+            queue_messages(outbox, args.messages)
+        start = time.perf_counter()
+        outbox.start()
+        drained = outbox.wait_until_drained(timeout=600)
+        elapsed = time.perf_counter() - start
+        outbox.stop()
+        counts = outbox.counts()
+
+    print(f"{counts} in {elapsed:.2f}s ({counts['sent'] / elapsed:,.0f} msg/s), "
+          f"{outbox.retried} retries")
+    print(f"mock saw {infobip.stats}")
+    missing = [f"bench-{i}" for i in range(args.messages) if f"bench-{i}" not in infobip.delivered]
+    shutil.rmtree(data_dir)
+    if not drained or missing:
+        print(f"FAIL: {len(missing)} messages never reached Infobip")
+        sys.exit(1)
+    if infobip.stats["duplicates"] > (args.workers * args.batch if args.crash else 0):
+        print("FAIL: more duplicates than messages that can be in flight")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# Benchmark: subscriber registry at a million subscribers.
+#
+# Subscribes --subscribers numbers to one or two places each from a synthetic
+# gazetteer, reloads the index from SQLite, then times recipient lookups for
+# roads and whole regions and reports the index's memory footprint.
+#
+#   python benchmarks/bench_subscribers.py --subscribers 1000000
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_location_index import gazetteer  # noqa: E402
+from location_index import LocationIndex, normalize_location  # noqa: E402
+from subscribers import SubscriberRegistry  # noqa: E402
+
+
+def area_resolver(index):
+    """Same (location key, region) contract as PowerOutagePrediction.cluster_area."""
+
+    def resolve(location):
+        match = index.resolve(location)
+        if match is None:
+            return normalize_location(location), None
+        if match.kind == "region":
+            return None, match.name
+        return match.key, match.region
+
+    return resolve
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--subscribers", type=int, default=1_000_000)
+    parser.add_argument("--regions", type=int, default=10)
+    parser.add_argument("--suburbs", type=int, default=100)
+    parser.add_argument("--roads", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=1000)
+    args = parser.parse_args()
+
+    lines, roads = gazetteer(args.regions, args.suburbs, args.roads)
+    index = LocationIndex.from_lines(lines)
+    regions = [line for line in lines if line.endswith("Region")]
+    resolve = area_resolver(index)
+
+    rng = random.Random(7)
+    rows = []
+    for i in range(args.subscribers):
+        places = [rng.choice(roads)]
+        if rng.random() < 0.2:
+            places.append(rng.choice(regions))
+        quiet = (22, 6) if rng.random() < 0.3 else None
+        rows.append((f"+2637{i:08d}", places, quiet))
+
+    data_dir = tempfile.mkdtemp(prefix="zirrmi-subscribers-")
+    db_path = os.path.join(data_dir, "subscribers.db")
+    registry = SubscriberRegistry(db_path, resolve_area=resolve)
+    start = time.perf_counter()
+    for offset in range(0, len(rows), 50_000):
+        registry.subscribe_many(rows[offset:offset + 50_000])
+    print(f"subscribe_many: {args.subscribers:,} in {time.perf_counter() - start:.1f}s")
+    registry.close()
+
+    start = time.perf_counter()
+    registry = SubscriberRegistry(db_path, resolve_area=resolve)
+    print(f"load from SQLite: {time.perf_counter() - start:.1f}s")
+    stats = registry.stats()
+    print(
+        f"{stats['subscribers']:,} subscribers, {stats['postings']:,} postings, "
+        f"index {stats['index_bytes'] / 2**20:.1f} MiB "
+        f"({stats['index_bytes'] / max(stats['subscribers'], 1):.1f} bytes/subscriber)"
+    )
+
+    for label, names in (("road", roads), ("region", regions)):
+        queries = [rng.choice(names) for _ in range(args.queries)]
+        found = 0
+        start = time.perf_counter()
+        for name in queries:
+            found += len(registry.recipients(name, hour=12))
+        elapsed = time.perf_counter() - start
+        print(
+            f"recipients({label}): {elapsed / len(queries) * 1e3:.3f} ms/query, "
+            f"{found / len(queries):,.0f} recipients/query, "
+            f"{elapsed / max(found, 1) * 1e9:.0f} ns/recipient"
+        )
+
+    registry.close()
+    shutil.rmtree(data_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# Benchmark: historical ZRA backfill against a local fixture site.
+#
+# Writes --years of daily multi-station lake-level pages (a few dates left
+# out, as on the real site), serves them with --latency per request, and
+# runs the backfill. The first run is cancelled after --interrupt-after
+# seconds; the second must resume from the checkpoint, and together they
+# must load every Kariba reading exactly once.
+#
+#   python benchmarks/bench_zra_backfill.py --years 10 --concurrency 16 --latency 0.05
+
+import argparse
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mock_servers import static_fixture_server  # noqa: E402
+from zra_backfill import ZraBackfill, date_range  # noqa: E402
+
+# Table row of each station; Kariba is row_7 as on the live page
+STATIONS = {"Victoria Falls": 1, "Kariba": 7, "Kafue Gorge": 8, "Itezhi-Tezhi": 9}
+
+
+def write_site(site_dir, dates):
+    """Writes one page per date; returns the Kariba levels written, by date."""
+    os.makedirs(os.path.join(site_dir, "lake-levels"))
+    expected = {}
+    for day, date in enumerate(dates):
+        if day % 37 == 5:
+            continue  # No bulletin that day: the site answers 404
+        rows = []
+        for station, number in STATIONS.items():
+            level = round(470 + number + (day % 365) / 100, 2)
+            rows.append(
+                f'<tr><td class="row_{number} col_0">{station}</td>'
+                f'<td class="row_{number} col_1">{level}</td>'
+                f'<td class="row_{number} col_2">{round(level - 465, 2)} %</td></tr>'
+            )
+            if station == "Kariba":
+                expected[date] = level
+        page = f"<html><body><h1>Lake levels {date}</h1><table>{''.join(rows)}</table></body></html>"
+        with open(os.path.join(site_dir, "lake-levels", f"{date.isoformat()}.html"), "w") as f:
+            f.write(page)
+    return expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05, help="fixture site latency (s)")
+    parser.add_argument("--chunk-days", type=int, default=90)
+    parser.add_argument("--interrupt-after", type=float, default=2.0)
+    args = parser.parse_args()
+
+    end = datetime.date(2024, 12, 31)
+    start = end - datetime.timedelta(days=365 * args.years - 1)
+    dates = date_range(start, end)
+    work_dir = tempfile.mkdtemp(prefix="zirrmi-backfill-")
+    site_dir, data_dir = os.path.join(work_dir, "site"), os.path.join(work_dir, "data")
+    expected = write_site(site_dir, dates)
+    print(f"fixture site: {len(dates):,} days, {len(expected):,} pages, {len(STATIONS)} stations each")
+
+    with static_fixture_server(site_dir, delay=args.latency) as site:
+        template = site.url + "/lake-levels/{date}.html"
+
+        def backfill():
+            return ZraBackfill(
+                data_dir, template, concurrency=args.concurrency, chunk_days=args.chunk_days
+            )
+
+        first = backfill()
+        timer = threading.Timer(args.interrupt_after, first.cancel)
+        timer.start()
+        t0 = time.perf_counter()
+        summary = first.run(start, end)
+        timer.cancel()
+        print(f"interrupted run: {summary} in {time.perf_counter() - t0:.1f}s")
+
+        t1 = time.perf_counter()
+        summary = backfill().run(start, end)
+        print(f"resumed run:     {summary} in {time.perf_counter() - t1:.1f}s")
+        total = time.perf_counter() - t0
+
+    stored = backfill().store.load()
+    levels = dict(zip(stored["date"].dt.date, stored["level"]))
+    print(
+        f"{len(stored):,} Kariba rows in {total:.1f}s "
+        f"({len(expected) / total:,.0f} pages/s, {args.years} years)"
+    )
+    shutil.rmtree(work_dir)
+    if not summary["completed"] or levels != expected:
+        print("FAIL: stored history does not match the fixture site")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Benchmark: ZRA lake-level page parsing and fetching, before and after.
+#
+# "before" is the original scraper: a fresh requests.get() and a full
+# html.parser BeautifulSoup parse on every call. "after" is ZraClient: one
+# pooled session, conditional requests, and a targeted row_7 scan that only
+# runs when the page body changed. The mock page is padded with --padding
+# filler rows to roughly the size of the real one.
+#
+#   python benchmarks/bench_zra_fetch.py --padding 200 --fetches 200
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+from bs4 import BeautifulSoup  # noqa: E402
+
+from mock_servers import mock_zra_server, zra_page  # noqa: E402
+from zra_client import SOUP_PARSER, ZraClient, extract_row7, extract_row7_soup  # noqa: E402
+
+
+def parse_before(content):
+    soup = BeautifulSoup(content, "html.parser")
+    level = soup.find("td", class_="row_7 col_1")
+    percent = soup.find("td", class_="row_7 col_2")
+    return level.text.strip(), percent.text.strip()
+
+
+def fetch_before(url):
+    response = requests.get(url, timeout=10)
+    response.raise_for_status()
+    return parse_before(response.content)
+
+
+def per_call(func, arg, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func(arg)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--padding", type=int, default=200, help="filler rows around the Kariba row")
+    parser.add_argument("--parses", type=int, default=200)
+    parser.add_argument("--fetches", type=int, default=200)
+    args = parser.parse_args()
+
+    content = zra_page(padding=args.padding).encode()
+    print(f"page size: {len(content) / 1024:.0f} KiB")
+    assert tuple(extract_row7(content)) == parse_before(content)
+
+    before = per_call(parse_before, content, args.parses)
+    soup = per_call(extract_row7_soup, content, args.parses)
+    scan = per_call(extract_row7, content, args.parses * 10)
+    print(f"parse html.parser soup (before): {before * 1e3:8.3f} ms")
+    print(f"parse {SOUP_PARSER} soup (fallback):  {soup * 1e3:8.3f} ms")
+    print(f"parse row_7 scan (after):       {scan * 1e3:8.3f} ms  ({before / scan:,.0f}x faster)")
+
+    for validators in (True, False):
+        with mock_zra_server(padding=args.padding, validators=validators) as zra:
+            label = "304s" if validators else "same-hash 200s"
+            old = per_call(fetch_before, zra.url, args.fetches)
+            client = ZraClient()
+            client.fetch(zra.url)  # First fetch parses and stores the validators
+            new = per_call(client.fetch, zra.url, args.fetches)
+            print(
+                f"fetch with {label:<15} before {old * 1e3:7.2f} ms, after {new * 1e3:7.2f} ms "
+                f"({old / new:.1f}x), outcomes {client.outcomes}"
+            )
+
+
+if __name__ == "__main__":
+    main()
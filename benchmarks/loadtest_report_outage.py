@@ -0,0 +1,112 @@
+# Load test: /report-outage must keep answering while the ZRA fetch hangs.
+#
+# Starts a mock ZRA server that stalls for --hang seconds, points the shared
+# engine at it with a stale Kariba history so the first request triggers a
+# fetch, then fires --requests concurrent reports and prints latency stats.
+#
+#   python benchmarks/loadtest_report_outage.py --requests 200 --concurrency 50
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn  # noqa: E402
+
+import MVP  # noqa: E402
+import server  # noqa: E402
+from mock_servers import mock_zra_server  # noqa: E402
+
+
+def write_stale_data(data_dir):
+    """Writes a Kariba history that ends yesterday so a ZRA fetch is due."""
+    with open(os.path.join(data_dir, "kariba_levels.csv"), "w") as f:
+        f.write("date,level,percent_full\n")
+        f.write("01/01/2020,476.91,9.73\n")
+    with open(os.path.join(data_dir, "power_data.txt"), "w") as f:
+        f.write("Kariba: 485MW\nHwange: 675MW\nIPPS: 84MW\n")
+    with open(os.path.join(data_dir, "locations.txt"), "w") as f:
+        f.write("Harare Region\nRidgeview\n")
+
+
+def post_report(url, location):
+    body = json.dumps({"location": location, "details": "load test"}).encode()
+    request = urllib.request.Request(
+        url, data=body, headers={"Content-Type": "application/json"}
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=60) as response:
+        response.read()
+        status = response.status
+    return time.perf_counter() - start, status
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--hang", type=float, default=20.0, help="ZRA stall in seconds")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="zirrmi-load-")
+    write_stale_data(data_dir)
+
+    with mock_zra_server(delay=args.hang) as zra:
+        engine = MVP.start_prediction_engine(
+            data_dir, reload_interval=None, refresh_interval=None
+        )
+        engine.kariba_collector.zra_url = zra.url
+
+        config = uvicorn.Config(server.app, host="127.0.0.1", port=args.port, log_level="warning")
+        uv = uvicorn.Server(config)
+        thread = threading.Thread(target=uv.run, daemon=True)
+        thread.start()
+        while not uv.started:
+            time.sleep(0.05)
+
+        url = f"http://127.0.0.1:{args.port}/report-outage"
+        # The first report triggers the hung ZRA fetch; don't wait for it.
+        hung = ThreadPoolExecutor(max_workers=1).submit(post_report, url, "Harare")
+        time.sleep(0.5)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda i: post_report(url, "Ridgeview"), range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+        latencies = [latency for latency, _ in results]
+        ok = sum(1 for _, status in results if status == 200)
+        print(f"{ok}/{args.requests} OK in {elapsed:.2f}s ({args.requests / elapsed:.1f} req/s)")
+        print(
+            f"p50={percentile(latencies, 50) * 1000:.1f}ms "
+            f"p95={percentile(latencies, 95) * 1000:.1f}ms "
+            f"p99={percentile(latencies, 99) * 1000:.1f}ms "
+            f"mean={statistics.mean(latencies) * 1000:.1f}ms"
+        )
+        print(f"Hung ZRA request still pending during run: {not hung.done()}")
+        if elapsed >= args.hang:
+            print("FAIL: requests were blocked behind the hung ZRA fetch")
+            sys.exit(1)
+
+        uv.should_exit = True
+        thread.join(timeout=5)
+        MVP.stop_prediction_engine()
+
+
+if __name__ == "__main__":
+    main()
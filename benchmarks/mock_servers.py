@@ -0,0 +1,273 @@
+# Local stand-ins for the upstream services the engine talks to.
+# Each server runs on 127.0.0.1 in a background thread so benchmarks and
+# load tests never touch the real ZRA, Twitter or Infobip endpoints.
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+ZRA_PAGE_TEMPLATE = """<html><body>{padding}<table>
+<tr><td class="row_7 col_0">Kariba</td><td class="row_7 col_1">{level}</td><td class="row_7 col_2">{percent} %</td></tr>
+</table>{padding}</body></html>"""
+
+ZRA_PADDING_ROW = (
+    '<tr><td class="pad col_0"><a href="/hydrology/station/{i}">Station {i}</a></td>'
+    '<td class="pad col_1">{i}.00</td><td class="pad col_2"><span>{i} %</span></td></tr>\n'
+)
+
+
+def zra_page(level=476.91, percent=9.73, padding=0):
+    """
+    Renders a ZRA lake-levels page.
+
+    Args:
+        padding (int, optional): Filler table rows before and after the Kariba
+            row, to bring the page up to the size of the real one. Defaults to 0.
+    """
+    filler = ""
+    if padding:
+        filler = "<table>\n" + "".join(ZRA_PADDING_ROW.format(i=i) for i in range(padding)) + "</table>"
+    return ZRA_PAGE_TEMPLATE.format(level=level, percent=percent, padding=filler)
+
+
+class MockServer:
+    """Runs a ThreadingHTTPServer with the given handler class in a daemon thread."""
+
+    def __init__(self, handler_class):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler_class)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def mock_zra_server(level=476.91, percent=9.73, delay=0.0, padding=0, validators=True):
+    """
+    Builds a mock ZRA lake-levels page.
+
+    The returned server's ``stats`` dict counts ``requests`` and the
+    ``not_modified`` (304) answers among them.
+
+    Args:
+        level (float, optional): Lake level to report in the row_7 cells.
+        percent (float, optional): Percent full to report.
+        delay (float, optional): Seconds to stall before answering, to simulate
+            a hung upstream. Defaults to 0.
+        padding (int, optional): Filler rows, see zra_page(). Defaults to 0.
+        validators (bool, optional): Send ETag/Last-Modified and answer
+            matching conditional requests with 304. Defaults to True.
+    """
+    import hashlib
+
+    body = zra_page(level, percent, padding).encode()
+    etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+    last_modified = "Mon, 01 Jan 2024 06:00:00 GMT"
+    stats = {"requests": 0, "not_modified": 0}
+    lock = threading.Lock()
+
+    class ZraHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, so pooled sessions can reuse it
+
+        def do_GET(self):
+            if delay:
+                time.sleep(delay)
+            fresh = validators and (
+                self.headers.get("If-None-Match") == etag
+                or self.headers.get("If-Modified-Since") == last_modified
+            )
+            with lock:
+                stats["requests"] += 1
+                if fresh:
+                    stats["not_modified"] += 1
+            if fresh:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            if validators:
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = MockServer(ZraHandler)
+    server.stats = stats
+    return server
+
+
+ZPC_BULLETIN = (
+    "ZPC Generation Update\n"
+    "Kariba 485MW\n"
+    "Hwange 675MW\n"
+    "IPPS 84MW\n"
+    "TOTAL 1 244MW"
+)
+
+
+def mock_twitter_server(text=ZPC_BULLETIN, delay=0.0):
+    """
+    Builds a mock of the Twitter v1.1 user timeline endpoint.
+
+    ``GET /1.1/statuses/user_timeline.json`` answers with a single tweet whose
+    ``full_text`` is ``text``. The returned server's ``stats`` dict counts requests.
+
+    Args:
+        text (str, optional): Tweet text. Defaults to a ZPC generation bulletin.
+        delay (float, optional): Seconds to wait before answering. Defaults to 0.
+    """
+    import json
+
+    stats = {"requests": 0}
+    lock = threading.Lock()
+
+    class TwitterHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if delay:
+                time.sleep(delay)
+            with lock:
+                stats["requests"] += 1
+            if not self.path.startswith("/1.1/statuses/user_timeline.json"):
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            tweet = {"id": stats["requests"], "full_text": text, "extended_entities": {"media": []}}
+            body = json.dumps([tweet]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = MockServer(TwitterHandler)
+    server.stats = stats
+    return server
+
+
+def mock_infobip_server(delay=0.0, failure_rate=0.0, seed=0):
+    """
+    Builds a mock Infobip advanced-SMS endpoint.
+
+    Every POST is answered with one messageId per destination, echoing the
+    destination's own messageId when it has one. The returned server's
+    ``stats`` dict counts requests, destinations, injected failures and
+    ``duplicates`` (destinations whose messageId was seen before); the
+    ``delivered`` dict counts deliveries per messageId.
+
+    Args:
+        delay (float, optional): Seconds to wait before answering. Defaults to 0.
+        failure_rate (float, optional): Fraction of requests answered with a 503.
+        seed (int, optional): Seed for the failure injection. Defaults to 0.
+    """
+    import json
+    import random
+
+    stats = {"requests": 0, "destinations": 0, "failures": 0, "duplicates": 0}
+    delivered = {}
+    lock = threading.Lock()
+    rng = random.Random(seed)
+
+    class InfobipHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if delay:
+                time.sleep(delay)
+            with lock:
+                stats["requests"] += 1
+                fail = rng.random() < failure_rate
+                if fail:
+                    stats["failures"] += 1
+            if fail:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+
+            payload = json.loads(body)
+            results = []
+            for message in payload.get("messages", []):
+                for destination in message.get("destinations", []):
+                    with lock:
+                        stats["destinations"] += 1
+                        message_id = destination.get("messageId") or f"mock-{stats['destinations']}"
+                        if message_id in delivered:
+                            stats["duplicates"] += 1
+                        delivered[message_id] = delivered.get(message_id, 0) + 1
+                    results.append(
+                        {"to": destination["to"], "messageId": message_id,
+                         "status": {"groupName": "PENDING"}}
+                    )
+            response = json.dumps({"messages": results}).encode()
+            try:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # The client was killed mid-request (crash-recovery runs)
+
+        def log_message(self, *args):
+            pass
+
+    server = MockServer(InfobipHandler)
+    server.stats = stats
+    server.delivered = delivered
+    return server
+
+
+def static_fixture_server(directory, delay=0.0):
+    """
+    Serves a directory of fixture files, e.g. a saved timeline page.
+
+    Args:
+        directory (str): Directory to serve; ``/<name>`` maps to ``<directory>/<name>``.
+        delay (float, optional): Seconds to wait before answering. Defaults to 0.
+    """
+    from functools import partial
+    from http.server import SimpleHTTPRequestHandler
+
+    class FixtureHandler(SimpleHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            if delay:
+                time.sleep(delay)
+            super().do_GET()
+
+        def log_message(self, *args):
+            pass
+
+    return MockServer(partial(FixtureHandler, directory=directory))
@@ -0,0 +1,356 @@
+# Benchmark suite: microbenchmarks, a /report-outage load test and data-scale runs.
+#
+# Every upstream is a local mock from mock_servers.py: ZRA serves a fixed
+# lake level, the Twitter timeline a ZPC bulletin (read through tweepy, like
+# the real API) and Infobip accepts every SMS. Each result is recorded with its unit and which direction is better,
+# and the run is saved as JSON (benchmarks/results/<time>.json by default)
+# together with the commit and interpreter it ran on, so runs can be compared:
+#
+#   python benchmarks/suite.py                                  # every part
+#   python benchmarks/suite.py --parts micro scale --quick
+#   python benchmarks/suite.py --compare benchmarks/results/<baseline>.json
+#
+# --compare prints the change in every result both runs share and exits with
+# status 1 if any got worse by more than --threshold (default 15%).
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+# Keep the engine's log file out of the working tree and its output quiet
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("GENERATION_SOURCES", "api,manual")
+for name in ("CONSUMER_KEY", "CONSUMER_SECRET", "ACCESS_TOKEN", "ACCESS_TOKEN_SECRET"):
+    os.environ.setdefault(f"TWITTER_{name}", "bench")  # Signs requests to the mock
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+from requests.adapters import HTTPAdapter  # noqa: E402
+
+from bench_location_index import gazetteer  # noqa: E402
+from generation_parser import parse_generation_data, split_bulletins  # noqa: E402
+from kariba_store import open_kariba_store  # noqa: E402
+from mock_servers import mock_infobip_server, mock_twitter_server, mock_zra_server  # noqa: E402
+
+PARTS = ("micro", "load", "scale")
+BULLETINS = os.path.join(BENCH_DIR, "fixtures", "zpc_bulletins.txt")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+class Results:
+    """Named measurements with their unit and which direction is better."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def add(self, name, value, unit, better="lower"):
+        self.entries[name] = {"value": float(value), "unit": unit, "better": better}
+        print(f"  {name:<48} {value:>12.2f} {unit}")
+
+
+def time_per_call(func, calls, repeat=3):
+    """Best-of-``repeat`` seconds per call of ``func(*args)`` for each args in ``calls``."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for args in calls:
+            func(*args)
+        best = min(best, (time.perf_counter() - start) / len(calls))
+    return best
+
+
+def synthetic_kariba_history(days, seed=42):
+    """Daily Kariba levels ending today, a slow random walk around 478 m."""
+    dates = pd.date_range(end=pd.Timestamp.today().normalize(), periods=days, freq="D")
+    rng = np.random.default_rng(seed)
+    level = 478 + np.cumsum(rng.normal(0, 0.02, days))
+    return pd.DataFrame({"date": dates, "level": level, "percent_full": (level - 475.5) * 7})
+
+
+def write_data_dir(data_dir, history_days, location_lines):
+    """Fills a data directory with a Kariba history, a manual bulletin and locations."""
+    open_kariba_store(data_dir, "csv").upsert(synthetic_kariba_history(history_days))
+    with open(os.path.join(data_dir, "power_data.txt"), "w") as f:
+        f.write("Kariba: 485MW\nHwange: 675MW\nIPPS: 84MW\n")
+    with open(os.path.join(data_dir, "locations.txt"), "w") as f:
+        f.write("\n".join(location_lines) + "\n")
+
+
+class MockHostAdapter(HTTPAdapter):
+    """Sends requests for one HTTPS origin to a local plain-HTTP mock instead."""
+
+    def __init__(self, origin, mock_url):
+        super().__init__()
+        self.origin = origin
+        self.mock_url = mock_url
+
+    def send(self, request, **kwargs):
+        request.url = self.mock_url + request.url[len(self.origin):]
+        return super().send(request, **kwargs)
+
+
+class Upstreams:
+    """The ZRA, Twitter and Infobip mocks, started together."""
+
+    def __enter__(self):
+        self.zra = mock_zra_server().start()
+        self.twitter = mock_twitter_server().start()
+        self.infobip = mock_infobip_server().start()
+        os.environ["INFOBIP_SMS_URL"] = f"{self.infobip.url}/sms/2/text/advanced"
+        return self
+
+    def __exit__(self, *exc):
+        for server in (self.zra, self.twitter, self.infobip):
+            server.stop()
+
+    def attach(self, engine):
+        """Points an engine's ZRA fetch and the shared tweepy client at the mocks."""
+        import MVP
+
+        engine.kariba_collector.zra_url = self.zra.url
+        origin = f"https://{MVP.get_twitter_api().host}"
+        MVP.get_twitter_api().session.mount(origin, MockHostAdapter(origin, self.twitter.url))
+        engine.generation_sources.invalidate()
+
+
+def run_micro(results, args, upstreams):
+    import MVP
+
+    with open(BULLETINS, encoding="utf-8") as f:
+        bulletins = split_bulletins(f.read())
+    calls = [(bulletin,) for bulletin in bulletins] * max(1, 2000 // len(bulletins))
+    results.add("micro.parse_generation_data", time_per_call(parse_generation_data, calls) * 1e6, "us/call")
+
+    with tempfile.TemporaryDirectory(prefix="zirrmi-bench-") as data_dir:
+        lines, roads = gazetteer(2, 20, 5)
+        write_data_dir(data_dir, 3650, lines)
+
+        collector = MVP.KaribaDataCollector(data_dir, zra_url=upstreams.zra.url)
+        results.add("micro.kariba_load_10y", time_per_call(collector.load_data, [()] * 5) * 1e3, "ms/call")
+        results.add("micro.kariba_trend_7d", time_per_call(collector.get_trend, [(7,)] * 10000) * 1e6, "us/call")
+        # 14 days is not tracked incrementally, so this is the on-demand fit
+        results.add("micro.kariba_trend_14d", time_per_call(collector.get_trend, [(14,)] * 200) * 1e6, "us/call")
+        results.add("micro.zra_fetch_mock", time_per_call(collector.fetch_zra_data, [()] * 20) * 1e3, "ms/call")
+
+        engine = MVP.PowerOutagePrediction(data_dir)
+        upstreams.attach(engine)
+        try:
+            queries = [(name,) for name in random.Random(1).sample(roads, 100)]
+            engine.predict_outage_hours(queries[0][0])  # First call queries the generation sources
+            results.add(
+                "micro.predict_outage_hours_cached",
+                time_per_call(engine.predict_outage_hours, queries * 20) * 1e6,
+                "us/call",
+            )
+
+            def uncached(location):
+                engine.prediction_cache.clear()
+                return engine.predict_outage_hours(location)
+
+            results.add("micro.predict_outage_hours_uncached", time_per_call(uncached, queries) * 1e6, "us/call")
+            alerts = MVP.AlertSystem(prediction_engine=engine)
+            results.add(
+                "micro.send_alert_mock_infobip",
+                time_per_call(alerts.send_alert, [("+263771234567", name) for (name,) in queries[:20]]) * 1e3,
+                "ms/call",
+            )
+        finally:
+            engine.close()
+
+
+def run_load(results, args, upstreams):
+    import uvicorn
+
+    import MVP
+    import server
+    from loadtest_report_outage import percentile, post_report
+
+    def report(url, location):
+        start = time.perf_counter()
+        try:
+            return post_report(url, location)
+        except urllib.error.HTTPError as e:
+            return time.perf_counter() - start, e.code
+
+    with tempfile.TemporaryDirectory(prefix="zirrmi-load-") as data_dir:
+        lines, _ = gazetteer(3, 30, 5)
+        write_data_dir(data_dir, 3650, lines)
+        # Keep every database the server opens, and its alert cycles, out of data/
+        server.REPORT_DB_PATH = os.path.join(data_dir, "outage_reports.db")
+        server.SUBSCRIBER_DB_PATH = os.path.join(data_dir, "subscribers.db")
+        server.SMS_OUTBOX_PATH = os.path.join(data_dir, "sms_outbox.db")
+        server.ALERT_INTERVAL = 0
+        engine = MVP.start_prediction_engine(
+            data_dir, reload_interval=None, refresh_interval=None, forecast_days=0
+        )
+        upstreams.attach(engine)
+
+        uv = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=args.port, log_level="warning"))
+        thread = threading.Thread(target=uv.run, daemon=True)
+        thread.start()
+        while not uv.started:
+            time.sleep(0.05)
+        url = f"http://127.0.0.1:{args.port}/report-outage"
+        try:
+            report(url, lines[0])  # Warm-up: generation sources, caches, connections
+            for concurrency in args.concurrency:
+                rng = random.Random(concurrency)
+                picks = [rng.choice(lines) for _ in range(args.requests)]
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    outcomes = list(pool.map(lambda location: report(url, location), picks))
+                elapsed = time.perf_counter() - start
+
+                latencies = [latency for latency, _ in outcomes]
+                prefix = f"load.report_outage.c{concurrency}"
+                results.add(f"{prefix}.throughput", len(outcomes) / elapsed, "req/s", better="higher")
+                for pct in (50, 95, 99):
+                    results.add(f"{prefix}.p{pct}", percentile(latencies, pct) * 1e3, "ms")
+                results.add(f"{prefix}.errors", sum(1 for _, status in outcomes if status != 200), "requests")
+        finally:
+            uv.should_exit = True
+            thread.join(timeout=10)
+            MVP.stop_prediction_engine()
+
+
+def run_scale(results, args, upstreams):
+    import MVP
+
+    for days in (365, 3650) if args.quick else (365, 3650, 36500):
+        with tempfile.TemporaryDirectory(prefix="zirrmi-scale-") as data_dir:
+            write_data_dir(data_dir, days, ["Harare Region"])
+            collector = MVP.KaribaDataCollector(data_dir, zra_url=upstreams.zra.url)
+            results.add(f"scale.kariba_load.{days}d", time_per_call(collector.load_data, [()] * 3) * 1e3, "ms/call")
+            results.add(f"scale.kariba_trend_30d.{days}d", time_per_call(collector.get_trend, [(30,)] * 1000) * 1e6, "us/call")
+            latest = collector.data.iloc[-1]
+            results.add(
+                f"scale.kariba_add_observation.{days}d",
+                time_per_call(
+                    collector.add_observation,
+                    [(latest["date"].date(), float(latest["level"]), float(latest["percent_full"]))] * 20,
+                ) * 1e3,
+                "ms/call",
+            )
+
+    gazetteers = [(2, 50, 5), (5, 200, 10)] if args.quick else [(2, 50, 5), (5, 200, 10), (10, 500, 20)]
+    for regions, suburbs, roads in gazetteers:
+        lines, road_names = gazetteer(regions, suburbs, roads)
+        with tempfile.TemporaryDirectory(prefix="zirrmi-scale-") as data_dir:
+            write_data_dir(data_dir, 365, lines)
+            start = time.perf_counter()
+            engine = MVP.PowerOutagePrediction(data_dir)
+            label = f"{len(lines)}_locations"
+            results.add(f"scale.engine_start.{label}", (time.perf_counter() - start) * 1e3, "ms")
+            upstreams.attach(engine)
+            try:
+                sample = random.Random(len(lines)).sample(road_names, min(1000, len(road_names)))
+                # One pass, so the location index's lookup cache is cold
+                results.add(
+                    f"scale.resolve_location.{label}",
+                    time_per_call(engine.resolve_location_key, [(name,) for name in sample], repeat=1) * 1e6,
+                    "us/call",
+                )
+                engine.predict_many(sample[:1])  # Query the generation sources once
+                start = time.perf_counter()
+                engine.predict_many(sample)
+                results.add(f"scale.predict_many_{len(sample)}.{label}", (time.perf_counter() - start) * 1e3, "ms")
+            finally:
+                engine.close()
+
+
+def run_metadata(args):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parts": args.parts,
+        "quick": args.quick,
+    }
+
+
+def compare(current, baseline, threshold):
+    """Prints the change in every result both runs share; returns the names that regressed."""
+    meta = baseline.get("meta", {})
+    print(f"\ncompared with {meta.get('commit')} ({meta.get('timestamp')}):")
+    regressions = []
+    for name, entry in current.items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        old, new = before["value"], entry["value"]
+        if old == 0:
+            change = 0.0 if new == 0 else float("inf")
+        else:
+            change = (new - old) / abs(old)
+        worse = change if entry["better"] == "lower" else -change
+        flag = "  REGRESSION" if worse > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"  {name:<48} {old:>10.2f} -> {new:>10.2f} {entry['unit']:<9} {change:+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ZIRRMI benchmark suite.")
+    parser.add_argument("--parts", nargs="+", choices=PARTS, default=list(PARTS))
+    parser.add_argument("--quick", action="store_true", help="Smaller data sizes and fewer requests")
+    parser.add_argument("--requests", type=int, help="Requests per load level (default 2000, 200 with --quick)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--out", help="Results file (default benchmarks/results/<time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed slowdown before a result regresses")
+    args = parser.parse_args()
+    if args.requests is None:
+        args.requests = 200 if args.quick else 2000
+
+    results = Results()
+    runners = {"micro": run_micro, "load": run_load, "scale": run_scale}
+    with Upstreams() as upstreams:
+        for part in args.parts:
+            print(f"{part}:")
+            runners[part](results, args, upstreams)
+
+    run = {"meta": run_metadata(args), "results": results.entries}
+    out = args.out or os.path.join(
+        RESULTS_DIR, datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + ".json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(run, f, indent=2)
+    print(f"\nwrote {out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results.entries, baseline, args.threshold)
+        if regressions:
+            print(f"FAIL: {len(regressions)} result(s) regressed by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
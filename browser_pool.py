@@ -0,0 +1,147 @@
+# Headless browser pool #
+# Reusable Chrome sessions for the Selenium scrapers.
+#
+# Starting Chrome costs seconds and hundreds of MB, so sessions are kept
+# open and handed out one caller at a time. A session is health-checked
+# before each use, replaced if it has died, and recycled after max_uses
+# pages so long-lived browsers cannot leak memory indefinitely. The
+# chromedriver binary is resolved once per process.
+
+import contextlib
+import logging
+import os
+import queue
+import threading
+from functools import lru_cache
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service as ChromeService
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def resolve_chromedriver_path():
+    """
+    Returns the chromedriver binary path, downloading it at most once.
+
+    CHROMEDRIVER_PATH wins if set; otherwise webdriver-manager installs
+    (or finds its cached copy of) a matching driver.
+    """
+    path = os.environ.get("CHROMEDRIVER_PATH")
+    if path:
+        return path
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    return ChromeDriverManager().install()
+
+
+class _Session:
+    __slots__ = ("driver", "uses")
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+
+
+class BrowserSessionPool:
+    """Fixed-size pool of headless Chrome sessions."""
+
+    def __init__(self, size=2, max_uses=50, headless=True, page_load_timeout=15):
+        """
+        Initializes the BrowserSessionPool. Browsers are started lazily.
+
+        Args:
+            size (int, optional): Most browsers open at once. Defaults to 2.
+            max_uses (int, optional): Pages a browser serves before it is replaced. Defaults to 50.
+            headless (bool, optional): Run Chrome without a window. Defaults to True.
+            page_load_timeout (float, optional): Seconds allowed per page load. Defaults to 15.
+        """
+        self.size = size
+        self.max_uses = max_uses
+        self.headless = headless
+        self.page_load_timeout = page_load_timeout
+        self._idle = queue.LifoQueue()  # Most recently used first: warm caches
+        self._slots = threading.BoundedSemaphore(size)
+        self._closed = False
+
+    def _start(self):
+        options = webdriver.ChromeOptions()
+        if self.headless:
+            options.add_argument("--headless=new")
+        options.add_argument("--no-sandbox")
+        options.add_argument("--disable-dev-shm-usage")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--blink-settings=imagesEnabled=false")
+        service = ChromeService(resolve_chromedriver_path())
+        driver = webdriver.Chrome(service=service, options=options)
+        driver.set_page_load_timeout(self.page_load_timeout)
+        return _Session(driver)
+
+    @staticmethod
+    def _quit(session):
+        try:
+            session.driver.quit()
+        except Exception as e:
+            logger.warning(f"Error closing browser session: {e}")
+
+    @staticmethod
+    def _healthy(session):
+        try:
+            session.driver.execute_script("return 1")
+            return True
+        except WebDriverException:
+            return False
+
+    def _checkout(self):
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                return self._start()
+            if session.uses < self.max_uses and self._healthy(session):
+                return session
+            self._quit(session)  # Worn out or dead; try the next one
+
+    @contextlib.contextmanager
+    def session(self, timeout=None):
+        """
+        Borrows a browser for the duration of a ``with`` block.
+
+        Args:
+            timeout (float, optional): Seconds to wait for a free browser. Waits forever if None.
+
+        Yields:
+            selenium.webdriver.Chrome: A healthy driver.
+        """
+        if self._closed:
+            raise RuntimeError("Browser pool is closed.")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("No browser session became free in time.")
+        session = None
+        try:
+            session = self._checkout()
+            session.uses += 1
+            yield session.driver
+        except Exception:
+            if session is not None and not self._healthy(session):
+                self._quit(session)
+                session = None
+            raise
+        finally:
+            if session is not None:
+                if self._closed or session.uses >= self.max_uses:
+                    self._quit(session)
+                else:
+                    self._idle.put(session)
+            self._slots.release()
+
+    def close(self):
+        """Quits every idle browser; browsers in use are quit when returned."""
+        self._closed = True
+        while True:
+            try:
+                self._quit(self._idle.get_nowait())
+            except queue.Empty:
+                break
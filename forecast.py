@@ -0,0 +1,230 @@
+# Outage forecasts #
+# Multi-day, per-location outage schedules, precomputed in the background.
+#
+# The Kariba level is projected forward along its 30-day least-squares slope,
+# with an uncertainty band that widens with the square root of the horizon
+# (from the window's day-to-day volatility); generation is carried forward
+# as last reported. Each projected day is run through the engine's usual
+# prediction (trained model or threshold rules) for every known location,
+# and the day's expected outage hours are spread over the 24 hours in
+# proportion to a typical demand profile, giving the chance that each hour
+# is hit by load-shedding.
+#
+# Many locations share an identical schedule, so day entries and whole
+# schedules are interned and the table holds one reference per location.
+# A refresher thread rebuilds the table when any input changes (or the date
+# rolls over) and swaps it in whole, so lookups are a dict access.
+
+import datetime
+import logging
+import math
+import threading
+import time
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Relative demand per hour of day: morning and evening peaks are when
+# load-shedding stages bite hardest.
+HOURLY_LOAD_PROFILE = (
+    0.55, 0.50, 0.48, 0.48, 0.52, 0.70, 0.95, 1.10, 1.05, 0.95, 0.90, 0.88,
+    0.88, 0.86, 0.85, 0.88, 0.95, 1.10, 1.25, 1.30, 1.20, 1.00, 0.80, 0.65,
+)
+
+
+@lru_cache(maxsize=256)
+def hourly_probabilities(hours, profile=HOURLY_LOAD_PROFILE):
+    """
+    Spreads a day's expected outage hours over the 24 hours of the day.
+
+    Hours are allocated in proportion to ``profile``; an hour cannot exceed
+    probability 1, and what would overflow is shared among the others.
+
+    Args:
+        hours (float): Expected outage hours in the day (clipped to 0-24).
+        profile (tuple of float, optional): Relative weight of each hour.
+
+    Returns:
+        tuple of float: Probability of an outage in each hour; they sum to ``hours``.
+    """
+    remaining = min(max(float(hours), 0.0), 24.0)
+    probabilities = [0.0] * 24
+    free = set(range(24))
+    while remaining > 1e-9 and free:
+        weight = sum(profile[hour] for hour in free)
+        overflow = 0.0
+        for hour in sorted(free):
+            probabilities[hour] += remaining * profile[hour] / weight
+            if probabilities[hour] >= 1.0:
+                overflow += probabilities[hour] - 1.0
+                probabilities[hour] = 1.0
+                free.discard(hour)
+        remaining = overflow
+    return tuple(round(p, 3) for p in probabilities)
+
+
+def project_kariba(latest, trend_stats, days):
+    """
+    Projects the Kariba level forward.
+
+    Args:
+        latest (dict): Latest Kariba reading with "level" and "date", or None.
+        trend_stats (dict): KaribaTrendStats snapshot.
+        days (int): How many days to project, starting tomorrow.
+
+    Returns:
+        list of tuple: (level, sigma) per day, or (None, 0.0) without a reading.
+    """
+    if not latest:
+        return [(None, 0.0)] * days
+    window = trend_stats.get("windows", {}).get(30) or {}
+    slope = window.get("slope_m_per_day", 0.0)
+    volatility = window.get("volatility_m_per_day", 0.0)
+    level = float(latest["level"])
+    return [
+        (level + slope * ahead, volatility * math.sqrt(ahead))
+        for ahead in range(1, days + 1)
+    ]
+
+
+class ForecastTable:
+    """An immutable set of per-location forecasts."""
+
+    def __init__(self, start, horizon, version, national, by_location, generated_at=None):
+        self.start = start
+        self.horizon = horizon
+        self.version = version
+        self.national = national
+        self.by_location = by_location
+        self.generated_at = generated_at or time.time()
+
+    def lookup(self, location_key):
+        """Returns the schedule for a location key, or the national one."""
+        return self.by_location.get(location_key, self.national)
+
+    def stats(self):
+        distinct = {id(schedule) for schedule in self.by_location.values()}
+        return {
+            "start": self.start.isoformat(),
+            "horizon_days": self.horizon,
+            "locations": len(self.by_location),
+            "distinct_schedules": len(distinct),
+            "generated_at": self.generated_at,
+        }
+
+
+def build_forecast_table(predict_day, latest, trend_stats, locations, horizon=14, start=None, version=None):
+    """
+    Builds forecasts for every location over the horizon.
+
+    Args:
+        predict_day (callable): (kariba_data, day, locations) -> list of
+            (hours, reason), the engine's prediction for that day's inputs.
+        latest (dict): Latest Kariba reading, or None.
+        trend_stats (dict): KaribaTrendStats snapshot.
+        locations (list of str): Location keys to forecast.
+        horizon (int, optional): Days to forecast, starting tomorrow. Defaults to 14.
+        start (datetime.date, optional): Day before the first forecast day. Defaults to today.
+        version (optional): Input version the table was built from.
+
+    Returns:
+        ForecastTable: The table.
+    """
+    start = start or datetime.date.today()
+    keys = [""] + list(locations)  # "" is the national forecast
+    day_entries = {}
+    columns = []
+    for ahead, (level, sigma) in enumerate(project_kariba(latest, trend_stats, horizon), 1):
+        day = start + datetime.timedelta(days=ahead)
+        band = []
+        for offset in (0.0, -sigma, sigma):
+            kariba = dict(latest, level=level + offset) if level is not None else None
+            band.append(predict_day(kariba, day, keys))
+        column = []
+        for (hours, reason), (low, _), (high, _) in zip(*band):
+            low, high = sorted((low, high))
+            entry_key = (day, hours, min(low, hours), max(high, hours), reason)
+            entry = day_entries.get(entry_key)
+            if entry is None:
+                entry = day_entries[entry_key] = {
+                    "date": day.isoformat(),
+                    "level": round(level, 2) if level is not None else None,
+                    "expected_hours": hours,
+                    "hours_range": [entry_key[2], entry_key[3]],
+                    "reason": reason,
+                    "hourly": hourly_probabilities(hours),
+                }
+            column.append(entry)
+        columns.append(column)
+
+    schedules = {}
+    by_location = {}
+    for key, schedule in zip(keys, zip(*columns)):
+        interned = schedules.setdefault(tuple(id(entry) for entry in schedule), schedule)
+        by_location[key] = interned
+    national = by_location.pop("")
+    return ForecastTable(start, horizon, version, national, by_location)
+
+
+class ForecastRefresher:
+    """Keeps a forecast table current by rebuilding it when inputs change."""
+
+    def __init__(self, build, version, interval=60):
+        """
+        Initializes the ForecastRefresher.
+
+        Args:
+            build (callable): version -> ForecastTable.
+            version (callable): Returns a stamp of every input the forecast uses.
+            interval (float, optional): Seconds between input checks. Defaults to 60.
+        """
+        self.build = build
+        self.version = version
+        self.interval = interval
+        self.table = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts the refresh thread; the first table is built right away."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="forecast-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=15)
+        self._thread = None
+
+    def trigger(self):
+        """Asks for an input check as soon as possible."""
+        self._wake.set()
+
+    def refresh(self):
+        """Rebuilds the table if its inputs changed. Returns True if it did."""
+        version = self.version()
+        table = self.table
+        if table is not None and table.version == version:
+            return False
+        started = time.perf_counter()
+        self.table = self.build(version)
+        logger.info(
+            f"Rebuilt forecasts for {len(self.table.by_location)} locations "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Error building forecasts: {e}")
+            self._wake.clear()
+            self._wake.wait(self.interval)
@@ -0,0 +1,101 @@
+# ZPC generation bulletin parser #
+# Extracts per-station MW figures from ZPC power-generation bulletins.
+#
+# A bulletin is tokenized in one pass by a single precompiled pattern that
+# matches line breaks, station names and MW figures ("485MW", "485 MW",
+# "1,244 MW", "1 120 MW", "485.5MW"). Every figure is credited to the
+# closest station named before it on the same line, so "Hwange 675MW
+# Kariba 485MW" yields both stations and unit numbers such as
+# "Hwange 7&8 675MW" are skipped. A space is read as a thousands separator
+# only in TOTAL figures: after a station, "Hwange 2 485MW" is unit 2 at
+# 485MW. Figures for several unit groups of one station are added up; TOTAL
+# keeps the last.
+
+import re
+
+import pandas as pd
+
+STATIONS = ["Kariba", "Hwange", "IPPS", "Imports", "TOTAL"]
+
+# One alternation scanned once per bulletin: line breaks, station names and
+# MW figures come out in text order as (kind, value) tokens.
+_TOKEN_RE = re.compile(
+    r"(?P<newline>\n)"
+    r"|\b(?:(?P<Kariba>kariba)"
+    r"|(?P<Hwange>hwange)"
+    r"|(?P<IPPS>ipp'?s?|independent\s+power\s+producers?)"
+    r"|(?P<Imports>imports?)"
+    r"|(?P<TOTAL>total))\b"
+    r"|(?<![\d.,&/-])(?P<mw>\d{1,3}(?:[, ]\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)\s*mw\b",
+    re.IGNORECASE,
+)
+
+BULLETIN_SEPARATOR = re.compile(r"^\s*-{3,}\s*$", re.MULTILINE)
+
+
+def parse_generation_values(text):
+    """
+    Parses one bulletin into numeric MW figures.
+
+    Args:
+        text (str): Bulletin text.
+
+    Returns:
+        dict: Station -> MW as float, for every station found.
+    """
+    values = {}
+    station = None  # Latest station on this line still waiting for its figure
+    for token in _TOKEN_RE.finditer(text):
+        kind = token.lastgroup
+        if kind == "newline":
+            station = None
+        elif kind != "mw":
+            station = kind
+        elif station is not None:
+            figure = token.group("mw")
+            if station != "TOTAL" and " " in figure:
+                figure = figure.split(" ", 1)[1]  # Leading group is a unit number
+            value = float(figure.replace(",", "").replace(" ", ""))
+            if station == "TOTAL" or station not in values:
+                values[station] = value
+            else:
+                values[station] += value  # Unit groups, e.g. Hwange 7&8 plus Hwange 1-6
+            station = None  # That mention has its figure
+    return values
+
+
+def parse_generation_data(text):
+    """Parses the extracted text to find power generation figures."""
+    return {
+        station: f"{round(value)}MW"
+        for station, value in parse_generation_values(text).items()
+    }
+
+
+def split_bulletins(corpus):
+    """Splits a corpus of bulletins separated by lines of dashes."""
+    return [part.strip() for part in BULLETIN_SEPARATOR.split(corpus) if part.strip()]
+
+
+def parse_generation_bulletins(bulletins, timestamps=None):
+    """
+    Parses many bulletins into a columnar table.
+
+    Args:
+        bulletins (iterable of str): Bulletin texts.
+        timestamps (iterable, optional): A timestamp per bulletin, kept as the
+            "timestamp" column.
+
+    Returns:
+        pd.DataFrame: One row per bulletin and one float column per station in
+            STATIONS (NaN where a bulletin did not mention the station).
+    """
+    columns = {station: [] for station in STATIONS}
+    for text in bulletins:
+        values = parse_generation_values(text)
+        for station in STATIONS:
+            columns[station].append(values.get(station, float("nan")))
+    table = pd.DataFrame(columns, dtype="float64")
+    if timestamps is not None:
+        table.insert(0, "timestamp", pd.to_datetime(list(timestamps)))
+    return table
@@ -0,0 +1,208 @@
+# Generation data sources #
+# One interface over every place ZPC generation figures can come from
+# (Twitter API, the Selenium scraper, the manual power_data.txt file).
+#
+# All sources are queried in parallel under a single deadline and the
+# highest-priority valid reading wins; lower-priority answers are used as
+# soon as every source above them has finished or failed, so a prediction
+# never waits on the slowest source. The last good reading of each source is
+# kept as a fallback, and each source's latency and success rate is tracked.
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+logger = logging.getLogger(__name__)
+
+
+def is_valid_generation_data(data):
+    """True if the reading has a numeric Kariba figure and every figure parses."""
+    if not data or "Kariba" not in data:
+        return False
+    try:
+        for value in data.values():
+            int(str(value).replace("MW", "").replace(",", "").strip())
+    except ValueError:
+        return False
+    return True
+
+
+class GenerationSource:
+    """A named, prioritised callable returning a generation dict or None."""
+
+    def __init__(self, name, fetch, priority=0):
+        """
+        Initializes the GenerationSource.
+
+        Args:
+            name (str): Source name, e.g. "api".
+            fetch (callable): Returns a dict like {"Kariba": "485MW", ...} or None.
+            priority (int, optional): Lower runs first in the preference order. Defaults to 0.
+        """
+        self.name = name
+        self.fetch = fetch
+        self.priority = priority
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.total_latency = 0.0
+        self.last_latency = None
+        self.last_good = None  # (timestamp, data)
+        self.in_flight = None  # Future of a fetch still running past its deadline
+        self._lock = threading.Lock()  # Runs finish on pool threads while stats are read
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            data = self.fetch()
+        except Exception as e:
+            logger.warning(f"Generation source '{self.name}' failed: {e}")
+            data = None
+        latency = time.perf_counter() - start
+        valid = is_valid_generation_data(data)
+        with self._lock:
+            self.calls += 1
+            self.total_latency += latency
+            self.last_latency = latency
+            if valid:
+                self.successes += 1
+                self.last_good = (time.time(), data)
+            else:
+                self.failures += 1
+        return data if valid else None
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self):
+        with self._lock:
+            return self._stats()
+
+    def _stats(self):
+        finished = self.successes + self.failures
+        return {
+            "priority": self.priority,
+            "calls": self.calls,
+            "successes": self.successes,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "success_rate": self.successes / finished if finished else None,
+            "mean_latency_ms": self.total_latency / self.calls * 1000 if self.calls else None,
+            "last_latency_ms": self.last_latency * 1000 if self.last_latency is not None else None,
+            "last_good_at": self.last_good[0] if self.last_good else None,
+        }
+
+
+class GenerationSourceManager:
+    """Queries generation sources concurrently and picks the best reading."""
+
+    def __init__(self, sources, executor, deadline=3.0, max_age=600):
+        """
+        Initializes the GenerationSourceManager.
+
+        Args:
+            sources (list of GenerationSource): Sources to query.
+            executor (concurrent.futures.Executor): Pool the sources run on.
+            deadline (float, optional): Seconds a refresh may take overall. Defaults to 3.0.
+            max_age (float, optional): Seconds a chosen reading is reused before
+                sources are queried again. Defaults to 600.
+        """
+        self.sources = sorted(sources, key=lambda source: source.priority)
+        self.executor = executor
+        self.deadline = deadline
+        self.max_age = max_age
+        self.version = 0  # Bumped whenever the chosen reading changes
+        self._current = None  # (monotonic time, source name, data)
+        self._lock = threading.Lock()
+
+    def is_fresh(self):
+        current = self._current
+        return current is not None and time.monotonic() - current[0] < self.max_age
+
+    def version_stamp(self):
+        """Changes whenever the reading returned by get() may change."""
+        return self.version, self.is_fresh()
+
+    def invalidate(self):
+        """Forces the next get() to query the sources again."""
+        self._current = None
+
+    def get(self):
+        """
+        Returns the best current generation reading.
+
+        Returns:
+            tuple: (data, source_name). data is {} and source_name None if no
+                source has ever produced a valid reading.
+        """
+        if not self.is_fresh():
+            with self._lock:
+                if not self.is_fresh():  # Another caller may have just refreshed
+                    self._refresh()
+        current = self._current
+        if current is None:
+            return {}, None
+        return current[2], current[1]
+
+    def _refresh(self):
+        end = time.monotonic() + self.deadline
+        futures = {}
+        for source in self.sources:
+            if source.in_flight is not None and not source.in_flight.done():
+                continue  # Still stuck from last time; don't pile up more work
+            source.in_flight = futures[source.name] = self.executor.submit(source.run)
+
+        chosen = None
+        pending = set(futures.values())
+        while pending:
+            # Stop as soon as no unfinished source outranks the best answer so far
+            for source in self.sources:
+                future = futures.get(source.name)
+                if future is None or not future.done():
+                    break
+                if future.result() is not None:
+                    chosen = (source.name, future.result())
+                    break
+            if chosen is not None:
+                break
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+        if chosen is None:
+            # Deadline hit: best finished answer, then best cached reading
+            for source in self.sources:
+                future = futures.get(source.name)
+                if future is not None and future.done() and future.result() is not None:
+                    chosen = (source.name, future.result())
+                    break
+        for source in self.sources:
+            future = futures.get(source.name)
+            if future is not None and not future.done():
+                source.record_timeout()
+        if chosen is None:
+            for source in self.sources:
+                if source.last_good is not None:
+                    chosen = (source.name, source.last_good[1])
+                    logger.warning(f"Using last good generation reading from '{source.name}'")
+                    break
+
+        if chosen is None:
+            logger.error("No generation source produced a valid reading.")
+            chosen = (None, {})  # Remembered too, so we retry after max_age, not per call
+        previous = self._current
+        if previous is None or previous[1:] != chosen:
+            self.version += 1
+        self._current = (time.monotonic(), chosen[0], chosen[1])
+
+    def stats(self):
+        """Per-source latency and success statistics."""
+        current = self._current
+        return {
+            "current_source": current[1] if current else None,
+            "sources": {source.name: source.stats() for source in self.sources},
+        }
@@ -0,0 +1,188 @@
+# Outage hotspot detection #
+# Sliding-window report counts per location and region, built from
+# time-bucketed ring buffers.
+#
+# Each tracked area keeps a fixed number of per-bucket counters plus a
+# running total, so recording a report or reading a count is O(1); sliding
+# the window only clears the buckets that were passed. The number of tracked
+# areas is capped and the least recently reported area is dropped first, so
+# memory stays bounded no matter how much traffic arrives.
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+Cluster = namedtuple("Cluster", ["area", "count", "since"])
+
+
+class _WindowCounter:
+    """Report count over the last ``buckets`` time buckets."""
+
+    __slots__ = ("counts", "last", "total", "since")
+
+    def __init__(self, buckets):
+        self.counts = [0] * buckets
+        self.last = None  # Newest bucket number seen
+        self.total = 0
+        self.since = None  # When the area last crossed the cluster threshold
+
+    def expire(self, epoch, buckets):
+        """Slides the window forward to end at bucket ``epoch``."""
+        if self.last is None:
+            self.last = epoch
+            return
+        gap = epoch - self.last
+        if gap <= 0:
+            return
+        if gap >= buckets:
+            self.counts = [0] * buckets
+            self.total = 0
+        else:
+            # Only the buckets we slid past need clearing
+            for stale in range(self.last + 1, epoch + 1):
+                slot = stale % buckets
+                self.total -= self.counts[slot]
+                self.counts[slot] = 0
+        self.last = epoch
+
+    def add(self, epoch, buckets):
+        if epoch <= self.last - buckets:
+            return  # Older than the window
+        self.counts[epoch % buckets] += 1
+        self.total += 1
+
+
+class OutageClusterDetector:
+    """Flags locations and regions whose recent report count crosses a threshold."""
+
+    def __init__(
+        self,
+        window=900,
+        bucket_seconds=30,
+        min_reports=5,
+        region_min_reports=15,
+        max_areas=20000,
+        clock=time.time,
+    ):
+        """
+        Initializes the OutageClusterDetector.
+
+        Args:
+            window (int, optional): Sliding window in seconds. Defaults to 900 (15 minutes).
+            bucket_seconds (int, optional): Bucket width in seconds. Defaults to 30.
+            min_reports (int, optional): Reports within the window that make a
+                location a cluster. Defaults to 5.
+            region_min_reports (int, optional): Same, for a whole region. Defaults to 15.
+            max_areas (int, optional): Most locations and regions tracked at once. Defaults to 20000.
+            clock (callable, optional): Returns the current time in seconds.
+        """
+        self.window = window
+        self.bucket_seconds = bucket_seconds
+        self.buckets = max(1, window // bucket_seconds)
+        self.min_reports = min_reports
+        self.region_min_reports = region_min_reports
+        self.max_areas = max_areas
+        self.clock = clock
+        self.version = 0  # Bumped whenever an area starts or stops being a cluster
+        self._areas = OrderedDict()  # (kind, name) -> _WindowCounter, LRU order
+        self._lock = threading.Lock()
+
+    def _epoch(self, timestamp):
+        return int(timestamp // self.bucket_seconds)
+
+    def _threshold(self, kind):
+        return self.region_min_reports if kind == "region" else self.min_reports
+
+    def _update_state(self, key, counter, now):
+        is_cluster = counter.total >= self._threshold(key[0])
+        if is_cluster and counter.since is None:
+            counter.since = now
+            self.version += 1
+        elif not is_cluster and counter.since is not None:
+            counter.since = None
+            self.version += 1
+
+    def _record_area(self, key, epoch, now):
+        counter = self._areas.get(key)
+        if counter is None:
+            counter = self._areas[key] = _WindowCounter(self.buckets)
+            if len(self._areas) > self.max_areas:
+                _, evicted = self._areas.popitem(last=False)
+                if evicted.since is not None:
+                    self.version += 1
+        else:
+            self._areas.move_to_end(key)
+        counter.expire(epoch, self.buckets)
+        counter.add(epoch, self.buckets)
+        self._update_state(key, counter, now)
+
+    def record(self, location, region=None, timestamp=None):
+        """
+        Records one outage report.
+
+        Args:
+            location (str): Resolved location key.
+            region (str, optional): The location's region, counted separately.
+            timestamp (float, optional): Report time in seconds. Defaults to now.
+        """
+        now = self.clock() if timestamp is None else timestamp
+        epoch = self._epoch(now)
+        with self._lock:
+            if location:
+                self._record_area(("location", location), epoch, now)
+            if region:
+                self._record_area(("region", region), epoch, now)
+
+    def _current(self, key, now):
+        counter = self._areas.get(key)
+        if counter is None:
+            return None
+        counter.expire(self._epoch(now), self.buckets)
+        self._update_state(key, counter, now)
+        return counter
+
+    def count(self, location=None, region=None, now=None):
+        """Returns the number of reports in the window for a location or region."""
+        key = ("location", location) if location else ("region", region)
+        now = self.clock() if now is None else now
+        with self._lock:
+            counter = self._current(key, now)
+            return counter.total if counter else 0
+
+    def cluster_for(self, location=None, region=None, now=None):
+        """
+        Returns the active cluster covering a location, else its region, if any.
+
+        Returns:
+            Cluster: (area, count, since), or None.
+        """
+        now = self.clock() if now is None else now
+        with self._lock:
+            for key in (("location", location), ("region", region)):
+                if not key[1]:
+                    continue
+                counter = self._current(key, now)
+                if counter is not None and counter.since is not None:
+                    return Cluster(key[1], counter.total, counter.since)
+        return None
+
+    def hotspots(self, now=None):
+        """
+        Returns every active cluster, busiest first.
+
+        Returns:
+            list of dict: kind, area, count and since for each cluster.
+        """
+        now = self.clock() if now is None else now
+        clusters = []
+        with self._lock:
+            for key in list(self._areas):
+                counter = self._current(key, now)
+                if counter.since is not None:
+                    clusters.append(
+                        {"kind": key[0], "area": key[1], "count": counter.total, "since": counter.since}
+                    )
+                elif counter.total == 0:
+                    del self._areas[key]  # Idle area, free its slot
+        clusters.sort(key=lambda cluster: cluster["count"], reverse=True)
+        return clusters
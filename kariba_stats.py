@@ -0,0 +1,251 @@
+# Kariba rolling statistics #
+# Incrementally maintained trend statistics over the Kariba level history.
+#
+# Each window (7, 30 and 90 days by default) keeps its observations in a
+# deque together with running sums, so adding a day's reading and dropping
+# the ones that fell out of the window costs O(1) amortized. Time is measured
+# in real days, so gaps in the series are accounted for: the slope is a
+# least-squares fit over the actual dates, and volatility is the spread of
+# the per-day rate of change between consecutive readings, however far apart.
+#
+# After every update a plain-dict snapshot is rebuilt and swapped in, so
+# readers on the request path never touch the DataFrame or take a lock.
+
+import math
+import threading
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_WINDOWS = (7, 30, 90)
+
+_EPOCH = pd.Timestamp("1970-01-01")
+
+
+def _day_number(date):
+    return (pd.Timestamp(date) - _EPOCH) / pd.Timedelta(days=1)
+
+
+class RollingWindow:
+    """Least-squares slope and change-rate volatility over the last ``days`` days."""
+
+    def __init__(self, days):
+        """
+        Initializes an empty RollingWindow.
+
+        Args:
+            days (int): Window length in days, ending at the newest observation.
+        """
+        self.days = days
+        self.points = deque()  # (t, level)
+        self.rates = deque()  # (t, metres per day since the previous reading)
+        self.origin = None  # Sums use (t, level) - origin to keep the squares small
+        self._clear_sums()
+
+    def _clear_sums(self):
+        self.n = 0
+        self.sum_t = self.sum_y = self.sum_tt = self.sum_ty = 0.0
+        self.rate_n = 0
+        self.rate_sum = self.rate_sumsq = 0.0
+
+    def _add_point(self, t, y):
+        t -= self.origin[0]
+        y -= self.origin[1]
+        self.n += 1
+        self.sum_t += t
+        self.sum_y += y
+        self.sum_tt += t * t
+        self.sum_ty += t * y
+
+    def _remove_point(self, t, y):
+        t -= self.origin[0]
+        y -= self.origin[1]
+        self.n -= 1
+        self.sum_t -= t
+        self.sum_y -= y
+        self.sum_tt -= t * t
+        self.sum_ty -= t * y
+
+    def _add_rate(self, rate):
+        self.rate_n += 1
+        self.rate_sum += rate
+        self.rate_sumsq += rate * rate
+
+    def _remove_rate(self, rate):
+        self.rate_n -= 1
+        self.rate_sum -= rate
+        self.rate_sumsq -= rate * rate
+
+    def append(self, t, y):
+        """
+        Adds an observation at day number ``t``; must not be older than the newest.
+
+        An observation on the same day as the newest one replaces it.
+        """
+        if self.points and t == self.points[-1][0]:
+            self.pop()
+        if not self.points:
+            self.origin = (t, y)
+            self._clear_sums()
+        elif t - self.origin[0] > 10 * self.days:
+            self._rebase()
+        if self.points:
+            previous_t, previous_y = self.points[-1]
+            rate = (y - previous_y) / (t - previous_t)
+            self.rates.append((t, rate))
+            self._add_rate(rate)
+        self.points.append((t, y))
+        self._add_point(t, y)
+        cutoff = t - self.days
+        while self.points and self.points[0][0] <= cutoff:
+            self._remove_point(*self.points.popleft())
+        # A rate belongs to the window only if both of its readings do
+        while self.rates and self.rates[0][0] <= self.points[0][0]:
+            self._remove_rate(self.rates.popleft()[1])
+
+    def _rebase(self):
+        # Move the origin up to the oldest reading and re-sum; O(window), but
+        # only once every ten windows, so appends stay O(1) amortized.
+        self.origin = self.points[0]
+        self.n = 0
+        self.sum_t = self.sum_y = self.sum_tt = self.sum_ty = 0.0
+        for t, y in self.points:
+            self._add_point(t, y)
+
+    def pop(self):
+        """Removes the newest observation (used when a day's reading is corrected)."""
+        t, y = self.points.pop()
+        self._remove_point(t, y)
+        if self.rates and self.rates[-1][0] == t:
+            self._remove_rate(self.rates.pop()[1])
+
+    def slope(self):
+        """Least-squares slope in metres per day, 0.0 with fewer than two readings."""
+        if self.n < 2:
+            return 0.0
+        denominator = self.n * self.sum_tt - self.sum_t * self.sum_t
+        if denominator <= 0:
+            return 0.0
+        return (self.n * self.sum_ty - self.sum_t * self.sum_y) / denominator
+
+    def volatility(self):
+        """Standard deviation of the daily rate of change, in metres per day."""
+        if self.rate_n < 2:
+            return 0.0
+        mean = self.rate_sum / self.rate_n
+        variance = self.rate_sumsq / self.rate_n - mean * mean
+        return math.sqrt(max(variance, 0.0))
+
+    def summary(self):
+        if not self.points:
+            return {"days": self.days, "observations": 0}
+        first_t = self.points[0][0]
+        last_t = self.points[-1][0]
+        slope = self.slope()
+        return {
+            "days": self.days,
+            "observations": self.n,
+            "span_days": last_t - first_t,
+            "coverage": self.n / self.days,
+            "mean_level": self.origin[1] + self.sum_y / self.n,
+            "slope_m_per_day": slope,
+            "change_m": slope * (last_t - first_t),
+            "volatility_m_per_day": self.volatility(),
+            "start": (_EPOCH + pd.Timedelta(days=first_t)).date().isoformat(),
+        }
+
+
+class KaribaTrendStats:
+    """Rolling Kariba statistics over several windows, with a lock-free snapshot."""
+
+    def __init__(self, windows=DEFAULT_WINDOWS):
+        """
+        Initializes the KaribaTrendStats.
+
+        Args:
+            windows (tuple of int, optional): Window lengths in days. Defaults to (7, 30, 90).
+        """
+        self.windows = {days: RollingWindow(days) for days in sorted(windows)}
+        self.latest = None  # (t, level)
+        self._lock = threading.Lock()
+        self._snapshot = {"latest": None, "windows": {}}
+
+    def rebuild(self, data):
+        """
+        Recomputes every window from a Kariba history frame (date, level).
+
+        Only the longest window's worth of rows is read.
+        """
+        with self._lock:
+            for days in list(self.windows):
+                self.windows[days] = RollingWindow(days)
+            self.latest = None
+            data = data.dropna(subset=["date", "level"])
+            if not data.empty:
+                longest = max(self.windows)
+                recent = data[data["date"] > data["date"].iloc[-1] - pd.Timedelta(days=longest)]
+                days_since_epoch = (recent["date"].dt.normalize() - _EPOCH) / pd.Timedelta(days=1)
+                for t, level in zip(days_since_epoch.tolist(), recent["level"].tolist()):
+                    self._append(t, float(level))
+            self._publish()
+
+    def add(self, date, level):
+        """
+        Adds one observation in O(1).
+
+        Returns:
+            bool: False if the observation is older than the newest one, in
+                which case the caller must rebuild() from the full history.
+        """
+        t = _day_number(pd.Timestamp(date).normalize())
+        with self._lock:
+            if self.latest is not None and t < self.latest[0]:
+                return False
+            self._append(t, float(level))
+            self._publish()
+        return True
+
+    def _append(self, t, level):
+        for window in self.windows.values():
+            window.append(t, level)
+        self.latest = (t, level)
+
+    def _publish(self):
+        latest = None
+        if self.latest is not None:
+            latest = {
+                "date": (_EPOCH + pd.Timedelta(days=self.latest[0])).date().isoformat(),
+                "level": self.latest[1],
+            }
+        self._snapshot = {
+            "latest": latest,
+            "windows": {days: window.summary() for days, window in self.windows.items()},
+        }
+
+    def snapshot(self):
+        """The statistics as of the last update: {"latest": ..., "windows": {days: ...}}."""
+        return self._snapshot
+
+    def slope(self, days):
+        """Least-squares slope of the ``days`` window, in metres per day."""
+        summary = self._snapshot["windows"].get(days)
+        return summary.get("slope_m_per_day", 0.0) if summary else None
+
+
+def slope_over(data, days):
+    """
+    One-off least-squares slope over the last ``days`` days of a history
+    frame, for windows that are not tracked incrementally.
+    """
+    data = data.dropna(subset=["date", "level"])
+    if len(data) < 2:
+        return 0.0
+    recent = data[data["date"] > data["date"].iloc[-1] - pd.Timedelta(days=days)]
+    if len(recent) < 2:
+        return 0.0
+    t = ((recent["date"] - recent["date"].iloc[0]) / pd.Timedelta(days=1)).to_numpy(dtype=np.float64)
+    y = recent["level"].to_numpy(dtype=np.float64)
+    t_centered = t - t.mean()
+    denominator = float(t_centered @ t_centered)
+    return float(t_centered @ (y - y.mean()) / denominator) if denominator else 0.0
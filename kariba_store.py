@@ -0,0 +1,306 @@
+# Kariba lake-level storage backends #
+# Append-only, typed time-series stores for the Kariba level history.
+#
+# Every backend keeps the same three columns (date, level, percent_full) and
+# the same semantics: ``upsert`` appends new observations without rewriting
+# history, and ``load`` resolves duplicates by date (the last write wins).
+# When duplicates pile up, ``load`` compacts the store back to one row per date.
+# Loads, appends and compactions of one store object are serialized on its
+# lock, so an append made while ``load`` rewrites the store is not lost.
+
+import logging
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["date", "level", "percent_full"]
+
+# Formats seen in kariba_levels.csv, tried in order (vectorized, not per row)
+DATE_FORMATS = ["%d/%m/%Y %H:%M", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"]
+
+# Compact once duplicate rows make up this fraction of the stored rows
+COMPACT_RATIO = 0.25
+
+
+def empty_frame():
+    """Returns an empty, correctly typed Kariba frame."""
+    return pd.DataFrame(
+        {
+            "date": pd.Series([], dtype="datetime64[ns]"),
+            "level": pd.Series([], dtype="float64"),
+            "percent_full": pd.Series([], dtype="float64"),
+        }
+    )
+
+
+def parse_dates(values):
+    """
+    Parses a column of date strings written in any of DATE_FORMATS.
+
+    Args:
+        values (pd.Series): Raw date strings.
+
+    Returns:
+        pd.Series: datetime64 values, NaT where no format matched.
+    """
+    values = values.astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=values.index, dtype="datetime64[ns]")
+    for date_format in DATE_FORMATS:
+        missing = parsed.isna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(
+            values[missing], format=date_format, errors="coerce"
+        )
+    return parsed
+
+
+def normalize_frame(data):
+    """Coerces observations to the store's column types, dropping undated rows."""
+    data = pd.DataFrame(data, columns=COLUMNS)
+    if not pd.api.types.is_datetime64_any_dtype(data["date"]):
+        data["date"] = pd.to_datetime(data["date"], errors="coerce")
+    data["level"] = pd.to_numeric(data["level"], errors="coerce").astype("float64")
+    data["percent_full"] = pd.to_numeric(
+        data["percent_full"], errors="coerce"
+    ).astype("float64")
+    return data.dropna(subset=["date"])
+
+
+def resolve_duplicates(data):
+    """Keeps the last observation for each date and sorts by date."""
+    data = data.drop_duplicates(subset=["date"], keep="last")
+    return data.sort_values("date", kind="stable").reset_index(drop=True)
+
+
+class KaribaStore:
+    """Base class for Kariba level stores."""
+
+    def __init__(self, path):
+        self.path = path
+        self.last_written_mtime = None  # mtime after our own last write
+        self._lock = threading.RLock()
+
+    def load(self):
+        """
+        Loads the full history.
+
+        Returns:
+            pd.DataFrame: One row per date, sorted by date.
+        """
+        with self._lock:
+            data = self._read()
+            resolved = resolve_duplicates(data)
+            duplicates = len(data) - len(resolved)
+            if duplicates and duplicates >= COMPACT_RATIO * len(data):
+                logger.info(f"Compacting {self.path}: dropping {duplicates} superseded rows")
+                self._rewrite(resolved)
+        return resolved
+
+    def upsert(self, observations):
+        """
+        Appends observations; a date that already exists is superseded on load.
+
+        Args:
+            observations (pd.DataFrame or list of dict): Rows with date, level and percent_full.
+        """
+        data = normalize_frame(observations)
+        if data.empty:
+            return
+        with self._lock:
+            self._append(data)
+            self._mark_written()
+
+    def compact(self):
+        """Rewrites the store with one row per date."""
+        with self._lock:
+            self._rewrite(resolve_duplicates(self._read()))
+
+    def _mark_written(self):
+        try:
+            self.last_written_mtime = os.path.getmtime(self.path)
+        except OSError:
+            self.last_written_mtime = None
+
+    def _read(self):
+        raise NotImplementedError
+
+    def _append(self, data):
+        raise NotImplementedError
+
+    def _rewrite(self, data):
+        raise NotImplementedError
+
+
+class CsvKaribaStore(KaribaStore):
+    """Plain CSV store, compatible with the original kariba_levels.csv."""
+
+    date_format = "%d/%m/%Y %H:%M"
+
+    def __init__(self, data_dir):
+        super().__init__(os.path.join(data_dir, "kariba_levels.csv"))
+        if not os.path.exists(self.path):
+            self._rewrite(empty_frame())
+
+    def _read(self):
+        data = pd.read_csv(self.path, dtype={"date": str})
+        if data.empty:
+            return empty_frame()
+        data["date"] = parse_dates(data["date"])
+        return normalize_frame(data)
+
+    def _append(self, data):
+        with open(self.path, "rb+") as f:
+            # Hand-edited files may lack a trailing newline
+            f.seek(0, os.SEEK_END)
+            if f.tell():
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) not in (b"\n", b"\r"):
+                    f.write(b"\n")
+        data.to_csv(
+            self.path, mode="a", header=False, index=False, date_format=self.date_format
+        )
+
+    def _rewrite(self, data):
+        tmp_path = self.path + ".tmp"
+        data.to_csv(tmp_path, index=False, date_format=self.date_format)
+        os.replace(tmp_path, self.path)
+        self._mark_written()
+
+
+class ParquetKaribaStore(KaribaStore):
+    """
+    Parquet store. Parquet files cannot be appended to, so each upsert writes
+    a small part file into ``kariba_levels.parquet/`` and compaction merges them.
+    Requires pyarrow.
+    """
+
+    max_parts = 64  # Compact on load once this many part files exist
+
+    def __init__(self, data_dir):
+        super().__init__(os.path.join(data_dir, "kariba_levels.parquet"))
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise ImportError("The parquet Kariba store requires pyarrow.")
+        os.makedirs(self.path, exist_ok=True)
+
+    def _parts(self):
+        return sorted(
+            name for name in os.listdir(self.path) if name.endswith(".parquet")
+        )
+
+    def load(self):
+        with self._lock:
+            if len(self._parts()) > self.max_parts:
+                self.compact()
+            return super().load()
+
+    def _read(self):
+        parts = self._parts()
+        if not parts:
+            return empty_frame()
+        return pd.concat(
+            [pd.read_parquet(os.path.join(self.path, name)) for name in parts],
+            ignore_index=True,
+        )
+
+    def _next_part_name(self):
+        parts = self._parts()
+        number = int(parts[-1].split("-")[1].split(".")[0]) + 1 if parts else 0
+        return f"part-{number:08d}.parquet"
+
+    def _append(self, data):
+        name = self._next_part_name()
+        tmp_path = os.path.join(self.path, name + ".tmp")
+        data.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, os.path.join(self.path, name))
+
+    def _rewrite(self, data):
+        old_parts = self._parts()
+        self._append(data)
+        new_part = self._parts()[-1]
+        for name in old_parts:
+            if name != new_part:
+                os.remove(os.path.join(self.path, name))
+        self._mark_written()
+
+
+class BinaryKaribaStore(KaribaStore):
+    """
+    Fixed-width binary column file, read through a memory map. Each record is
+    a nanosecond timestamp plus level and percent_full as float64, so appends
+    are a single write and loads need no parsing at all.
+    """
+
+    record_dtype = np.dtype(
+        [("date", "<i8"), ("level", "<f8"), ("percent_full", "<f8")]
+    )
+
+    def __init__(self, data_dir):
+        super().__init__(os.path.join(data_dir, "kariba_levels.bin"))
+        if not os.path.exists(self.path):
+            open(self.path, "wb").close()
+
+    def _read(self):
+        size = os.path.getsize(self.path)
+        count = size // self.record_dtype.itemsize
+        if count == 0:
+            return empty_frame()
+        records = np.memmap(self.path, dtype=self.record_dtype, mode="r", shape=(count,))
+        return pd.DataFrame(
+            {
+                "date": pd.to_datetime(np.array(records["date"]), unit="ns"),
+                "level": np.array(records["level"]),
+                "percent_full": np.array(records["percent_full"]),
+            }
+        )
+
+    def _to_records(self, data):
+        records = np.empty(len(data), dtype=self.record_dtype)
+        records["date"] = data["date"].values.astype("datetime64[ns]").astype("<i8")
+        records["level"] = data["level"].to_numpy(dtype="float64")
+        records["percent_full"] = data["percent_full"].to_numpy(dtype="float64")
+        return records
+
+    def _append(self, data):
+        with open(self.path, "ab") as f:
+            f.write(self._to_records(data).tobytes())
+
+    def _rewrite(self, data):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self._to_records(data).tobytes())
+        os.replace(tmp_path, self.path)
+        self._mark_written()
+
+
+STORE_BACKENDS = {
+    "csv": CsvKaribaStore,
+    "parquet": ParquetKaribaStore,
+    "binary": BinaryKaribaStore,
+}
+
+
+def open_kariba_store(data_dir="data", backend="csv"):
+    """
+    Opens the Kariba level store for a data directory.
+
+    Args:
+        data_dir (str, optional): The directory holding the store. Defaults to "data".
+        backend (str, optional): One of "csv", "parquet" or "binary". Defaults to "csv".
+
+    Returns:
+        KaribaStore: The opened store.
+    """
+    try:
+        store_class = STORE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Unknown Kariba store backend '{backend}'. Choose from: {', '.join(STORE_BACKENDS)}"
+        )
+    return store_class(data_dir)
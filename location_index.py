@@ -0,0 +1,379 @@
+# Location resolver #
+# Maps free-text user locations ("Samora Machel Ave", "harare ", "Ridgeveiw")
+# onto the entries of locations.txt.
+#
+# Names are normalized (case, punctuation, street-type abbreviations) and
+# looked up in a dict first, then as exact names inside a longer query
+# ("Harare Ridgeview"); misses fall back to a character-trigram index scored
+# with the Dice coefficient. A fuzzy match also has to agree word by word:
+# generic words such as "road" or "region" never match on their own, and
+# every other word of the query must be a near spelling of a word of the
+# entry, so "Hyde Park" does not become Hyde Road. Entries are organised as
+# region -> suburb -> road, taken from the "... Region" headers in
+# locations.txt.
+
+import re
+from collections import Counter, namedtuple
+from functools import lru_cache
+from itertools import chain
+
+ABBREVIATIONS = {
+    "ave": "avenue",
+    "av": "avenue",
+    "avn": "avenue",
+    "rd": "road",
+    "st": "street",
+    "str": "street",
+    "dr": "drive",
+    "drv": "drive",
+    "cres": "crescent",
+    "cr": "crescent",
+    "cl": "close",
+    "ln": "lane",
+    "pl": "place",
+    "blvd": "boulevard",
+    "cct": "circle",
+    "ext": "extension",
+    "mt": "mount",
+    "nth": "north",
+    "sth": "south",
+    "hre": "harare",
+    "byo": "bulawayo",
+}
+
+ROAD_TYPES = {
+    "avenue", "road", "street", "drive", "crescent", "close", "lane", "place",
+    "boulevard", "circle", "bend", "way", "walk", "highway",
+}
+
+# Words that say what kind of place a name is, not which one
+GENERIC_TOKENS = ROAD_TYPES | {"region", "extension", "north", "south", "east", "west"}
+
+REGION, SUBURB, ROAD = "region", "suburb", "road"
+SPECIFICITY = {REGION: 0, SUBURB: 1, ROAD: 2}
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+LocationMatch = namedtuple("LocationMatch", ["key", "name", "kind", "region", "score"])
+
+
+def normalize_location(text):
+    """Lowercases, strips punctuation and expands street-type abbreviations."""
+    text = _PUNCTUATION.sub(" ", str(text).lower())
+    tokens = _WHITESPACE.split(text.strip())
+    return " ".join(ABBREVIATIONS.get(token, token) for token in tokens if token)
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, limit):
+    """
+    Damerau-Levenshtein distance (adjacent transpositions count once)
+    between two words, or ``limit + 1`` if it is larger than ``limit``.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (a[i - 1] != b[j - 1]),
+            )
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _typo_limit(word):
+    return 1 if len(word) <= 5 else 2
+
+
+def _one_edit_variants(word):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    variants = {a + b[1:] for a, b in splits if b}
+    variants |= {a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1}
+    variants |= {a + c + b[1:] for a, b in splits if b for c in letters}
+    variants |= {a + c + b for a, b in splits for c in letters}
+    return variants
+
+
+# GENERIC_TOKENS plus their misspellings: swapped or extra letters ("raod",
+# "aroad" from "a road"), and for the longer words any one-letter slip
+# ("avenu"). Short words get no more, since a letter changed in "road" or
+# "east" is often a real name ("read", "easy").
+_GENERIC_SPELLINGS = GENERIC_TOKENS | {
+    variant
+    for token in GENERIC_TOKENS
+    for variant in _one_edit_variants(token)
+    if len(variant) >= 4
+    and (len(token) >= 6 or len(variant) > len(token) or sorted(variant) == sorted(token))
+}
+
+
+def is_generic(word):
+    """True for GENERIC_TOKENS and one-letter misspellings of them."""
+    return word in _GENERIC_SPELLINGS
+
+
+def distinctive_words(normalized):
+    """The words of a normalized name that say which place it is."""
+    return [word for word in normalized.split() if not is_generic(word)]
+
+
+class LocationIndex:
+    """Exact and fuzzy lookup over a region/suburb/road gazetteer."""
+
+    def __init__(self, min_score=0.6, cache_size=4096, candidate_grams=6, candidate_budget=2000):
+        """
+        Initializes an empty LocationIndex.
+
+        Args:
+            min_score (float, optional): Lowest Dice similarity accepted as a
+                fuzzy match. Defaults to 0.6.
+            cache_size (int, optional): Resolved queries kept in an LRU cache. Defaults to 4096.
+            candidate_grams (int, optional): How many of the query's rarest
+                trigrams are used to find fuzzy candidates. Defaults to 6.
+            candidate_budget (int, optional): Stop adding postings once they would
+                hold more than this many entries in total. Defaults to 2000.
+        """
+        self.min_score = min_score
+        self.candidate_grams = candidate_grams
+        self.candidate_budget = candidate_budget
+        self.keys = []  # Entry id -> key (the lowercased name used by locations.txt)
+        self.names = []
+        self.kinds = []
+        self.regions = []  # Entry id -> region entry id, or None
+        self._grams = []  # Entry id -> trigrams of the normalized name
+        self._words = []  # Entry id -> distinctive words of the normalized name
+        self._word_grams = []  # Entry id -> trigrams of the distinctive words
+        self._exact = {}  # Normalized name or alias -> entry id
+        self._postings = {}  # Trigram -> list of entry ids
+        self.resolve = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, name, kind=SUBURB, region=None):
+        """
+        Adds a location.
+
+        Args:
+            name (str): Display name, e.g. "Samora Machel Avenue".
+            kind (str, optional): "region", "suburb" or "road". Defaults to "suburb".
+            region (int, optional): Entry id of the enclosing region.
+
+        Returns:
+            int: The new entry id.
+        """
+        entry_id = len(self.keys)
+        normalized = normalize_location(name)
+        self.keys.append(name.strip().lower())
+        self.names.append(name.strip())
+        self.kinds.append(kind)
+        self.regions.append(region)
+
+        aliases = {normalized}
+        if kind == REGION and normalized.endswith(" region"):
+            aliases.add(normalized[: -len(" region")])
+        for alias in aliases:
+            self._exact.setdefault(alias, entry_id)
+
+        grams = frozenset(_trigrams(normalized))
+        self._grams.append(grams)
+        words = [word for word in normalized.split() if word not in GENERIC_TOKENS]
+        words = words or normalized.split()
+        self._words.append(tuple(words))
+        self._word_grams.append(frozenset(_trigrams(" ".join(words))))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(entry_id)
+        self.resolve.cache_clear()
+        return entry_id
+
+    @classmethod
+    def from_lines(cls, lines, **kwargs):
+        """
+        Builds an index from locations.txt lines.
+
+        A line ending in "Region" starts a region; the lines after it are its
+        suburbs, or roads when the name ends in a street type. Anything after
+        a comma is fault information and is not part of the name.
+        """
+        index = cls(**kwargs)
+        region = None
+        for line in lines:
+            name = line.split(",")[0].strip()
+            if not name:
+                continue
+            normalized = normalize_location(name)
+            if normalized.endswith(" region") or normalized == "region":
+                region = index.add(name, REGION)
+            elif normalized.split()[-1] in ROAD_TYPES:
+                index.add(name, ROAD, region)
+            else:
+                index.add(name, SUBURB, region)
+        return index
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Builds an index from a locations.txt file (empty if it does not exist)."""
+        try:
+            with open(path, "r") as f:
+                return cls.from_lines(f, **kwargs)
+        except FileNotFoundError:
+            return cls(**kwargs)
+
+    def _match(self, entry_id, score):
+        region = self.regions[entry_id]
+        return LocationMatch(
+            key=self.keys[entry_id],
+            name=self.names[entry_id],
+            kind=self.kinds[entry_id],
+            region=self.names[region] if region is not None else None,
+            score=score,
+        )
+
+    def _in_region(self, entry_id, region):
+        return region is None or self.regions[entry_id] in (region, None)
+
+    def _phrase_lookup(self, words, region=None):
+        """
+        Best (entry id, score) among exact names found inside a multi-word
+        query, provided those names account for every distinctive word of it.
+        """
+        found = []
+        covered = set()
+        for size in range(len(words) - 1, 0, -1):
+            for start in range(len(words) - size + 1):
+                phrase = " ".join(words[start:start + size])
+                entry_id = self._exact.get(phrase)
+                if (
+                    entry_id is not None
+                    and distinctive_words(phrase)
+                    and self._in_region(entry_id, region)
+                ):
+                    found.append((entry_id, size / len(words)))
+                    covered.update(range(start, start + size))
+        if not found or any(
+            position not in covered
+            for position, word in enumerate(words)
+            if not is_generic(word)
+        ):
+            return None, 0.0
+        return max(found, key=lambda match: (SPECIFICITY[self.kinds[match[0]]], match[1]))
+
+    def _words_agree(self, entry_id, words):
+        """True if every query word is a near spelling of a word of the entry."""
+        entry_words = self._words[entry_id]
+        return all(
+            word in entry_words
+            or any(
+                edit_distance(word, entry_word, _typo_limit(word)) <= _typo_limit(word)
+                for entry_word in entry_words
+            )
+            for word in words
+        )
+
+    def _lookup(self, normalized, region=None):
+        """Best (entry id, score) for one normalized name, optionally within a region."""
+        entry_id = self._exact.get(normalized)
+        if entry_id is not None and self._in_region(entry_id, region):
+            return entry_id, 1.0
+
+        words = distinctive_words(normalized)
+        if not words:
+            return None, 0.0  # Only generic words such as "road": too vague to guess
+        entry_id, score = self._phrase_lookup(normalized.split(), region)
+        if entry_id is not None:
+            return entry_id, score
+
+        grams = _trigrams(normalized)
+        # A query without words like "road" is compared with the entries'
+        # distinctive words only, so "hrare" can still find "harare region"
+        entry_grams_by_id = self._grams if len(words) < len(normalized.split()) else self._word_grams
+        # Candidates come from the query's rarest trigrams only: common ones
+        # like " ro" or "oad" match thousands of entries and say little. With
+        # three or more postings, an entry must appear in at least two of them.
+        postings = sorted(
+            (self._postings[gram] for gram in grams if gram in self._postings), key=len
+        )
+        used, touched = 0, 0
+        for posting in postings:
+            if used >= self.candidate_grams or (
+                used >= 2 and touched + len(posting) > self.candidate_budget
+            ):
+                break
+            used += 1
+            touched += len(posting)
+        counts = Counter(chain.from_iterable(postings[:used]))
+        need = 2 if used >= 3 else 1
+        candidates = [entry_id for entry_id, count in counts.items() if count >= need]
+        best, best_score = None, 0.0
+        for candidate in candidates:
+            if region is not None and self.regions[candidate] not in (region, None):
+                continue
+            entry_grams = entry_grams_by_id[candidate]
+            score = 2.0 * len(grams & entry_grams) / (len(grams) + len(entry_grams))
+            if score < self.min_score or score < best_score:
+                continue
+            if not self._words_agree(candidate, words):
+                continue
+            if score > best_score or (
+                score == best_score
+                and best is not None
+                and SPECIFICITY[self.kinds[candidate]] > SPECIFICITY[self.kinds[best]]
+            ):
+                best, best_score = candidate, score
+        if best is None:
+            return None, 0.0
+        return best, best_score
+
+    def _resolve(self, text):
+        parts = [normalize_location(part) for part in str(text).split(",")]
+        parts = [part for part in parts if part]
+        if not parts:
+            return None
+
+        matches = [self._lookup(part) for part in parts]
+        # A region named in the query narrows down the other parts
+        region = next(
+            (entry_id for entry_id, _ in matches
+             if entry_id is not None and self.kinds[entry_id] == REGION),
+            None,
+        )
+        if region is not None and len(parts) > 1:
+            matches = [
+                (entry_id, score) if entry_id == region else self._lookup(part, region)
+                for part, (entry_id, score) in zip(parts, matches)
+            ]
+
+        found = [(entry_id, score) for entry_id, score in matches if entry_id is not None]
+        if not found:
+            return None
+        # Most specific level wins (road > suburb > region), then similarity
+        entry_id, score = max(
+            found, key=lambda match: (SPECIFICITY[self.kinds[match[0]]], match[1])
+        )
+        return self._match(entry_id, score)
+
+    def children(self, region_name):
+        """Returns the names of all suburbs and roads in a region."""
+        match = self.resolve(region_name)
+        if match is None or match.kind != REGION:
+            return []
+        region = self._exact[normalize_location(match.name)]
+        return [
+            self.names[entry_id]
+            for entry_id, parent in enumerate(self.regions)
+            if parent == region and entry_id != region
+        ]
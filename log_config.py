@@ -0,0 +1,178 @@
+# Logging configuration #
+# The one place logging is set up, for the server and the command-line tools.
+#
+# Records are formatted as one JSON object per line and handed to a
+# QueueHandler; a QueueListener thread does the file and stderr I/O, so a
+# request thread never blocks on disk. The queue is bounded and drops (and
+# counts) records rather than stalling when the writer falls behind.
+#
+# Every record carries the correlation ID of the request it was logged
+# under, kept in a contextvar that the server sets per request. DEBUG lines
+# are sampled per call site (1 in LOG_DEBUG_SAMPLE_EVERY), so leaving debug
+# on in production does not flood the log.
+
+import atexit
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import uuid
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not user-supplied ``extra`` fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "request_id",
+    "color_message",  # uvicorn's ANSI-coloured copy of msg
+}
+
+_listener = None
+_lock = threading.Lock()
+
+
+def new_request_id():
+    """Returns a fresh correlation ID."""
+    return uuid.uuid4().hex[:16]
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps each record with the current request's correlation ID."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class DebugSampler(logging.Filter):
+    """Keeps 1 in ``every`` DEBUG records from each call site."""
+
+    def __init__(self, every=100):
+        super().__init__()
+        self.every = max(1, int(every))
+        self._seen = {}
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        site = (record.pathname, record.lineno)
+        seen = self._seen.get(site, 0)
+        self._seen[site] = seen + 1  # A lost update under a race only shifts the sample
+        return seen % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with any ``extra`` fields included."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        request_id = getattr(record, "request_id", "-")
+        if request_id != "-":
+            entry["request_id"] = request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops records when the queue is full instead of blocking.
+
+    Records are formatted here, on the caller's thread (see QueueHandler.prepare),
+    so the listener thread only writes strings.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(level=None, log_file=None, fmt=None, debug_sample_every=None, queue_size=10000):
+    """
+    Sets up logging for the process; later calls are ignored.
+
+    Arguments default to the LOG_LEVEL, LOG_FILE, LOG_FORMAT and
+    LOG_DEBUG_SAMPLE_EVERY environment variables.
+
+    Args:
+        level (str, optional): Root level. Defaults to "INFO".
+        log_file (str, optional): File to append to. Defaults to "power_prediction.log";
+            an empty string logs to stderr only.
+        fmt (str, optional): "json" (default) or "text".
+        debug_sample_every (int, optional): Keep 1 in this many DEBUG records per
+            call site. Defaults to 100.
+        queue_size (int, optional): Records buffered before new ones are dropped.
+            Defaults to 10000.
+
+    Returns:
+        DroppingQueueHandler: The handler installed on the root logger.
+    """
+    global _listener
+    with _lock:
+        root = logging.getLogger()
+        if _listener is not None:
+            return next(h for h in root.handlers if isinstance(h, DroppingQueueHandler))
+
+        level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+        if log_file is None:
+            log_file = os.environ.get("LOG_FILE", "power_prediction.log")
+        fmt = fmt or os.environ.get("LOG_FORMAT", "json")
+        if debug_sample_every is None:
+            debug_sample_every = int(os.environ.get("LOG_DEBUG_SAMPLE_EVERY", "100"))
+
+        if fmt == "json":
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(
+                "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+            )
+        handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        handler.setFormatter(formatter)
+        handler.addFilter(RequestIdFilter())
+        handler.addFilter(DebugSampler(debug_sample_every))
+
+        # The listener writes records that are already formatted
+        outputs = [logging.StreamHandler()]
+        if log_file:
+            outputs.append(logging.FileHandler(log_file, encoding="utf-8"))
+        for output in outputs:
+            output.setFormatter(logging.Formatter("%(message)s"))
+
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        root.setLevel(level)
+        _listener = logging.handlers.QueueListener(handler.queue, *outputs)
+        _listener.start()
+        atexit.register(shutdown_logging)  # The listener thread is a daemon
+        return handler
+
+
+def shutdown_logging():
+    """Flushes queued records and stops the writer thread."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
@@ -0,0 +1,328 @@
+# Metrics #
+# Counters, gauges and latency histograms in the Prometheus text format.
+#
+# Deliberately small instead of a client-library dependency: recording a
+# value is a dict lookup, a bisect and a few additions, and nothing is
+# formatted until /metrics is scraped. Counters and histograms keep one
+# shard per thread, so the hot path takes no lock; shards are summed when
+# rendering, and a thread's shard is folded into a base total when the
+# thread exits, so short-lived threads do not pile up. Gauges that mirror state
+# kept elsewhere (cache size, queue depth) are read through callbacks at
+# scrape time, so the hot path does not pay for them at all.
+
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+# Seconds; spans a cache hit (tens of microseconds) to a slow upstream call
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}  # Label values as strings -> child
+        self._lookup = {}  # Label values as passed (e.g. an int status) -> child
+        self._lock = threading.Lock()
+
+    def labels(self, *values, **labels):
+        """Returns the child for one combination of label values (cached)."""
+        if labels:
+            values = tuple(labels[name] for name in self.labelnames)
+        child = self._lookup.get(values)
+        if child is None:
+            key = tuple(str(value) for value in values)
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+                self._lookup[values] = child
+        return child
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class _ShardOwner:
+    """Kept in the owning thread's locals; freed when that thread exits."""
+
+    __slots__ = ("__weakref__",)
+
+
+class _Sharded:
+    """Per-thread lists of numbers; only the owning thread writes its shard."""
+
+    __slots__ = ("size", "shards", "base", "_local", "_lock")
+
+    def __init__(self, size):
+        self.size = size
+        self.shards = []  # Shards of live threads
+        self.base = [0] * size  # Totals of threads that have exited
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = [0] * self.size
+            owner = self._local.owner = _ShardOwner()
+            with self._lock:
+                self.shards.append(shard)
+            weakref.finalize(owner, self._retire, shard)
+            return shard
+
+    def _retire(self, shard):
+        with self._lock:
+            self.base = [total + value for total, value in zip(self.base, shard)]
+            self.shards = [other for other in self.shards if other is not shard]
+
+    def totals(self):
+        with self._lock:
+            shards = [self.base] + self.shards
+        return [sum(column) for column in zip(*shards)]
+
+
+class _CounterChild:
+    __slots__ = ("_values",)
+
+    def __init__(self):
+        self._values = _Sharded(1)
+
+    def inc(self, amount=1):
+        self._values.shard()[0] += amount
+
+    @property
+    def value(self):
+        return self._values.totals()[0]
+
+
+class Counter(_Metric):
+    """A monotonically increasing count, e.g. upstream calls by outcome."""
+
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def render(self):
+        lines = self._header()
+        for values, child in list(self._children.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}")
+        return lines
+
+
+class _GaugeChild:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        """Reads the value from ``function()`` at scrape time instead."""
+        self.function = function
+
+    def get(self):
+        return self.function() if self.function is not None else self.value
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, set directly or read from a callback."""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def set_function(self, function):
+        self.labels().set_function(function)
+
+    def render(self):
+        lines = self._header()
+        for values, child in list(self._children.items()):
+            try:
+                value = float(child.get())
+            except Exception:
+                continue  # A broken callback must not break the scrape
+            lines.append(f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("child", "start")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.child.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "_values")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # Bucket counts (the last is +Inf), then the sum of observed values
+        self._values = _Sharded(len(buckets) + 2)
+
+    def observe(self, value):
+        shard = self._values.shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def snapshot(self):
+        """Returns (bucket counts, sum, count)."""
+        totals = self._values.totals()
+        counts = totals[:-1]
+        return counts, totals[-1], sum(counts)
+
+    def time(self):
+        """Context manager that observes the duration of its block."""
+        return _Timer(self)
+
+
+class Histogram(_Metric):
+    """Latency distribution in fixed buckets, e.g. per-stage seconds."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def time(self, *values, **labels):
+        """``with histogram.time(stage="kariba_fetch"):`` times the block."""
+        return self.labels(*values, **labels).time()
+
+    def render(self):
+        lines = self._header()
+        for values, child in list(self._children.items()):
+            counts, total, count = child.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, values, [("le", _format_value(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing  # Re-imports and reloads share one metric
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "zirrmi_stage_seconds",
+    "Time spent in each engine stage.",
+    ["stage"],
+)
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    "zirrmi_upstream_requests_total",
+    "Calls to upstream services by outcome.",
+    ["upstream", "outcome"],
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "zirrmi_http_request_seconds",
+    "HTTP request latency by route and status.",
+    ["method", "route", "status"],
+)
+STATE = REGISTRY.gauge(
+    "zirrmi_state",
+    "Cache, queue and table sizes sampled at scrape time.",
+    ["name"],
+)
+
+
+_STAGE_CHILDREN = {}
+
+
+def stage(name):
+    """``with stage("kariba_fetch"):`` records the block in STAGE_SECONDS."""
+    child = _STAGE_CHILDREN.get(name)
+    if child is None:
+        child = _STAGE_CHILDREN[name] = STAGE_SECONDS.labels(name)
+    return _Timer(child)
+
+
+def upstream(name, ok):
+    """Counts one call to an upstream service as a success or an error."""
+    UPSTREAM_REQUESTS.labels(name, "success" if ok else "error").inc()
@@ -0,0 +1,298 @@
+# OCR ingestion pipeline #
+# Reads generation figures out of the image bulletins ZPC posts.
+#
+# Images are cleaned up before Tesseract sees them: converted to grayscale,
+# inverted if the bulletin is light-on-dark, upscaled if small, thresholded
+# to black and white and cropped to the box around the table's ink. OCR runs
+# in a process pool, since Tesseract and the pixel work are CPU-bound.
+#
+# Generation sources run under a deadline of seconds, so they never wait on
+# OCR: cached_generation_data() starts it in the background and reads what is
+# already cached, and the figures are picked up once OCR finishes.
+#
+# Results are memoized by the SHA-256 of the image bytes, in memory and in an
+# append-only file, so an image is never OCR'd twice, even across restarts.
+# A perceptual hash is deliberately not used as the key: ZPC bulletins share
+# one template and differ only in the figures, which is exactly what a
+# perceptual hash ignores.
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from io import BytesIO
+
+import pytesseract
+from PIL import Image, ImageOps, ImageStat
+
+from generation_parser import parse_generation_data
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(data):
+    """Hex SHA-256 of raw image bytes."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def preprocess_image(image, threshold=160, crop_box=None, margin=12, min_width=1200):
+    """
+    Prepares a bulletin image for OCR.
+
+    Args:
+        image (PIL.Image.Image): Bulletin image.
+        threshold (int, optional): Gray level (0-255) above which a pixel is
+            background. Defaults to 160.
+        crop_box (tuple, optional): (left, top, right, bottom) of the table in
+            the original image. Defaults to the bounding box of the ink.
+        margin (int, optional): Pixels kept around the detected table. Defaults to 12.
+        min_width (int, optional): Images narrower than this are upscaled,
+            since Tesseract reads small text poorly. Defaults to 1200.
+
+    Returns:
+        PIL.Image.Image: Black text on a white background, mode "L".
+    """
+    gray = ImageOps.grayscale(image.convert("RGB"))
+    if crop_box is not None:
+        gray = gray.crop(crop_box)
+    if ImageStat.Stat(gray).mean[0] < 128:
+        gray = ImageOps.invert(gray)  # Light text on a dark background
+    gray = ImageOps.autocontrast(gray)
+    if gray.width < min_width:
+        scale = min_width / gray.width
+        gray = gray.resize((min_width, round(gray.height * scale)), Image.LANCZOS)
+    binary = gray.point([0] * (threshold + 1) + [255] * (255 - threshold))
+    if crop_box is None:
+        ink = ImageOps.invert(binary).getbbox()
+        if ink is not None:
+            left, top, right, bottom = ink
+            binary = binary.crop(
+                (
+                    max(0, left - margin),
+                    max(0, top - margin),
+                    min(binary.width, right + margin),
+                    min(binary.height, bottom + margin),
+                )
+            )
+    return binary
+
+
+def ocr_image_bytes(data, threshold=160, crop_box=None, config="--psm 6", timeout=0):
+    """
+    Preprocesses and OCRs one encoded image. Runs inside the worker processes.
+
+    Returns:
+        str: The recognized text.
+    """
+    with Image.open(BytesIO(data)) as image:
+        prepared = preprocess_image(image, threshold=threshold, crop_box=crop_box)
+    return pytesseract.image_to_string(prepared, config=config, timeout=timeout)
+
+
+class OcrPipeline:
+    """Process-pool OCR with a content-hash result cache."""
+
+    def __init__(
+        self,
+        workers=2,
+        cache_path=None,
+        cache_size=1000,
+        threshold=160,
+        crop_box=None,
+        config="--psm 6",
+        timeout=0,
+    ):
+        """
+        Initializes the OcrPipeline. Worker processes are started on first use.
+
+        Args:
+            workers (int, optional): OCR processes. Defaults to 2.
+            cache_path (str, optional): Append-only file that keeps results
+                across restarts. Memory only if None.
+            cache_size (int, optional): Results kept in memory. Defaults to 1000.
+            threshold (int, optional): Binarization threshold. Defaults to 160.
+            crop_box (tuple, optional): Fixed table region; detected if None.
+            config (str, optional): Extra Tesseract arguments. Defaults to "--psm 6"
+                (one uniform block of text).
+            timeout (float, optional): Seconds Tesseract may spend on one image
+                before it is killed; 0 for no limit. Defaults to 0.
+        """
+        self.workers = workers
+        self.cache_path = cache_path
+        self.cache_size = cache_size
+        self.options = {
+            "threshold": threshold,
+            "crop_box": crop_box,
+            "config": config,
+            "timeout": timeout,
+        }
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.ocr_seconds = 0.0
+        self._executor = None
+        self._cache = OrderedDict()  # content hash -> text, LRU order
+        self._in_flight = {}  # content hash -> Future, so concurrent duplicates share one run
+        self._lock = threading.Lock()
+        if cache_path:
+            self._load_cache()
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return
+        with open(self.cache_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn last line from a crash
+                self._remember(entry["hash"], entry["text"])
+        logger.info(f"Loaded {len(self._cache)} cached OCR results from {self.cache_path}")
+
+    def _remember(self, key, text):
+        self._cache[key] = text
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _persist(self, key, text):
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with open(self.cache_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"hash": key, "text": text}) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not persist OCR result: {e}")
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def submit(self, data):
+        """
+        Starts OCR of one encoded image (PNG, JPEG, ...).
+
+        Args:
+            data (bytes): The image file contents.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the recognized text.
+        """
+        key = content_hash(data)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                done = Future()
+                done.set_result(self._cache[key])
+                return done
+            if key in self._in_flight:
+                self.hits += 1
+                return self._in_flight[key]
+            self.misses += 1
+            started = time.perf_counter()
+            future = self._pool().submit(ocr_image_bytes, data, **self.options)
+            self._in_flight[key] = future
+        future.add_done_callback(lambda f: self._finish(key, f, started))
+        return future
+
+    def _finish(self, key, future, started):
+        with self._lock:
+            self._in_flight.pop(key, None)
+            self.ocr_seconds += time.perf_counter() - started
+            if future.cancelled() or future.exception() is not None:
+                self.failures += 1
+                return
+            text = future.result()
+            self._remember(key, text)
+        self._persist(key, text)
+
+    def ocr(self, data, timeout=None):
+        """Returns the text of one encoded image, from the cache when possible."""
+        return self.submit(data).result(timeout=timeout)
+
+    def ocr_many(self, images, timeout=None):
+        """
+        OCRs several encoded images in parallel.
+
+        Returns:
+            list: Text per image, in order; None where OCR failed.
+        """
+        futures = [self.submit(data) for data in images]
+        texts = []
+        for future in futures:
+            try:
+                texts.append(future.result(timeout=timeout))
+            except Exception as e:
+                logger.warning(f"OCR failed: {e}")
+                texts.append(None)
+        return texts
+
+    def generation_data(self, images, timeout=None):
+        """
+        Parses generation figures out of bulletin images.
+
+        Args:
+            images (list of bytes): Encoded images, e.g. every photo in one tweet.
+
+        Returns:
+            dict: Station -> "<n>MW", merged across images (later images win).
+        """
+        data = {}
+        for text in self.ocr_many(images, timeout=timeout):
+            if text:
+                data.update(parse_generation_data(text))
+        return data
+
+    def cached_generation_data(self, images, on_ready=None):
+        """
+        Parses generation figures out of the bulletin images already OCR'd,
+        starting OCR of the others in the background without waiting for it.
+
+        Args:
+            images (list of bytes): Encoded images, e.g. every photo in one tweet.
+            on_ready (callable, optional): Called with no arguments whenever one
+                of the images still being OCR'd has been read and cached.
+
+        Returns:
+            dict: Station -> "<n>MW" from the finished images (later images win).
+        """
+        data = {}
+        for future in [self.submit(image) for image in images]:
+            if not future.done():
+                if on_ready is not None:
+                    future.add_done_callback(
+                        lambda f: not f.cancelled() and f.exception() is None and on_ready()
+                    )
+                continue
+            if future.cancelled() or future.exception() is not None:
+                continue
+            data.update(parse_generation_data(future.result()))
+        return data
+
+    def stats(self):
+        """Cache and worker counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "failures": self.failures,
+                "cached": len(self._cache),
+                "in_flight": len(self._in_flight),
+                "mean_ocr_seconds": self.ocr_seconds / self.misses if self.misses else None,
+            }
+
+    def close(self):
+        """Stops the worker processes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
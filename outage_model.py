@@ -0,0 +1,437 @@
+# Outage duration model #
+# Ridge regression of daily outage hours on Kariba level and trend, the
+# generation mix, weekday and location, trained offline from history.
+#
+# Training joins an outage history (date, location, outage_hours) to the
+# Kariba store and a daily generation table, standardizes the numeric
+# features and solves the ridge normal equations with numpy. Each location
+# seen often enough gets its own offset, shrunk towards zero by the same
+# penalty, so thinly-reported areas fall back to the national estimate.
+#
+# The result is a small versioned JSON artifact. Inference is a dot product
+# over a dozen features shared by every location plus one dict lookup per
+# location, so a whole batch costs about as much as one prediction.
+#
+#   python outage_model.py train --outages data/outage_history.csv \
+#       --generation data/generation_history.csv --out data/outage_model.json
+
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from kariba_store import open_kariba_store, parse_dates
+from location_index import normalize_location
+from log_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_FORMAT = 1
+
+NUMERIC_FEATURES = [
+    "level",
+    "level_trend",
+    "kariba_mw",
+    "hwange_mw",
+    "ipps_mw",
+    "imports_mw",
+    "total_mw",
+]
+GENERATION_COLUMNS = {
+    "kariba_mw": "Kariba",
+    "hwange_mw": "Hwange",
+    "ipps_mw": "IPPS",
+    "imports_mw": "Imports",
+    "total_mw": "TOTAL",
+}
+
+# Reason reported for whichever group pushes the prediction up the most
+REASONS = {
+    "level": "Low Kariba Water Levels",
+    "level_trend": "Low Kariba Water Levels",
+    "kariba_mw": "Low Kariba Output",
+    "hwange_mw": "Insufficient Power Generation",
+    "ipps_mw": "Insufficient Power Generation",
+    "imports_mw": "Insufficient Power Generation",
+    "total_mw": "Insufficient Power Generation",
+    "weekday": "Scheduled Load Shedding",
+    "location": "Local Supply Constraints",
+}
+NORMAL_REASON = "Normal Power Supply"
+
+MAX_HOURS = 24.0
+
+
+def mw_value(generation_data, station):
+    """Reads "485MW" style figures as a float, NaN when missing or unreadable."""
+    value = generation_data.get(station) if generation_data else None
+    if value is None:
+        return float("nan")
+    try:
+        return float(str(value).replace("MW", "").replace(",", "").strip())
+    except ValueError:
+        return float("nan")
+
+
+def level_trend(dates, levels, end, days=7):
+    """
+    Least-squares slope of the Kariba level, in metres per day, over the
+    ``days`` days ending at the last reading on or before ``end`` (the same
+    window KaribaTrendStats keeps for live predictions).
+
+    Args:
+        dates (np.ndarray): datetime64 observation dates, ascending.
+        levels (np.ndarray): Levels for those dates.
+        end (datetime-like): Day being predicted.
+        days (int, optional): Window length. Defaults to 7.
+
+    Returns:
+        float: The slope, or 0.0 with fewer than two observations in the window.
+    """
+    end = np.datetime64(pd.Timestamp(end).normalize() + pd.Timedelta(days=1), "ns")
+    hi = int(np.searchsorted(dates, end))
+    if hi < 2:
+        return 0.0
+    last = dates[hi - 1].astype("datetime64[D]").astype("datetime64[ns]")
+    lo = int(np.searchsorted(dates, last - np.timedelta64(days - 1, "D")))
+    if hi - lo < 2:
+        return 0.0
+    x = (dates[lo:hi] - dates[lo]) / np.timedelta64(1, "D")
+    y = levels[lo:hi]
+    x_centered = x - x.mean()
+    denominator = float(x_centered @ x_centered)
+    if denominator == 0:
+        return 0.0
+    return float(x_centered @ (y - y.mean()) / denominator)
+
+
+def context_features(kariba_data, trend, generation_data, when=None):
+    """
+    Builds the location-independent feature values for one prediction.
+
+    Args:
+        kariba_data (dict): Latest Kariba reading with "level", or None.
+        trend (float): Kariba level slope in metres per day.
+        generation_data (dict): Generation figures such as {"Kariba": "485MW"}.
+        when (datetime.date, optional): Day being predicted. Defaults to today.
+
+    Returns:
+        dict: Feature name -> value (NaN where unknown), plus "weekday".
+    """
+    when = when or datetime.date.today()
+    features = {
+        "level": float(kariba_data["level"]) if kariba_data else float("nan"),
+        "level_trend": float(trend),
+    }
+    for feature, station in GENERATION_COLUMNS.items():
+        features[feature] = mw_value(generation_data, station)
+    if np.isnan(features["total_mw"]):
+        parts = [features[name] for name in ("kariba_mw", "hwange_mw", "ipps_mw", "imports_mw")]
+        if not all(np.isnan(parts)):
+            features["total_mw"] = float(np.nansum(parts))
+    features["weekday"] = when.weekday()
+    return features
+
+
+class OutageModel:
+    """A trained outage-duration model loaded from its JSON artifact."""
+
+    def __init__(self, artifact):
+        """
+        Initializes the OutageModel.
+
+        Args:
+            artifact (dict): Parsed artifact, as written by train_outage_model.
+
+        Raises:
+            ValueError: If the artifact format is not supported.
+        """
+        if artifact.get("format") != ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported outage model format: {artifact.get('format')}")
+        if artifact["features"] != NUMERIC_FEATURES:
+            raise ValueError("Outage model was trained on a different feature set.")
+        self.artifact = artifact
+        self.version = artifact["version"]
+        self.mean = np.asarray(artifact["mean"], dtype=np.float64)
+        self.scale = np.asarray(artifact["scale"], dtype=np.float64)
+        self.fill = np.asarray(artifact["fill"], dtype=np.float64)
+        self.coef = np.asarray(artifact["coef"], dtype=np.float64)
+        self.weekday = np.asarray(artifact["weekday"], dtype=np.float64)
+        self.intercept = float(artifact["intercept"])
+        self.locations = artifact["locations"]
+
+    @classmethod
+    def from_file(cls, path):
+        """Loads a model artifact from disk."""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def contributions(self, features):
+        """Hours each numeric feature and the weekday add to the intercept."""
+        values = np.array([features[name] for name in NUMERIC_FEATURES], dtype=np.float64)
+        values = np.where(np.isnan(values), self.fill, values)
+        contributions = (values - self.mean) / self.scale * self.coef
+        result = dict(zip(NUMERIC_FEATURES, contributions.tolist()))
+        result["weekday"] = float(self.weekday[features["weekday"]])
+        return result
+
+    def predict(self, features, locations):
+        """
+        Predicts outage hours for several locations under the same conditions.
+
+        Args:
+            features (dict): From context_features().
+            locations (list of str): Location names (normalized here).
+
+        Returns:
+            list of tuple: (predicted_hours, reason) per location, in input order.
+        """
+        contributions = self.contributions(features)
+        base = self.intercept + sum(contributions.values())
+        driver, driver_hours = max(contributions.items(), key=lambda item: item[1])
+        offsets = np.array(
+            [self.locations.get(normalize_location(location), 0.0) for location in locations],
+            dtype=np.float64,
+        )
+        hours = np.clip(base + offsets, 0.0, MAX_HOURS)
+        hours = np.round(hours * 2) / 2  # Half-hour steps, like the threshold ladder
+        results = []
+        for value, offset in zip(hours.tolist(), offsets.tolist()):
+            if value < 1:
+                reason = NORMAL_REASON
+            elif offset > max(driver_hours, 0):
+                reason = REASONS["location"]
+            elif driver_hours > 0:
+                reason = REASONS[driver]
+            else:
+                reason = NORMAL_REASON
+            results.append((value, reason))
+        return results
+
+
+def load_outage_model(path):
+    """
+    Loads the model artifact at ``path``.
+
+    Returns:
+        OutageModel: The model, or None if there is no usable artifact (the
+            caller falls back to the threshold rules).
+    """
+    if not path or not os.path.exists(path):
+        logger.info(f"No outage model at {path}; using threshold rules.")
+        return None
+    try:
+        model = OutageModel.from_file(path)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Could not load outage model {path}: {e}")
+        return None
+    logger.info(f"Loaded outage model {model.version} from {path}")
+    return model
+
+
+def load_generation_history(path):
+    """
+    Reads a daily generation table: a "date" or "timestamp" column plus MW
+    columns named after the stations (as built by parse_generation_bulletins).
+    """
+    table = pd.read_csv(path)
+    date_column = "date" if "date" in table.columns else "timestamp"
+    table["date"] = parse_dates(table[date_column]).dt.normalize()
+    columns = [station for station in GENERATION_COLUMNS.values() if station in table.columns]
+    for column in columns:
+        table[column] = pd.to_numeric(
+            table[column].astype(str).str.replace("MW", "").str.replace(",", ""), errors="coerce"
+        )
+    return table.dropna(subset=["date"]).groupby("date")[columns].mean().sort_index()
+
+
+def build_training_frame(outages, kariba, generation=None, trend_days=7):
+    """
+    Joins outage history to the inputs known on each day.
+
+    Args:
+        outages (pd.DataFrame): date, location, outage_hours.
+        kariba (pd.DataFrame): Kariba store frame (date, level, percent_full).
+        generation (pd.DataFrame, optional): From load_generation_history.
+        trend_days (int, optional): Window for the level trend. Defaults to 7.
+
+    Returns:
+        pd.DataFrame: One row per outage record with every NUMERIC_FEATURE,
+            weekday, location and outage_hours.
+    """
+    frame = outages.copy()
+    frame["date"] = parse_dates(frame["date"]).dt.normalize()
+    frame["outage_hours"] = pd.to_numeric(frame["outage_hours"], errors="coerce")
+    frame["location"] = frame.get("location", pd.Series("", index=frame.index)).fillna("")
+    frame["location"] = frame["location"].map(normalize_location)
+    frame = frame.dropna(subset=["date", "outage_hours"]).sort_values("date")
+
+    kariba = kariba.dropna(subset=["date", "level"]).sort_values("date")
+    # merge_asof needs the same datetime unit on both sides; callers' frames may be in "us"
+    kariba = kariba.assign(date=kariba["date"].astype("datetime64[ns]"))
+    dates = kariba["date"].to_numpy(dtype="datetime64[ns]")
+    levels = kariba["level"].to_numpy(dtype=np.float64)
+    days = pd.DataFrame({"date": frame["date"].unique()})
+    days = pd.merge_asof(days, kariba[["date", "level"]], on="date", direction="backward")
+    days["level_trend"] = [level_trend(dates, levels, day, trend_days) for day in days["date"]]
+    if generation is not None and not generation.empty:
+        generation = generation.reset_index()
+        days = pd.merge_asof(
+            days, generation, on="date", direction="backward", tolerance=pd.Timedelta(days=3)
+        )
+    for feature, station in GENERATION_COLUMNS.items():
+        days[feature] = days[station] if station in days.columns else np.nan
+    station_sum = days[["kariba_mw", "hwange_mw", "ipps_mw", "imports_mw"]].sum(axis=1, min_count=1)
+    days["total_mw"] = days["total_mw"].fillna(station_sum)
+
+    frame = frame.merge(days[["date"] + NUMERIC_FEATURES], on="date", how="left")
+    frame["weekday"] = frame["date"].dt.weekday
+    return frame
+
+
+def _design_matrix(frame, mean, scale, fill, location_names):
+    numeric = frame[NUMERIC_FEATURES].to_numpy(dtype=np.float64)
+    numeric = np.where(np.isnan(numeric), fill, numeric)
+    numeric = (numeric - mean) / scale
+    weekday = np.eye(7)[frame["weekday"].to_numpy()]
+    location_ids = {name: i for i, name in enumerate(location_names)}
+    locations = np.zeros((len(frame), len(location_names)))
+    for row, name in enumerate(frame["location"]):
+        column = location_ids.get(name)
+        if column is not None:
+            locations[row, column] = 1.0
+    return np.hstack([numeric, weekday, locations, np.ones((len(frame), 1))])
+
+
+def _fit(frame, alpha, min_location_samples):
+    numeric = frame[NUMERIC_FEATURES].to_numpy(dtype=np.float64)
+    known = ~np.isnan(numeric)
+    counts = known.sum(axis=0)
+    fill = np.where(counts > 0, np.where(known, numeric, 0.0).sum(axis=0) / np.maximum(counts, 1), 0.0)
+    filled = np.where(np.isnan(numeric), fill, numeric)
+    mean = filled.mean(axis=0)
+    scale = filled.std(axis=0)
+    scale[scale == 0] = 1.0
+    samples = frame.loc[frame["location"] != "", "location"].value_counts()
+    location_names = sorted(samples[samples >= min_location_samples].index)
+
+    x = _design_matrix(frame, mean, scale, fill, location_names)
+    y = frame["outage_hours"].to_numpy(dtype=np.float64)
+    penalty = np.full(x.shape[1], float(alpha))
+    penalty[-1] = 0.0  # Intercept is not shrunk
+    weights = np.linalg.solve(x.T @ x + np.diag(penalty), x.T @ y)
+    n = len(NUMERIC_FEATURES)
+    return {
+        "mean": mean,
+        "scale": scale,
+        "fill": fill,
+        "coef": weights[:n],
+        "weekday": weights[n:n + 7],
+        "locations": dict(zip(location_names, weights[n + 7:-1].tolist())),
+        "intercept": float(weights[-1]),
+    }
+
+
+def _mae(fit, frame):
+    x = _design_matrix(frame, fit["mean"], fit["scale"], fit["fill"], list(fit["locations"]))
+    weights = np.concatenate(
+        [fit["coef"], fit["weekday"], list(fit["locations"].values()), [fit["intercept"]]]
+    )
+    predicted = np.clip(x @ weights, 0.0, MAX_HOURS)
+    return float(np.abs(predicted - frame["outage_hours"].to_numpy()).mean())
+
+
+def train_outage_model(frame, alpha=1.0, min_location_samples=5, holdout=0.2):
+    """
+    Fits the model and returns its artifact.
+
+    The most recent ``holdout`` share of days is held out to report an honest
+    error before the final fit on everything.
+
+    Args:
+        frame (pd.DataFrame): From build_training_frame.
+        alpha (float, optional): Ridge penalty. Defaults to 1.0.
+        min_location_samples (int, optional): Records a location needs to get
+            its own offset. Defaults to 5.
+        holdout (float, optional): Share of days held out. Defaults to 0.2.
+
+    Returns:
+        dict: The artifact, ready for json.dump.
+    """
+    if len(frame) < 10:
+        raise ValueError(f"Need at least 10 outage records to train, got {len(frame)}.")
+    days = np.sort(frame["date"].unique())
+    cutoff = days[int(len(days) * (1 - holdout))] if holdout and len(days) > 1 else None
+    metrics = {"samples": int(len(frame))}
+    if cutoff is not None:
+        train, test = frame[frame["date"] < cutoff], frame[frame["date"] >= cutoff]
+        if len(train) and len(test):
+            fit = _fit(train, alpha, min_location_samples)
+            baseline = float(np.abs(test["outage_hours"] - train["outage_hours"].mean()).mean())
+            metrics.update(
+                holdout_samples=int(len(test)),
+                holdout_mae=_mae(fit, test),
+                holdout_baseline_mae=baseline,
+            )
+    fit = _fit(frame, alpha, min_location_samples)
+    metrics["train_mae"] = _mae(fit, frame)
+
+    artifact = {
+        "format": ARTIFACT_FORMAT,
+        "trained_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "alpha": alpha,
+        "features": NUMERIC_FEATURES,
+        "mean": fit["mean"].tolist(),
+        "scale": fit["scale"].tolist(),
+        "fill": fit["fill"].tolist(),
+        "coef": fit["coef"].tolist(),
+        "weekday": fit["weekday"].tolist(),
+        "intercept": fit["intercept"],
+        "locations": fit["locations"],
+        "metrics": metrics,
+    }
+    digest = hashlib.sha256(json.dumps(artifact, sort_keys=True).encode()).hexdigest()[:12]
+    artifact["version"] = f"{artifact['trained_at'][:10].replace('-', '')}-{digest}"
+    return artifact
+
+
+def save_artifact(artifact, path):
+    """Writes an artifact atomically, so a running server never reads half a file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, indent=2)
+    os.replace(tmp, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outage duration model.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train = commands.add_parser("train", help="Fit a model from history and write its artifact.")
+    train.add_argument("--outages", required=True, help="CSV of date, location, outage_hours")
+    train.add_argument("--generation", help="CSV of daily generation (date + station MW columns)")
+    train.add_argument("--data-dir", default="data", help="Directory holding the Kariba store")
+    train.add_argument("--store-backend", default="csv")
+    train.add_argument("--alpha", type=float, default=1.0)
+    train.add_argument("--min-location-samples", type=int, default=5)
+    train.add_argument("--out", default=os.path.join("data", "outage_model.json"))
+    args = parser.parse_args()
+
+    configure_logging(log_file="", fmt="text")
+    outages = pd.read_csv(args.outages)
+    kariba = open_kariba_store(args.data_dir, args.store_backend).load()
+    generation = load_generation_history(args.generation) if args.generation else None
+    frame = build_training_frame(outages, kariba, generation)
+    artifact = train_outage_model(frame, args.alpha, args.min_location_samples)
+    save_artifact(artifact, args.out)
+    print(f"Wrote outage model {artifact['version']} to {args.out}")
+    print(json.dumps(artifact["metrics"], indent=2))
+
+
+if __name__ == "__main__":
+    main()
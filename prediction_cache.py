@@ -0,0 +1,87 @@
+# Prediction result cache #
+# In-process LRU/TTL cache for (hours, reason) predictions.
+#
+# Entries are keyed by normalized location and tagged with a version stamp of
+# every input the prediction depends on. When the stamp changes the whole
+# cache is dropped, so a changed input invalidates results exactly instead of
+# waiting for a timer; the TTL is only a backstop.
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with a TTL backstop and hit/miss counters."""
+
+    def __init__(self, maxsize=10000, ttl=3600, clock=time.monotonic):
+        """
+        Initializes the PredictionCache.
+
+        Args:
+            maxsize (int, optional): Most entries kept. Defaults to 10000.
+            ttl (float, optional): Seconds an entry may live. Defaults to 3600.
+            clock (callable, optional): Returns the current time in seconds.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._version = None
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key, version):
+        """
+        Returns the cached value for ``key`` under ``version``, or None.
+        """
+        now = self.clock()
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, version, value):
+        """Stores ``value`` for ``key`` under ``version``."""
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drops every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Returns hit/miss counters and the current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
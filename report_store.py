@@ -0,0 +1,321 @@
+# Outage report ingestion #
+# Durable storage for user-submitted outage reports.
+#
+# Reports are queued in memory and written by a single background thread in
+# batches, one SQLite transaction (WAL mode) per batch, so many reports share
+# each fsync. The queue is bounded: when it is full, submit() refuses new
+# reports instead of letting memory grow. A batch that fails to write is
+# retried with backoff and never dropped while the store is open; the queue
+# backs up behind it, so submit() refuses reports rather than losing them.
+# close() drains the queue before it returns, so no accepted report is lost on
+# a clean shutdown.
+#
+# Reporters' phone numbers are only stored as salted hashes. The salt comes
+# from REPORT_CONTACT_SALT, or is generated once and kept in the database.
+
+import contextlib
+import datetime
+import hashlib
+import logging
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # Queue sentinel telling the writer thread to exit
+
+
+class ReportQueueFull(Exception):
+    """Raised when the ingestion queue is full and the report was not accepted."""
+
+
+def hash_contact(contact, salt):
+    """
+    Returns a salted SHA-256 hash of a phone number, so reports can be grouped
+    by reporter without storing the number itself.
+
+    Raises:
+        ValueError: If ``salt`` is empty; unsalted hashes of phone numbers can
+            be reversed by hashing every possible number.
+    """
+    if not contact:
+        return None
+    if not salt:
+        raise ValueError("A contact salt is required.")
+    digits = "".join(ch for ch in str(contact) if ch.isdigit())
+    return hashlib.sha256(f"{salt}:{digits}".encode()).hexdigest()
+
+
+class OutageReportStore:
+    """Batched, group-committed SQLite store for outage reports."""
+
+    def __init__(
+        self,
+        db_path=os.path.join("data", "outage_reports.db"),
+        batch_size=500,
+        max_queue=10000,
+        flush_interval=0.05,
+        contact_salt=None,
+        retry_backoff=0.1,
+        max_retry_backoff=5.0,
+    ):
+        """
+        Initializes the OutageReportStore.
+
+        Args:
+            db_path (str, optional): SQLite database file. Defaults to "data/outage_reports.db".
+            batch_size (int, optional): Most reports written per transaction. Defaults to 500.
+            max_queue (int, optional): Reports held in memory before submit() refuses more.
+                Defaults to 10000.
+            flush_interval (float, optional): Seconds an idle writer waits on the
+                queue before polling again. It does not delay commits: the writer
+                commits whatever is queued, up to batch_size, as soon as a report
+                arrives. Defaults to 0.05.
+            contact_salt (str, optional): Salt for contact hashes. Defaults to
+                the REPORT_CONTACT_SALT environment variable, or a random salt
+                generated on first use and kept in the database.
+            retry_backoff (float, optional): First delay in seconds before a
+                failed batch is written again, doubled on each further failure.
+                Defaults to 0.1.
+            max_retry_backoff (float, optional): Longest delay between write
+                attempts. Defaults to 5.
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.batches = 0
+        self.write_errors = 0
+        self._thread = None
+        self._closed = False
+        self._submit_lock = threading.Lock()  # Orders submits against close()
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        with self._transaction() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS outage_reports (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    reported_at TEXT NOT NULL,
+                    location TEXT NOT NULL,
+                    details TEXT,
+                    contact_hash TEXT
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_outage_reports_location_time "
+                "ON outage_reports (location, reported_at)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS report_settings (name TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO report_settings (name, value) VALUES ('contact_salt', ?)",
+                (secrets.token_hex(16),),
+            )
+            stored_salt = conn.execute(
+                "SELECT value FROM report_settings WHERE name = 'contact_salt'"
+            ).fetchone()[0]
+        self.contact_salt = contact_salt or os.environ.get("REPORT_CONTACT_SALT") or stored_salt
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # fsync at checkpoints, safe in WAL
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def start(self):
+        """Starts the background writer thread."""
+        if self._thread is None:
+            self._closed = False
+            self._thread = threading.Thread(
+                target=self._run, name="report-writer", daemon=True
+            )
+            self._thread.start()
+
+    def submit(self, location, details="", contact=None, reported_at=None, timeout=None):
+        """
+        Queues a report for writing.
+
+        Args:
+            location (str): Where the outage is.
+            details (str, optional): Free-text details from the reporter.
+            contact (str, optional): Reporter's phone number; only its hash is stored.
+            reported_at (datetime.datetime, optional): Report time. Defaults to now (UTC).
+            timeout (float, optional): Seconds to wait for queue space. None (the
+                default) does not wait at all.
+
+        Raises:
+            ReportQueueFull: If the store is closed or the queue stayed full.
+        """
+        reported_at = reported_at or datetime.datetime.now(datetime.timezone.utc)
+        row = (
+            reported_at.isoformat(),
+            location,
+            details,
+            hash_contact(contact, self.contact_salt),
+        )
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # Checked under the lock, so no report is queued behind close()'s sentinel
+            with self._submit_lock:
+                if self._closed:
+                    raise ReportQueueFull("Report store is closed.")
+                try:
+                    self.queue.put_nowait(row)
+                    return
+                except queue.Full:
+                    pass
+            if deadline is None or time.monotonic() >= deadline:
+                raise ReportQueueFull("Outage report queue is full.")
+            time.sleep(min(0.01, max(0.0, deadline - time.monotonic())))
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            stopping = False
+            while not stopping:
+                try:
+                    first = self.queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                batch = []
+                if first is _STOP:
+                    stopping = True
+                else:
+                    batch.append(first)
+                # Drain whatever else is waiting, up to one batch
+                while len(batch) < self.batch_size:
+                    try:
+                        row = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if row is _STOP:
+                        stopping = True
+                        continue
+                    batch.append(row)
+                if stopping:
+                    # Flush everything still queued before exiting
+                    while True:
+                        try:
+                            row = self.queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if row is not _STOP:
+                            batch.append(row)
+                if batch:
+                    self._write(conn, batch)
+        finally:
+            conn.close()
+
+    def _write(self, conn, batch, shutdown_attempts=3):
+        """
+        Writes one batch, retrying with backoff until it is stored.
+
+        Once the store is closing, gives up after ``shutdown_attempts`` more
+        failures so close() cannot hang on a broken database.
+
+        Returns:
+            bool: True if the batch was stored.
+        """
+        delay = self.retry_backoff
+        failures_while_closing = 0
+        while True:
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO outage_reports (reported_at, location, details, contact_hash) "
+                        "VALUES (?, ?, ?, ?)",
+                        batch,
+                    )
+                self.written += len(batch)
+                self.batches += 1
+                return True
+            except sqlite3.Error as e:
+                self.write_errors += 1
+                if self._closed:
+                    failures_while_closing += 1
+                    if failures_while_closing >= shutdown_attempts:
+                        logger.error(
+                            f"Lost {len(batch)} outage reports that could not be written before shutdown: {e}"
+                        )
+                        return False
+                logger.warning(
+                    f"Failed to write {len(batch)} outage reports, retrying in {delay:.1f}s: {e}"
+                )
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_retry_backoff)
+
+    def close(self, timeout=30):
+        """Stops accepting reports, writes everything queued and stops the writer."""
+        with self._submit_lock:
+            self._closed = True
+        if self._thread is not None:
+            self.queue.put(_STOP)
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        else:
+            # Never started: write what was queued here
+            batch = []
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            batch = [row for row in batch if row is not _STOP]
+            if batch:
+                conn = self._connect()
+                try:
+                    self._write(conn, batch)
+                finally:
+                    conn.close()
+        logger.info(
+            f"Outage report store closed: {self.written} reports in {self.batches} batches"
+        )
+
+    def count(self):
+        """Returns the number of stored reports."""
+        with self._transaction() as conn:
+            return conn.execute("SELECT COUNT(*) FROM outage_reports").fetchone()[0]
+
+    def recent(self, location=None, limit=100):
+        """
+        Returns the most recent stored reports, newest first.
+
+        Args:
+            location (str, optional): Only reports for this location.
+            limit (int, optional): Most reports to return. Defaults to 100.
+
+        Returns:
+            list of dict: Stored reports.
+        """
+        query = "SELECT reported_at, location, details, contact_hash FROM outage_reports"
+        params = []
+        if location is not None:
+            query += " WHERE location = ?"
+            params.append(location)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        with self._transaction() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [
+            {"reported_at": r[0], "location": r[1], "details": r[2], "contact_hash": r[3]}
+            for r in rows
+        ]
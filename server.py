@@ -1,15 +1,132 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import logging
-from MVP import prediction_engine  # Corrected import
-from fastapi.responses import HTMLResponse, JSONResponse # Import JSONResponse
+from MVP import (
+    AlertSystem,
+    get_prediction_engine,
+    prediction_engine,
+    start_prediction_engine,
+    stop_prediction_engine,
+)
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse # Import JSONResponse
+import time
 import uvicorn  # Import uvicorn
+from metrics import HTTP_REQUEST_SECONDS, REGISTRY, STATE
+from report_store import OutageReportStore, ReportQueueFull
+from subscribers import SubscriberRegistry
+from alerting import ChangeDrivenAlerter
+from log_config import configure_logging, new_request_id, request_id_var, shutdown_logging
 
-# Logging setup
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Logging setup (LOG_LEVEL, LOG_FILE, LOG_FORMAT, LOG_DEBUG_SAMPLE_EVERY)
+log_handler = configure_logging()
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# Engine calls do blocking file and network I/O, so they run on a bounded
+# worker pool instead of the event loop.
+PREDICTION_WORKERS = int(os.environ.get("PREDICTION_WORKERS", "8"))
+PREDICTION_TIMEOUT = float(os.environ.get("PREDICTION_TIMEOUT", "30"))
+KARIBA_REFRESH_INTERVAL = float(os.environ.get("KARIBA_REFRESH_INTERVAL", "3600"))
+KARIBA_STORE_BACKEND = os.environ.get("KARIBA_STORE_BACKEND", "csv")
+FORECAST_DAYS = int(os.environ.get("FORECAST_DAYS", "14"))
+FORECAST_INTERVAL = float(os.environ.get("FORECAST_INTERVAL", "60"))
+REPORT_DB_PATH = os.environ.get("REPORT_DB_PATH", os.path.join("data", "outage_reports.db"))
+SUBSCRIBER_DB_PATH = os.environ.get("SUBSCRIBER_DB_PATH", os.path.join("data", "subscribers.db"))
+SMS_OUTBOX_PATH = os.environ.get("SMS_OUTBOX_PATH", os.path.join("data", "sms_outbox.db"))
+SMS_OUTBOX_WORKERS = int(os.environ.get("SMS_OUTBOX_WORKERS", "4"))
+ALERT_INTERVAL = float(os.environ.get("ALERT_INTERVAL", "300"))
+ALERT_MIN_DELTA = float(os.environ.get("ALERT_MIN_DELTA", "1"))
+ALERT_DEDUP_WINDOW = float(os.environ.get("ALERT_DEDUP_WINDOW", "10800"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Builds the shared prediction engine on startup and releases it on shutdown."""
+    engine = start_prediction_engine(
+        refresh_interval=KARIBA_REFRESH_INTERVAL,
+        store_backend=KARIBA_STORE_BACKEND,
+        forecast_days=FORECAST_DAYS,
+        forecast_interval=FORECAST_INTERVAL,
+    )
+    app.state.prediction_executor = ThreadPoolExecutor(
+        max_workers=PREDICTION_WORKERS, thread_name_prefix="prediction"
+    )
+    app.state.report_store = OutageReportStore(REPORT_DB_PATH)
+    app.state.report_store.start()
+    app.state.subscribers = SubscriberRegistry(SUBSCRIBER_DB_PATH, resolve_area=engine.cluster_area)
+    # Subscriptions are indexed by resolved area, which a new locations.txt can change
+    engine.locations_listeners.append(app.state.subscribers.load)
+    # Alerts are only queued in the outbox; its workers talk to Infobip
+    app.state.alert_system = AlertSystem(
+        prediction_engine=engine,
+        subscribers=app.state.subscribers,
+        outbox_path=SMS_OUTBOX_PATH,
+        outbox_workers=SMS_OUTBOX_WORKERS,
+    )
+    app.state.alerter = ChangeDrivenAlerter(
+        app.state.alert_system,
+        min_delta=ALERT_MIN_DELTA,
+        dedup_window=ALERT_DEDUP_WINDOW,
+        interval=ALERT_INTERVAL,
+    )
+    if ALERT_INTERVAL:
+        app.state.alerter.start()
+    register_state_gauges(engine, app.state.report_store, app.state.subscribers)
+    outbox = app.state.alert_system.outbox
+    STATE.labels("sms_sent").set_function(lambda: outbox.sent)
+    STATE.labels("sms_retried").set_function(lambda: outbox.retried)
+    STATE.labels("sms_dead_lettered").set_function(lambda: outbox.dead)
+    yield
+    app.state.alerter.stop()
+    app.state.alert_system.close()  # Unsent SMS stay in the outbox for the next start
+    app.state.report_store.close()  # Flushes every accepted report
+    engine.locations_listeners.remove(app.state.subscribers.load)
+    app.state.subscribers.close()
+    app.state.prediction_executor.shutdown(wait=False, cancel_futures=True)
+    stop_prediction_engine()
+    shutdown_logging()  # Drains queued log records
+
+
+def register_state_gauges(engine, report_store, subscribers):
+    """Exposes cache, queue and table sizes on /metrics, read at scrape time."""
+    cache = engine.prediction_cache
+    STATE.labels("prediction_cache_entries").set_function(lambda: cache.stats()["size"])
+    STATE.labels("prediction_cache_hits").set_function(lambda: cache.hits)
+    STATE.labels("prediction_cache_misses").set_function(lambda: cache.misses)
+    STATE.labels("report_queue_depth").set_function(report_store.queue.qsize)
+    STATE.labels("reports_written").set_function(lambda: report_store.written)
+    STATE.labels("hotspots_active").set_function(lambda: len(engine.cluster_detector.hotspots()))
+    STATE.labels("kariba_data_stale").set_function(lambda: engine.kariba_collector.is_stale())
+    STATE.labels("forecast_locations").set_function(
+        lambda: len(engine.forecast_refresher.table.by_location)
+        if engine.forecast_refresher and engine.forecast_refresher.table
+        else 0
+    )
+    STATE.labels("log_records_dropped").set_function(lambda: log_handler.dropped)
+    STATE.labels("subscribers").set_function(lambda: len(subscribers))
+
+
+async def run_in_prediction_pool(func, *args):
+    """
+    Runs a blocking engine call on the prediction worker pool with a timeout.
+
+    The caller's context is carried over, so the worker logs under the
+    request's correlation ID.
+    """
+    loop = asyncio.get_running_loop()
+    call = functools.partial(contextvars.copy_context().run, func, *args)
+    return await asyncio.wait_for(
+        loop.run_in_executor(app.state.prediction_executor, call),
+        timeout=PREDICTION_TIMEOUT,
+    )
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Allow all origins (frontend access)
 app.add_middleware(
@@ -20,6 +137,33 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """Times every request by route template, so /forecast/{location} is one series."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            request.method, route.path if route is not None else "unmatched", status
+        ).observe(time.perf_counter() - start)
+
+@app.middleware("http")
+async def assign_request_id(request: Request, call_next):
+    """Tags every log line of a request with its X-Request-ID (or a fresh one)."""
+    request_id = request.headers.get("x-request-id") or new_request_id()
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        request_id_var.reset(token)
+
 # Serve the HTML form
 @app.get("/", response_class=HTMLResponse)
 async def root():
@@ -279,17 +423,163 @@ async def report_outage(request: Request):
     data = await request.json()
     logger.info(f"Received outage report: {data}")
 
+    # Anything but a JSON object has nothing to store; the prediction step
+    # answers it as before
+    if isinstance(data, dict):
+        try:
+            app.state.report_store.submit(
+                location=str(data.get("location", "")).strip(),
+                details=str(data.get("details") or ""),
+                contact=data.get("phone_number"),
+            )
+        except ReportQueueFull:
+            logger.error("Outage report queue is full, rejecting report.")
+            raise HTTPException(
+                status_code=503,
+                detail="Too many reports right now, please try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+
     try:
-        result = prediction_engine(data)
+        result = await run_in_prediction_pool(prediction_engine, data)
         prediction = result.get("prediction", "⚠️ No prediction received.")
         return JSONResponse(content={
             "message": result.get("message", "Outage report received."),
             "prediction": prediction
         })
 
+    except asyncio.TimeoutError:
+        logger.error("Prediction timed out.")
+        raise HTTPException(status_code=503, detail="Prediction timed out.")
     except Exception as e:
         logger.error(f"Prediction error: {e}")
         raise HTTPException(status_code=500, detail="Prediction failed.")
 
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    """
+    Returns predictions for many locations in one call.
+
+    Expects a JSON body like {"locations": ["Harare", "Ridgeview"]}.
+    """
+    data = await request.json()
+    locations = data.get("locations") if isinstance(data, dict) else None
+    if not isinstance(locations, list) or not all(isinstance(loc, str) for loc in locations):
+        raise HTTPException(status_code=400, detail="Expected a list of location strings.")
+
+    try:
+        engine = get_prediction_engine()
+        results = await run_in_prediction_pool(engine.predict_many, locations)
+    except asyncio.TimeoutError:
+        logger.error("Batch prediction timed out.")
+        raise HTTPException(status_code=503, detail="Prediction timed out.")
+    except Exception as e:
+        logger.error(f"Batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail="Prediction failed.")
+
+    return JSONResponse(content={
+        "predictions": [
+            {"location": location, "hours": hours, "reason": reason}
+            for location, (hours, reason) in zip(locations, results)
+        ]
+    })
+
+@app.post("/subscribe")
+async def subscribe(request: Request):
+    """
+    Signs a phone number up for alerts, replacing any earlier subscription.
+
+    Expects a JSON body like {"phone_number": "+263771234567",
+    "locations": ["Ridgeview", "Harare Region"], "quiet_hours": [22, 6]}.
+    """
+    data = await request.json()
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Expected a JSON object.")
+    locations = data.get("locations")
+    if not isinstance(locations, list) or not locations or not all(isinstance(loc, str) for loc in locations):
+        raise HTTPException(status_code=400, detail="Expected a list of location strings.")
+    quiet_hours = data.get("quiet_hours")
+    if quiet_hours is not None and not (
+        isinstance(quiet_hours, list) and len(quiet_hours) == 2 and all(isinstance(h, int) for h in quiet_hours)
+    ):
+        raise HTTPException(status_code=400, detail="quiet_hours must be [start hour, end hour].")
+
+    try:
+        await run_in_prediction_pool(
+            app.state.subscribers.subscribe, data.get("phone_number", ""), locations, quiet_hours
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except asyncio.TimeoutError:
+        logger.error("Subscribe timed out.")
+        raise HTTPException(status_code=503, detail="Subscribe timed out.")
+    except Exception as e:
+        logger.error(f"Subscribe error: {e}")
+        raise HTTPException(status_code=500, detail="Subscribe failed.")
+    return JSONResponse(content={"message": "Subscribed.", "locations": locations})
+
+@app.post("/unsubscribe")
+async def unsubscribe(request: Request):
+    """Stops alerts to a phone number. Expects {"phone_number": "+263771234567"}."""
+    data = await request.json()
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Expected a JSON object.")
+    try:
+        removed = await run_in_prediction_pool(
+            app.state.subscribers.unsubscribe, str(data.get("phone_number", ""))
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except asyncio.TimeoutError:
+        logger.error("Unsubscribe timed out.")
+        raise HTTPException(status_code=503, detail="Unsubscribe timed out.")
+    except Exception as e:
+        logger.error(f"Unsubscribe error: {e}")
+        raise HTTPException(status_code=500, detail="Unsubscribe failed.")
+    if not removed:
+        raise HTTPException(status_code=404, detail="Not subscribed.")
+    return JSONResponse(content={"message": "Unsubscribed."})
+
+@app.get("/hotspots")
+async def hotspots():
+    """Lists areas with an active cluster of outage reports, busiest first."""
+    return JSONResponse(content={"hotspots": get_prediction_engine().cluster_detector.hotspots()})
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Reports prediction cache hits, misses and size."""
+    return JSONResponse(content=get_prediction_engine().prediction_cache.stats())
+
+@app.get("/kariba/trend")
+async def kariba_trend():
+    """Reports rolling 7/30/90-day Kariba level statistics: slope, change and volatility."""
+    return JSONResponse(content=get_prediction_engine().kariba_collector.get_trend_stats())
+
+@app.get("/forecast/{location}")
+async def forecast(location: str):
+    """
+    Serves the precomputed multi-day forecast for a location: per day the
+    expected outage hours and the chance of an outage in each hour.
+    """
+    engine = get_prediction_engine()
+    if engine.forecast_refresher is None:
+        raise HTTPException(status_code=404, detail="Forecasts are disabled (FORECAST_DAYS is 0).")
+    result = engine.get_forecast(location)
+    if result is None:
+        raise HTTPException(status_code=503, detail="Forecasts are still being built.")
+    return JSONResponse(content=result)
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage latencies, upstream outcomes, HTTP latency and state gauges."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/generation/sources")
+async def generation_sources():
+    """Reports which generation source is in use and per-source latency and success rates."""
+    return JSONResponse(content=get_prediction_engine().generation_sources.stats())
+
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # No uvicorn logging config: its loggers propagate to the queue handler, so
+    # access lines are written by the log thread instead of on the request path
+    uvicorn.run(app, host="0.0.0.0", port=8000, log_config=None)
@@ -0,0 +1,370 @@
+# Durable SMS outbox #
+# At-least-once delivery of alert SMS through Infobip.
+#
+# Messages are written to a SQLite table (WAL mode) before anything is sent,
+# so enqueueing is all a request has to wait for. Worker threads claim due
+# messages in batches, mark them "sending" under a lease, post them to
+# Infobip and record the outcome: sent, retried later with exponential
+# backoff and jitter, or dead-lettered once the attempts run out or Infobip
+# rejects the message outright.
+#
+# Every message carries an idempotency key. Enqueueing the same key twice
+# stores it once, and the key is sent as the Infobip messageId, so a message
+# that was in flight when the process died is re-sent under the same id and
+# the duplicate can be recognised downstream. On start() messages left
+# "sending" by a crashed process are put back in the queue; while running,
+# a worker that hangs past its lease loses its messages to another worker.
+# One process should own an outbox file at a time.
+
+import contextlib
+import hashlib
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+PENDING, SENDING, SENT, DEAD = "pending", "sending", "sent", "dead"
+
+
+def alert_key(phone_number, *event):
+    """
+    Idempotency key for one alert event to one number, e.g.
+    ``alert_key(phone, alerter_id, area, revision)``. Enqueueing the same
+    event twice stores one message; a later event with the same text does not
+    collide with it.
+    """
+    parts = "\n".join(str(part) for part in (phone_number,) + event)
+    return hashlib.sha256(parts.encode()).hexdigest()[:32]
+
+
+class SmsOutbox:
+    """SQLite-backed outbound SMS queue with retrying worker threads."""
+
+    def __init__(
+        self,
+        send,
+        db_path=os.path.join("data", "sms_outbox.db"),
+        workers=4,
+        batch_size=100,
+        max_attempts=8,
+        backoff_base=2.0,
+        backoff_max=900.0,
+        lease_seconds=120.0,
+        poll_interval=1.0,
+        clock=time.time,
+    ):
+        """
+        Initializes the SmsOutbox. Call start() to begin sending.
+
+        Args:
+            send (callable): Makes one Infobip request: payload dict ->
+                (response, error, retryable), like AlertSystem.post_infobip_once.
+            db_path (str, optional): SQLite database file. Defaults to "data/sms_outbox.db".
+            workers (int, optional): Sending threads. Defaults to 4.
+            batch_size (int, optional): Messages claimed and posted per request. Defaults to 100.
+            max_attempts (int, optional): Attempts before a message is dead-lettered. Defaults to 8.
+            backoff_base (float, optional): Seconds before the first retry, doubled
+                on each further retry. Defaults to 2.
+            backoff_max (float, optional): Longest delay between retries. Defaults to 900.
+            lease_seconds (float, optional): Seconds a worker may hold claimed
+                messages before they are handed to another worker. Defaults to 120.
+            poll_interval (float, optional): Seconds an idle worker waits before
+                looking for due retries. Defaults to 1.
+            clock (callable, optional): Returns the current time in seconds.
+        """
+        self.send = send
+        self.db_path = db_path
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self._counter_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+        db_dir = os.path.dirname(db_path)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+        with self._transaction() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS sms_outbox (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idempotency_key TEXT NOT NULL UNIQUE,
+                    phone TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    lease_until REAL,
+                    message_id TEXT,
+                    last_error TEXT,
+                    created_at REAL NOT NULL,
+                    sent_at REAL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_sms_outbox_due "
+                "ON sms_outbox (status, next_attempt_at)"
+            )
+
+    def _connect(self):
+        # Autocommit mode, so claims can take the write lock with BEGIN IMMEDIATE
+        conn = sqlite3.connect(
+            self.db_path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+
+    def enqueue(self, phone_number, text, key=None):
+        """
+        Stores one message for sending.
+
+        Args:
+            phone_number (str): Recipient, e.g. "+263771234567".
+            text (str): Message text.
+            key (str, optional): Idempotency key. Defaults to a fresh random key.
+
+        Returns:
+            bool: False if a message with this key was already queued or sent.
+        """
+        return self.enqueue_many([(phone_number, text, key)]) == 1
+
+    def enqueue_many(self, messages):
+        """
+        Stores many messages in one transaction.
+
+        Args:
+            messages (iterable): (phone_number, text, key) tuples; a key of
+                None gets a fresh random key.
+
+        Returns:
+            int: Messages newly queued (duplicates of stored keys are skipped).
+        """
+        now = self.clock()
+        rows = [
+            (key or uuid.uuid4().hex, phone_number, text, now, now)
+            for phone_number, text, key in messages
+        ]
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO sms_outbox "
+                "(idempotency_key, phone, text, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            added = conn.total_changes - before
+        if added:
+            self._wake.set()
+        return added
+
+    def start(self):
+        """Re-queues messages a previous process left in flight and starts the workers."""
+        if self._threads:
+            return
+        with self._transaction() as conn:
+            recovered = conn.execute(
+                "UPDATE sms_outbox SET status = ?, lease_until = NULL, next_attempt_at = ? "
+                "WHERE status = ?",
+                (PENDING, self.clock(), SENDING),
+            ).rowcount
+        if recovered:
+            logger.warning(f"Re-queued {recovered} SMS that were in flight at shutdown")
+        self._stop.clear()
+        for number in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"sms-outbox-{number}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"SMS outbox started with {self.workers} workers.")
+
+    def stop(self, timeout=30):
+        """Stops the workers after the batches they are sending."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def _claim(self, conn):
+        now = self.clock()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, idempotency_key, phone, text, attempts FROM sms_outbox "
+                "WHERE (status = ? AND next_attempt_at <= ?) OR (status = ? AND lease_until <= ?) "
+                "ORDER BY next_attempt_at LIMIT ?",
+                (PENDING, now, SENDING, now, self.batch_size),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE sms_outbox SET status = ?, lease_until = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                [(SENDING, now + self.lease_seconds, row[0]) for row in rows],
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return rows
+
+    def _retry_delay(self, attempts):
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)  # Jitter, so failed batches spread out
+
+    def _deliver(self, conn, rows):
+        texts = {}
+        for _, key, phone, text, _ in rows:
+            texts.setdefault(text, []).append({"to": phone, "messageId": key})
+        payload = {
+            "messages": [
+                {"destinations": destinations, "text": text} for text, destinations in texts.items()
+            ]
+        }
+        response, error, retryable = self.send(payload)
+        statuses = {}
+        if response is not None:
+            for message in response.get("messages") or []:
+                statuses[message.get("messageId")] = message.get("status") or {}
+
+        now = self.clock()
+        sent, retries, dead = [], [], []
+        for row_id, key, phone, _, attempts in rows:
+            attempts += 1  # Counted when claimed
+            status = statuses.get(key)
+            if status is not None and status.get("groupName") != "REJECTED":
+                sent.append((SENT, now, key, row_id))
+                continue
+            if status is not None:
+                reason, permanent = status.get("description") or "Rejected by Infobip", True
+            elif response is not None:
+                reason, permanent = "Missing from Infobip response", False
+            else:
+                reason, permanent = error, not retryable
+            if permanent or attempts >= self.max_attempts:
+                dead.append((DEAD, reason, row_id))
+                logger.error(f"SMS to {phone} dead-lettered after {attempts} attempts: {reason}")
+            else:
+                retries.append((PENDING, now + self._retry_delay(attempts), reason, row_id))
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "UPDATE sms_outbox SET status = ?, sent_at = ?, message_id = ?, lease_until = NULL "
+                "WHERE id = ?",
+                sent,
+            )
+            conn.executemany(
+                "UPDATE sms_outbox SET status = ?, next_attempt_at = ?, last_error = ?, "
+                "lease_until = NULL WHERE id = ?",
+                retries,
+            )
+            conn.executemany(
+                "UPDATE sms_outbox SET status = ?, last_error = ?, lease_until = NULL WHERE id = ?",
+                dead,
+            )
+        except BaseException:
+            # Leaves the rows leased: they are re-sent under the same keys once the lease ends
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        with self._counter_lock:
+            self.sent += len(sent)
+            self.retried += len(retries)
+            self.dead += len(dead)
+        if retries:
+            logger.warning(f"{len(retries)} SMS will be retried: {retries[0][2]}")
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            while not self._stop.is_set():
+                try:
+                    rows = self._claim(conn)
+                    if rows:
+                        self._deliver(conn, rows)
+                        continue
+                except Exception as e:
+                    logger.error(f"SMS outbox error: {e}")
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+        finally:
+            conn.close()
+
+    def counts(self):
+        """Returns the number of messages in each status."""
+        conn = self._connect()
+        try:
+            counts = dict.fromkeys((PENDING, SENDING, SENT, DEAD), 0)
+            counts.update(
+                conn.execute("SELECT status, COUNT(*) FROM sms_outbox GROUP BY status").fetchall()
+            )
+            return counts
+        finally:
+            conn.close()
+
+    def wait_until_drained(self, timeout=None):
+        """Blocks until nothing is pending or in flight. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            counts = self.counts()
+            if not counts[PENDING] and not counts[SENDING]:
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.05)
+
+    def dead_letters(self, limit=100):
+        """Lists dead-lettered messages, newest first."""
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT idempotency_key, phone, text, attempts, last_error FROM sms_outbox "
+                "WHERE status = ? ORDER BY id DESC LIMIT ?",
+                (DEAD, limit),
+            ).fetchall()
+        finally:
+            conn.close()
+        return [
+            {"key": key, "phone_number": phone, "text": text, "attempts": attempts, "error": error}
+            for key, phone, text, attempts, error in rows
+        ]
+
+    def retry_dead(self):
+        """Puts every dead-lettered message back in the queue. Returns how many."""
+        with self._transaction() as conn:
+            count = conn.execute(
+                "UPDATE sms_outbox SET status = ?, attempts = 0, next_attempt_at = ? WHERE status = ?",
+                (PENDING, self.clock(), DEAD),
+            ).rowcount
+        if count:
+            self._wake.set()
+        return count
@@ -0,0 +1,381 @@
+# Subscriber registry #
+# Who gets outage alerts, for which locations, and when they want no SMS.
+#
+# Subscribers are stored in SQLite; the subscriber id is the table's rowid.
+# In memory each subscriber is a slot in flat typed arrays (phone number as
+# a 64-bit integer, quiet-hour bounds as bytes), and an inverted index maps
+# each location and region to an array of 32-bit subscriber ids. Finding the
+# recipients for one area touches only that area's postings, so it costs
+# time proportional to the result, not to the number of subscribers.
+#
+# Unsubscribing (or re-subscribing, which replaces the old row) leaves a
+# tombstone that readers skip; compact() drops tombstones from the postings
+# once they make up a large share of them.
+
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+from array import array
+from collections import namedtuple
+
+from location_index import normalize_location
+
+logger = logging.getLogger(__name__)
+
+Subscriber = namedtuple("Subscriber", ["id", "phone_number", "locations", "quiet_hours"])
+
+NO_QUIET_HOURS = -1
+
+
+def normalize_phone(phone_number):
+    """
+    Turns an international phone number ("+263 77 123 4567") into its digits as an int.
+
+    Raises:
+        ValueError: If the number has no digits, starts with 0 (a local number)
+            or is longer than the 15 digits E.164 allows.
+    """
+    digits = "".join(ch for ch in str(phone_number) if ch.isdigit())
+    if not digits or digits[0] == "0" or len(digits) > 15:
+        raise ValueError(f"Not an international phone number: {phone_number!r}")
+    return int(digits)
+
+
+def format_phone(number):
+    """Formats a stored phone number for Infobip, e.g. 263771234567 -> "+263771234567"."""
+    return f"+{number}"
+
+
+def in_quiet_hours(quiet_start, quiet_end, hour):
+    """True if ``hour`` falls in [quiet_start, quiet_end), which may wrap past midnight."""
+    if quiet_start == NO_QUIET_HOURS or quiet_start == quiet_end:
+        return False
+    if quiet_start < quiet_end:
+        return quiet_start <= hour < quiet_end
+    return hour >= quiet_start or hour < quiet_end
+
+
+def _default_area(location):
+    return normalize_location(location), None
+
+
+class SubscriberRegistry:
+    """SQLite-backed subscriber store with a compact location/region index."""
+
+    def __init__(self, db_path=":memory:", resolve_area=None, compact_ratio=0.25):
+        """
+        Initializes the SubscriberRegistry and loads any stored subscribers.
+
+        Args:
+            db_path (str, optional): SQLite database file. Defaults to an in-memory database.
+            resolve_area (callable, optional): Maps a location string to a
+                (location key, region) pair, where the key is None for a whole
+                region (PowerOutagePrediction.cluster_area has this shape).
+                Defaults to the normalized name with no region.
+            compact_ratio (float, optional): Share of dead postings that
+                triggers compact(). Defaults to 0.25.
+        """
+        self.db_path = db_path
+        self.resolve_area = resolve_area or _default_area
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+
+        self._phones = array("Q")  # Subscriber id -> phone digits, 0 if unused
+        self._quiet_start = array("b")  # Subscriber id -> quiet hours start, or -1
+        self._quiet_end = array("b")
+        self._by_location = {}  # Location key -> subscriber ids
+        self._region_wide = {}  # Region -> ids of subscribers to the whole region
+        self._by_region = {}  # Region -> ids of every subscriber in the region
+        self._live = 0
+        self._postings = 0
+        self._dead_postings = 0
+        self.version = 0  # Bumped on every subscribe, unsubscribe or load
+
+        if db_path != ":memory:":
+            db_dir = os.path.dirname(db_path)
+            if db_dir and not os.path.exists(db_dir):
+                os.makedirs(db_dir)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS subscribers (
+                    id INTEGER PRIMARY KEY,
+                    phone INTEGER NOT NULL UNIQUE,
+                    quiet_start INTEGER NOT NULL DEFAULT -1,
+                    quiet_end INTEGER NOT NULL DEFAULT -1,
+                    created_at TEXT NOT NULL
+                )"""
+            )
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS subscriptions (
+                    subscriber_id INTEGER NOT NULL,
+                    location TEXT NOT NULL,
+                    PRIMARY KEY (subscriber_id, location)
+                ) WITHOUT ROWID"""
+            )
+        self.load()
+
+    def __len__(self):
+        return self._live
+
+    def close(self):
+        """Closes the database connection."""
+        self._conn.close()
+
+    def load(self):
+        """Rebuilds the in-memory index from the database, e.g. after locations.txt changed."""
+        with self._lock:
+            self._phones = array("Q")
+            self._quiet_start = array("b")
+            self._quiet_end = array("b")
+            self._by_location, self._region_wide, self._by_region = {}, {}, {}
+            self._live = self._postings = self._dead_postings = 0
+            for sub_id, phone, quiet_start, quiet_end in self._conn.execute(
+                "SELECT id, phone, quiet_start, quiet_end FROM subscribers"
+            ):
+                self._set_slot(sub_id, phone, quiet_start, quiet_end)
+            for sub_id, location in self._conn.execute(
+                "SELECT subscriber_id, location FROM subscriptions"
+            ):
+                self._index(sub_id, location)
+            self.version += 1
+        logger.info(f"Loaded {self._live} subscribers from {self.db_path}")
+
+    def _set_slot(self, sub_id, phone, quiet_start, quiet_end):
+        missing = sub_id + 1 - len(self._phones)
+        if missing > 0:
+            self._phones.extend([0] * missing)
+            self._quiet_start.extend([NO_QUIET_HOURS] * missing)
+            self._quiet_end.extend([NO_QUIET_HOURS] * missing)
+        self._phones[sub_id] = phone
+        self._quiet_start[sub_id] = quiet_start
+        self._quiet_end[sub_id] = quiet_end
+        self._live += 1
+
+    def _index(self, sub_id, location):
+        location_key, region = self.resolve_area(location)
+        if location_key is not None:
+            self._by_location.setdefault(location_key, array("I")).append(sub_id)
+            self._postings += 1
+        elif region is not None:
+            self._region_wide.setdefault(region, array("I")).append(sub_id)
+            self._postings += 1
+        if region is not None:
+            self._by_region.setdefault(region, array("I")).append(sub_id)
+            self._postings += 1
+
+    def _tombstone(self, sub_id):
+        self._phones[sub_id] = 0
+        self._live -= 1
+        for (location,) in self._conn.execute(
+            "SELECT location FROM subscriptions WHERE subscriber_id = ?", (sub_id,)
+        ):
+            location_key, region = self.resolve_area(location)
+            self._dead_postings += (location_key is not None or region is not None) + (region is not None)
+
+    def subscribe(self, phone_number, locations, quiet_hours=None):
+        """
+        Adds a subscriber, or replaces an existing subscriber's locations and quiet hours.
+
+        Args:
+            phone_number (str): International phone number, e.g. "+263771234567".
+            locations (list of str): Locations, suburbs, roads or regions to be alerted about.
+            quiet_hours (tuple, optional): (start hour, end hour) in local time
+                during which no SMS is sent, e.g. (22, 6). Defaults to none.
+
+        Returns:
+            int: The subscriber id.
+        """
+        return self.subscribe_many([(phone_number, locations, quiet_hours)])[0]
+
+    def subscribe_many(self, rows):
+        """
+        Adds or replaces many subscribers in one transaction.
+
+        Args:
+            rows (iterable): (phone_number, locations, quiet_hours) tuples, as for subscribe().
+
+        Returns:
+            list of int: The subscriber ids, in input order.
+        """
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds")
+        parsed = []
+        for phone_number, locations, quiet_hours in rows:
+            quiet_start, quiet_end = quiet_hours if quiet_hours else (NO_QUIET_HOURS, NO_QUIET_HOURS)
+            if quiet_hours and not (0 <= quiet_start < 24 and 0 <= quiet_end < 24):
+                raise ValueError(f"Quiet hours must be between 0 and 23: {quiet_hours!r}")
+            names = list(dict.fromkeys(loc.strip() for loc in locations if loc and loc.strip()))
+            parsed.append((normalize_phone(phone_number), names, int(quiet_start), int(quiet_end)))
+
+        ids = []
+        with self._lock, self._conn:
+            for phone, names, quiet_start, quiet_end in parsed:
+                row = self._conn.execute(
+                    "SELECT id FROM subscribers WHERE phone = ?", (phone,)
+                ).fetchone()
+                if row is not None:
+                    # Replace the row so the old postings become tombstones
+                    self._tombstone(row[0])
+                    self._conn.execute("DELETE FROM subscriptions WHERE subscriber_id = ?", row)
+                    self._conn.execute("DELETE FROM subscribers WHERE id = ?", row)
+                sub_id = self._conn.execute(
+                    "INSERT INTO subscribers (phone, quiet_start, quiet_end, created_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (phone, quiet_start, quiet_end, now),
+                ).lastrowid
+                self._conn.executemany(
+                    "INSERT INTO subscriptions (subscriber_id, location) VALUES (?, ?)",
+                    [(sub_id, name) for name in names],
+                )
+                self._set_slot(sub_id, phone, quiet_start, quiet_end)
+                for name in names:
+                    self._index(sub_id, name)
+                ids.append(sub_id)
+            self.version += 1
+        self._maybe_compact()
+        return ids
+
+    def unsubscribe(self, phone_number):
+        """
+        Removes a subscriber.
+
+        Returns:
+            bool: True if the number was subscribed.
+        """
+        phone = normalize_phone(phone_number)
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT id FROM subscribers WHERE phone = ?", (phone,)).fetchone()
+            if row is None:
+                return False
+            self._tombstone(row[0])
+            self._conn.execute("DELETE FROM subscriptions WHERE subscriber_id = ?", row)
+            self._conn.execute("DELETE FROM subscribers WHERE id = ?", row)
+            self.version += 1
+        self._maybe_compact()
+        return True
+
+    def get(self, phone_number):
+        """Returns the Subscriber for a phone number, or None."""
+        phone = normalize_phone(phone_number)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, quiet_start, quiet_end FROM subscribers WHERE phone = ?", (phone,)
+            ).fetchone()
+            if row is None:
+                return None
+            sub_id, quiet_start, quiet_end = row
+            locations = [
+                location for (location,) in self._conn.execute(
+                    "SELECT location FROM subscriptions WHERE subscriber_id = ?", (sub_id,)
+                )
+            ]
+        quiet_hours = None if quiet_start == NO_QUIET_HOURS else (quiet_start, quiet_end)
+        return Subscriber(sub_id, format_phone(phone), locations, quiet_hours)
+
+    def areas(self):
+        """
+        Returns one name per subscribed area: the key of every subscribed
+        location, and the name of every region subscribed to as a whole.
+        """
+        with self._lock:
+            return list(self._by_location) + list(self._region_wide)
+
+    def subscriber_ids(self, location):
+        """
+        Returns the ids of live subscribers affected by a change at a location.
+
+        For a suburb or road that is everyone subscribed to it plus everyone
+        subscribed to its whole region; for a region it is everyone subscribed
+        to any place in it.
+        """
+        location_key, region = self.resolve_area(location)
+        with self._lock:
+            if location_key is None:
+                postings = [self._by_region.get(region, ())]
+            else:
+                postings = [self._by_location.get(location_key, ())]
+                if region is not None:
+                    postings.append(self._region_wide.get(region, ()))
+            phones = self._phones
+            seen = set()
+            ids = []
+            for posting in postings:
+                for sub_id in posting:
+                    if phones[sub_id] and sub_id not in seen:
+                        seen.add(sub_id)
+                        ids.append(sub_id)
+        return ids
+
+    def recipients(self, location, hour=None, quiet=None):
+        """
+        Returns the phone numbers to alert about a location.
+
+        Args:
+            location (str): The location whose prediction changed.
+            hour (int, optional): Local hour of day; subscribers in their quiet
+                hours are left out. Defaults to no quiet-hour filtering.
+            quiet (list, optional): Receives the phone numbers left out for
+                being in their quiet hours.
+
+        Returns:
+            list of str: Phone numbers, e.g. ["+263771234567"].
+        """
+        ids = self.subscriber_ids(location)
+        phones, quiet_start, quiet_end = self._phones, self._quiet_start, self._quiet_end
+        if hour is None:
+            return [format_phone(phones[sub_id]) for sub_id in ids if phones[sub_id]]
+        awake = []
+        for sub_id in ids:
+            if not phones[sub_id]:
+                continue
+            if in_quiet_hours(quiet_start[sub_id], quiet_end[sub_id], hour):
+                if quiet is not None:
+                    quiet.append(format_phone(phones[sub_id]))
+            else:
+                awake.append(format_phone(phones[sub_id]))
+        return awake
+
+    def _maybe_compact(self):
+        if self._dead_postings > self.compact_ratio * max(self._postings, 1):
+            self.compact()
+
+    def compact(self):
+        """Drops unsubscribed ids from every posting."""
+        with self._lock:
+            phones = self._phones
+            postings = 0
+            for index in (self._by_location, self._region_wide, self._by_region):
+                for key in list(index):
+                    live = array("I", (sub_id for sub_id in index[key] if phones[sub_id]))
+                    if live:
+                        index[key] = live
+                        postings += len(live)
+                    else:
+                        del index[key]
+            self._postings = postings
+            self._dead_postings = 0
+
+    def stats(self):
+        """Reports subscriber and posting counts and the index's approximate size in bytes."""
+        with self._lock:
+            posting_bytes = sum(
+                posting.buffer_info()[1] * posting.itemsize
+                for index in (self._by_location, self._region_wide, self._by_region)
+                for posting in index.values()
+            )
+            slot_bytes = len(self._phones) * (
+                self._phones.itemsize + self._quiet_start.itemsize + self._quiet_end.itemsize
+            )
+            return {
+                "subscribers": self._live,
+                "locations": len(self._by_location),
+                "regions": len(self._by_region),
+                "postings": self._postings,
+                "dead_postings": self._dead_postings,
+                "index_bytes": posting_bytes + slot_bytes,
+            }
+
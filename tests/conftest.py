@@ -0,0 +1,105 @@
+# Shared fixtures for the test suite.
+#
+# Tests run against temporary data directories and the local mock servers in
+# benchmarks/mock_servers.py, never the real ZRA, Twitter or Infobip.
+
+import datetime
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+# Read by the engine and server modules at import time
+os.environ.setdefault("LOG_FILE", "")
+os.environ.setdefault("LOG_FORMAT", "text")
+os.environ["GENERATION_SOURCES"] = "manual"  # No Twitter or Chrome in tests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))  # mock_servers
+
+import pytest  # noqa: E402
+
+import MVP  # noqa: E402
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "stale_kariba: the Kariba history ends yesterday, so a ZRA fetch is due"
+    )
+
+
+@pytest.fixture
+def data_dir(request, tmp_path):
+    """A copy of the repo's data files, with a Kariba reading for today (or yesterday)."""
+    for name in ("locations.txt", "power_data.txt"):
+        shutil.copy(os.path.join(ROOT, "data", name), tmp_path / name)
+    day = datetime.date.today()
+    if request.node.get_closest_marker("stale_kariba"):
+        day -= datetime.timedelta(days=1)
+    (tmp_path / "kariba_levels.csv").write_text(
+        "date,level,percent_full\n"
+        f"{day - datetime.timedelta(days=2)},476.70,9.10\n"
+        f"{day - datetime.timedelta(days=1)},476.62,8.95\n"
+        f"{day},476.55,8.80\n"
+    )
+    return tmp_path
+
+
+@pytest.fixture
+def engine(data_dir):
+    """The shared prediction engine over data_dir, without background threads."""
+    engine = MVP.start_prediction_engine(
+        str(data_dir), reload_interval=None, refresh_interval=None, forecast_days=0
+    )
+    yield engine
+    MVP.stop_prediction_engine()
+
+
+@pytest.fixture
+def live_server(engine, tmp_path, monkeypatch):
+    """Runs server.app under uvicorn on a free port; yields its base URL."""
+    import uvicorn
+
+    import server
+
+    monkeypatch.setattr(server, "REPORT_DB_PATH", str(tmp_path / "outage_reports.db"))
+    monkeypatch.setattr(server, "SUBSCRIBER_DB_PATH", str(tmp_path / "subscribers.db"))
+    monkeypatch.setattr(server, "SMS_OUTBOX_PATH", str(tmp_path / "sms_outbox.db"))
+    monkeypatch.setattr(server, "ALERT_INTERVAL", 0)
+    monkeypatch.setenv("INFOBIP_SMS_URL", "http://127.0.0.1:9/sms/2/text/advanced")
+
+    uv = uvicorn.Server(uvicorn.Config(server.app, host="127.0.0.1", port=0, log_level="warning"))
+    thread = threading.Thread(target=uv.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not uv.started:
+        assert thread.is_alive() and time.monotonic() < deadline, "server did not start"
+        time.sleep(0.02)
+    host, port = uv.servers[0].sockets[0].getsockname()[:2]
+    yield f"http://{host}:{port}"
+    uv.should_exit = True
+    thread.join(timeout=10)
+
+
+def http_json(url, body=None, timeout=10):
+    """
+    GETs (or, with a body, POSTs JSON to) a URL.
+
+    Returns:
+        tuple: (status, parsed JSON body or None).
+    """
+    data = None if body is None else json.dumps(body).encode()
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status, raw = response.status, response.read()
+    except urllib.error.HTTPError as e:
+        status, raw = e.code, e.read()
+    try:
+        return status, json.loads(raw)
+    except ValueError:
+        return status, None
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+import MVP
+from mock_servers import mock_infobip_server
+
+
+@pytest.fixture
+def infobip(monkeypatch):
+    with mock_infobip_server(failure_rate=0.3, seed=1) as server:
+        monkeypatch.setenv("INFOBIP_SMS_URL", f"{server.url}/sms/2/text/advanced")
+        yield server
+
+
+def alert_system(engine, **kwargs):
+    options = {"rate_limit": 0, "backoff_base": 0.01, "max_retries": 10}
+    options.update(kwargs)
+    return MVP.AlertSystem(prediction_engine=engine, **options)
+
+
+def test_build_bulk_payloads_packs_destinations_across_texts(engine):
+    alerts = alert_system(engine, destinations_per_request=3)
+    payloads = alerts.build_bulk_payloads({"a": ["1", "2"], "b": ["3", "4", "5", "6"], "c": ["7"]})
+    sizes = [
+        [(message["text"], len(message["destinations"])) for message in payload["messages"]]
+        for payload in payloads
+    ]
+    assert sizes == [[("a", 2), ("b", 1)], [("b", 3)], [("c", 1)]]
+    alerts.close()
+
+
+def test_send_bulk_alerts_predicts_each_location_once(engine, infobip, monkeypatch):
+    calls = []
+    predict_many = engine.predict_many
+
+    def counting_predict_many(locations):
+        calls.append(locations)
+        return predict_many(locations)
+
+    monkeypatch.setattr(engine, "predict_many", counting_predict_many)
+    subscribers = [
+        (f"+2637{i:08d}", location)
+        for i, location in enumerate(["Ridgeview", "Wendy", "Hyde Road"] * 400)
+    ]
+    alerts = alert_system(engine)
+
+    result = alerts.send_bulk_alerts(subscribers)
+    alerts.close()
+
+    assert calls == [["Ridgeview", "Wendy", "Hyde Road"]]
+    assert result == {"requests": 3, "sent": 1200, "failed": 0}
+    assert infobip.stats["destinations"] == 1200
+    assert infobip.stats["failures"] > 0  # Every one of them was retried
+
+
+def test_post_infobip_payload_gives_up_after_max_retries(engine, monkeypatch):
+    with mock_infobip_server(failure_rate=1.0) as server:
+        monkeypatch.setenv("INFOBIP_SMS_URL", f"{server.url}/sms/2/text/advanced")
+        alerts = alert_system(engine, max_retries=2)
+        payload = {"messages": [{"destinations": [{"to": "+263771234567"}], "text": "x"}]}
+        assert alerts.post_infobip_payload(payload) is None
+        alerts.close()
+    assert server.stats["requests"] == 3
+
+
+def test_rate_limiter_spaces_out_requests():
+    limiter = MVP.RateLimiter(rate=50, burst=1)
+    start = time.perf_counter()
+    for _ in range(11):
+        limiter.acquire()
+    assert time.perf_counter() - start >= 0.18
@@ -0,0 +1,233 @@
+import datetime
+
+import pytest
+
+import MVP
+from alerting import ChangeDrivenAlerter, reason_key
+from sms_outbox import PENDING
+from subscribers import SubscriberRegistry
+
+
+class StubEngine:
+    """Serves set predictions; bumping ``version`` stands in for new inputs."""
+
+    def __init__(self):
+        self.version = 0
+        self.hours = {}
+        self.reasons = {}
+        self.predicted = 0  # predict_many calls
+
+    def input_version(self):
+        return self.version
+
+    def cluster_version(self):
+        return 0
+
+    def predict_many(self, areas):
+        self.predicted += 1
+        return [
+            (self.hours.get(area, 4), self.reasons.get(area, "Low Kariba levels")) for area in areas
+        ]
+
+    def set_hours(self, area, hours):
+        self.hours[area] = hours
+        self.version += 1
+
+    def set_reason(self, area, reason):
+        self.reasons[area] = reason
+        self.version += 1
+
+
+class StubAlertSystem:
+    """Records dispatched messages; ``fail`` makes dispatch raise or reject numbers."""
+
+    def __init__(self, engine, subscribers):
+        self.prediction_engine = engine
+        self.subscribers = subscribers
+        self.dispatched = []
+        self.fail = None  # None, "raise" or a set of numbers to reject
+
+    def dispatch_bulk(self, messages_by_text, failed_numbers=None, keys=None):
+        if self.fail == "raise":
+            raise OSError("outbox database is locked")
+        sent = failed = 0
+        for text, numbers in messages_by_text.items():
+            for number in numbers:
+                if self.fail and number in self.fail:
+                    failed += 1
+                    failed_numbers.append(number)
+                else:
+                    sent += 1
+                    self.dispatched.append((number, text))
+        return {"requests": 1, "sent": sent, "failed": failed}
+
+
+def at(hour, minute=0):
+    return datetime.datetime(2026, 3, 2, hour, minute).timestamp()
+
+
+@pytest.fixture
+def setup():
+    engine = StubEngine()
+    registry = SubscriberRegistry()
+    registry.subscribe("+263771000001", ["ridgeview"])
+    registry.subscribe("+263771000002", ["ridgeview"], (22, 6))
+    alerts = StubAlertSystem(engine, registry)
+    now = [at(12)]
+    alerter = ChangeDrivenAlerter(alerts, dedup_window=3600, clock=lambda: now[0])
+    alerter.run_cycle()  # Primes the state
+    return engine, alerts, alerter, now
+
+
+def texts_to(alerts, number):
+    return [text for to, text in alerts.dispatched if to == number]
+
+
+def test_only_a_drift_of_min_delta_alerts(setup):
+    engine, alerts, alerter, now = setup
+    engine.set_hours("ridgeview", 4.5)
+    result = alerter.run_cycle()
+    assert result["changed"] == 0 and alerts.dispatched == []
+    engine.set_hours("ridgeview", 5)  # 1 hour from the last alerted 4, not 0.5 from 4.5
+    result = alerter.run_cycle()
+    assert result["changed"] == 1 and result["recipients"] == 2
+    assert alerter.state["ridgeview"][0] == 5
+
+
+def test_reason_change_alerts(setup):
+    engine, alerts, alerter, now = setup
+    engine.set_reason("ridgeview", "Insufficient Power Generation")
+    result = alerter.run_cycle()
+    assert result["changed"] == 1
+    assert "Insufficient Power Generation" in texts_to(alerts, "+263771000001")[0]
+
+
+def test_cluster_count_ticks_are_not_a_reason_change(setup):
+    engine, alerts, alerter, now = setup
+    clustered = "Low Kariba levels ({} outage reports in Ridgeview in the last 30 min)"
+    assert reason_key(clustered.format(5)) == reason_key(clustered.format(6))
+    assert reason_key(clustered.format(5)) != reason_key("Low Kariba levels")
+
+    engine.set_reason("ridgeview", clustered.format(5))
+    assert alerter.run_cycle()["changed"] == 1  # A cluster appearing is news
+    now[0] += 7200
+    engine.set_reason("ridgeview", clustered.format(9))
+    assert alerter.run_cycle()["changed"] == 0
+    assert len(texts_to(alerts, "+263771000001")) == 1
+
+
+def test_first_seen_area_only_primes_the_state(setup):
+    engine, alerts, alerter, now = setup
+    engine.set_hours("wendy", 12)
+    alerts.subscribers.subscribe("+263771000003", ["wendy"])
+    result = alerter.run_cycle()
+    assert result["changed"] == 0 and alerts.dispatched == []
+    assert alerter.state["wendy"] == (12, "Low Kariba levels")
+    engine.set_hours("wendy", 8)
+    assert alerter.run_cycle()["recipients"] == 1
+    assert len(texts_to(alerts, "+263771000003")) == 1
+
+
+def test_cycle_with_unchanged_versions_skips_prediction(setup):
+    engine, alerts, alerter, now = setup
+    predicted = engine.predicted
+    assert alerter.run_cycle()["areas"] == 0
+    assert engine.predicted == predicted
+    assert alerter.run_cycle(force=True)["areas"] == 1
+    alerts.subscribers.subscribe("+263771000003", ["wendy"])  # Bumps the registry version
+    assert alerter.run_cycle()["areas"] == 2
+    assert engine.predicted == predicted + 2
+
+
+def test_change_inside_the_dedup_window_is_delivered_when_it_ends(setup):
+    engine, alerts, alerter, now = setup
+    engine.set_hours("ridgeview", 8)
+    assert alerter.run_cycle()["recipients"] == 2
+
+    now[0] += 600
+    engine.set_hours("ridgeview", 12)
+    result = alerter.run_cycle()
+    assert result["deduplicated"] == 2 and result["pending"] == 2
+
+    now[0] += 3000
+    assert alerter.run_cycle()["recipients"] == 2
+    [first, second] = texts_to(alerts, "+263771000001")
+    assert "12" in second and "12" not in first
+    assert alerter.run_cycle()["recipients"] == 0
+
+
+def test_change_during_quiet_hours_is_delivered_when_they_end(setup):
+    engine, alerts, alerter, now = setup
+    now[0] = at(23)
+    engine.set_hours("ridgeview", 8)
+    result = alerter.run_cycle()
+    assert result["recipients"] == 1 and result["pending"] == 1
+    assert texts_to(alerts, "+263771000002") == []
+
+    now[0] = at(5, 30) + 86400
+    alerter.run_cycle()
+    assert texts_to(alerts, "+263771000002") == []
+
+    now[0] = at(6) + 86400
+    assert alerter.run_cycle()["recipients"] == 1
+    assert len(texts_to(alerts, "+263771000002")) == 1
+
+
+def test_failed_dispatch_is_not_counted_as_alerted(setup):
+    engine, alerts, alerter, now = setup
+    alerts.fail = "raise"
+    engine.set_hours("ridgeview", 8)
+    result = alerter.run_cycle()
+    assert result["recipients"] == 0 and result["pending"] == 2
+
+    alerts.fail = {"+263771000002"}
+    now[0] += 60
+    result = alerter.run_cycle()
+    assert result["recipients"] == 1 and result["pending"] == 1
+
+    alerts.fail = None
+    now[0] += 60
+    assert alerter.run_cycle()["recipients"] == 1
+    assert len(texts_to(alerts, "+263771000001")) == len(texts_to(alerts, "+263771000002")) == 1
+
+
+def test_pending_alert_is_dropped_after_unsubscribing(setup):
+    engine, alerts, alerter, now = setup
+    now[0] = at(23)
+    engine.set_hours("ridgeview", 8)
+    alerter.run_cycle()
+    alerts.subscribers.unsubscribe("+263771000002")
+    now[0] = at(7) + 86400
+    result = alerter.run_cycle()
+    assert result["pending"] == 0
+    assert texts_to(alerts, "+263771000002") == []
+
+
+def test_prediction_that_changes_back_is_queued_again(tmp_path):
+    engine = StubEngine()
+    registry = SubscriberRegistry()
+    registry.subscribe("+263771000001", ["ridgeview"])
+    # No outbox workers: the messages stay queued where the test can read them
+    alerts = MVP.AlertSystem(
+        prediction_engine=engine, subscribers=registry,
+        outbox_path=str(tmp_path / "sms_outbox.db"), outbox_workers=0,
+    )
+    now = [at(12)]
+    alerter = ChangeDrivenAlerter(alerts, dedup_window=60, clock=lambda: now[0])
+    try:
+        engine.set_hours("ridgeview", 6)
+        alerter.run_cycle()
+        for hours in (8, 6, 8):
+            now[0] += 600
+            engine.set_hours("ridgeview", hours)
+            assert alerter.run_cycle()["queued"] == 1
+        conn = alerts.outbox._connect()
+        texts = [
+            text for text, in conn.execute(
+                "SELECT text FROM sms_outbox WHERE status = ? ORDER BY id", (PENDING,)
+            )
+        ]
+        conn.close()
+    finally:
+        alerts.close()
+    assert len(texts) == 3 and texts[0] == texts[2] != texts[1]
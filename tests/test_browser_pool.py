@@ -0,0 +1,130 @@
+import os
+import shutil
+import threading
+
+import pytest
+from selenium.common.exceptions import WebDriverException
+
+import MVP
+from browser_pool import BrowserSessionPool, _Session
+from mock_servers import static_fixture_server
+from tests.conftest import ROOT
+
+
+class FakeDriver:
+    """Stands in for a Chrome driver; ``alive`` decides its health check."""
+
+    def __init__(self):
+        self.alive = True
+        self.quit_calls = 0
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise WebDriverException("chrome not reachable")
+        return 1
+
+    def quit(self):
+        self.quit_calls += 1
+
+
+class FakePool(BrowserSessionPool):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.started = []
+
+    def _start(self):
+        driver = FakeDriver()
+        self.started.append(driver)
+        return _Session(driver)
+
+
+def test_sessions_are_reused():
+    pool = FakePool(size=2, max_uses=50)
+    drivers = set()
+    for _ in range(10):
+        with pool.session() as driver:
+            drivers.add(driver)
+    assert len(pool.started) == 1 and drivers == {pool.started[0]}
+    pool.close()
+    assert pool.started[0].quit_calls == 1
+
+
+def test_sessions_are_recycled_after_max_uses():
+    pool = FakePool(size=1, max_uses=3)
+    for _ in range(7):
+        with pool.session():
+            pass
+    assert len(pool.started) == 3
+    assert [driver.quit_calls for driver in pool.started] == [1, 1, 0]
+    pool.close()
+
+
+def test_dead_session_is_replaced():
+    pool = FakePool(size=1)
+    with pool.session() as first:
+        pass
+    first.alive = False
+    with pool.session() as second:
+        pass
+    assert second is not first and first.quit_calls == 1
+
+
+def test_session_that_died_mid_use_is_not_returned():
+    pool = FakePool(size=1)
+    with pytest.raises(WebDriverException):
+        with pool.session() as driver:
+            driver.alive = False
+            raise WebDriverException("tab crashed")
+    assert driver.quit_calls == 1
+    with pool.session() as replacement:
+        assert replacement is not driver
+
+
+def test_pool_limits_open_sessions():
+    pool = FakePool(size=1)
+    in_use = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with pool.session():
+            in_use.set()
+            release.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    assert in_use.wait(5)
+    with pytest.raises(TimeoutError):
+        with pool.session(timeout=0.05):
+            pass
+    release.set()
+    holder.join()
+    with pool.session(timeout=1):
+        pass
+    assert len(pool.started) == 1
+
+
+def test_closed_pool_refuses_sessions_and_quits_returned_ones():
+    pool = FakePool(size=2)
+    with pool.session() as driver:
+        pool.close()
+    assert driver.quit_calls == 1
+    with pytest.raises(RuntimeError):
+        with pool.session():
+            pass
+
+
+@pytest.mark.skipif(
+    not (os.environ.get("CHROMEDRIVER_PATH") or shutil.which("chromedriver")),
+    reason="needs Chrome and chromedriver",
+)
+def test_scraper_reads_tweets_from_a_local_timeline(monkeypatch):
+    monkeypatch.setattr(MVP, "_browser_pool", BrowserSessionPool(size=1))
+    try:
+        with static_fixture_server(os.path.join(ROOT, "benchmarks", "fixtures")) as fixture:
+            for _ in range(2):
+                text = MVP.get_latest_zpc_generation_tweet_text_selenium(
+                    "zpc_timeline.html", base_url=fixture.url
+                )
+                assert "Kariba 485MW" in text
+    finally:
+        MVP.close_browser_pool()
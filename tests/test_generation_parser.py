@@ -0,0 +1,32 @@
+import os
+
+import pytest
+
+from generation_parser import parse_generation_bulletins, parse_generation_data, split_bulletins
+from tests.conftest import ROOT
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Hwange 675MW Kariba 485MW", {"Hwange": "675MW", "Kariba": "485MW"}),
+        ("Hwange 7&8 600MW, Hwange 1-6 212MW", {"Hwange": "812MW"}),
+        ("Hwange 2 485MW", {"Hwange": "485MW"}),
+        ("Hwange unit 3 120 MW", {"Hwange": "120MW"}),
+        ("Hwange 1,120MW", {"Hwange": "1120MW"}),
+        ("TOTAL 1 120 MW", {"TOTAL": "1120MW"}),
+        ("Total: 1,047 MW", {"TOTAL": "1047MW"}),
+        ("Lake Kariba level is 476.91m", {}),
+    ],
+)
+def test_parse_generation_data(text, expected):
+    assert parse_generation_data(text) == expected
+
+
+def test_fixture_bulletins():
+    path = os.path.join(ROOT, "benchmarks", "fixtures", "zpc_bulletins.txt")
+    with open(path) as f:
+        table = parse_generation_bulletins(split_bulletins(f.read()))
+    assert table["Kariba"].tolist() == [485, 350, 500, 450, 275]
+    assert table["Hwange"].tolist() == [675, 485, 812, 590, 410]
+    assert table["TOTAL"].tolist() == [1244, 1047, 1383.5, 1120, 975]
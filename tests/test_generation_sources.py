@@ -0,0 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import MVP
+from generation_sources import GenerationSource
+
+
+def test_default_sources_skip_the_api_without_credentials(monkeypatch):
+    monkeypatch.setattr(MVP, "consumer_key", None)
+    assert MVP.default_generation_sources() == "manual"
+    for name in ("consumer_key", "consumer_secret", "access_token", "access_token_secret"):
+        monkeypatch.setattr(MVP, name, "set")
+    assert MVP.default_generation_sources() == "api,manual"
+
+
+def test_source_counters_are_exact_under_concurrent_runs():
+    readings = iter(range(100000))
+
+    def fetch():
+        return {"Kariba": "485MW"} if next(readings) % 2 else None
+
+    source = GenerationSource("test", fetch)
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(lambda _: source.run(), range(4000)))
+    stats = source.stats()
+    assert stats["calls"] == 4000
+    assert stats["successes"] == stats["failures"] == 2000
+    assert stats["success_rate"] == 0.5
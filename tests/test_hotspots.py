@@ -0,0 +1,84 @@
+from hotspots import Cluster, OutageClusterDetector
+
+T0 = 1_000_020.0  # Start of a 30-second bucket
+
+
+def detector(**options):
+    now = [T0]
+    options.setdefault("clock", lambda: now[0])
+    return OutageClusterDetector(**options), now
+
+
+def report(clusters, location, count, at, region=None):
+    for _ in range(count):
+        clusters.record(location, region, timestamp=at)
+
+
+def test_reports_expire_bucket_by_bucket():
+    clusters, now = detector(window=900, bucket_seconds=30)
+    report(clusters, "ridgeview", 3, T0)
+    report(clusters, "ridgeview", 2, T0 + 300)
+    assert clusters.count("ridgeview", now=T0 + 899) == 5
+    assert clusters.count("ridgeview", now=T0 + 900) == 2  # First bucket slid out
+    assert clusters.count("ridgeview", now=T0 + 1199) == 2
+    assert clusters.count("ridgeview", now=T0 + 1200) == 0
+
+
+def test_window_restarts_after_a_long_gap_and_ignores_late_reports():
+    clusters, now = detector(window=900, bucket_seconds=30)
+    report(clusters, "ridgeview", 4, T0)
+    report(clusters, "ridgeview", 1, T0 + 5000)
+    assert clusters.count("ridgeview", now=T0 + 5000) == 1
+    report(clusters, "ridgeview", 3, T0 + 5000 - 900)  # Older than the window
+    assert clusters.count("ridgeview", now=T0 + 5000) == 1
+    report(clusters, "ridgeview", 2, T0 + 5000 - 870)  # Still inside it
+    assert clusters.count("ridgeview", now=T0 + 5000) == 3
+
+
+def test_cluster_starts_at_the_threshold_and_ends_when_reports_expire():
+    clusters, now = detector(min_reports=5, region_min_reports=8)
+    report(clusters, "ridgeview", 4, T0, region="harare region")
+    assert clusters.cluster_for("ridgeview", "harare region") is None and clusters.version == 0
+    report(clusters, "ridgeview", 1, T0 + 60, region="harare region")
+    assert clusters.cluster_for("ridgeview", "harare region") == Cluster("ridgeview", 5, T0 + 60)
+    assert clusters.version == 1
+    report(clusters, "wendy", 3, T0 + 90, region="harare region")
+    assert clusters.cluster_for("wendy", "harare region") == Cluster("harare region", 8, T0 + 90)
+    assert clusters.version == 2
+
+    now[0] = T0 + 960  # Only Wendy's reports are still in the window
+    assert clusters.cluster_for("ridgeview") is None
+    assert clusters.version == 3
+    assert clusters.hotspots() == []
+    assert clusters.version == 4
+
+
+def test_least_recently_reported_area_is_evicted_at_the_cap():
+    clusters, now = detector(max_areas=3, min_reports=2)
+    for location in ("ridgeview", "wendy", "belvedere"):
+        report(clusters, location, 2, T0)
+    assert clusters.version == 3
+    report(clusters, "ridgeview", 1, T0 + 30)  # Now the most recently reported
+    report(clusters, "avondale", 1, T0 + 60)
+    assert clusters.count("wendy") == 0  # Evicted, and its cluster with it
+    assert clusters.version == 4
+    assert [clusters.count(name) for name in ("ridgeview", "belvedere", "avondale")] == [3, 2, 1]
+    report(clusters, "mabelreign", 1, T0 + 90)
+    assert clusters.count("belvedere") == 0
+    assert len(clusters._areas) == 3
+
+
+def test_hotspots_lists_busiest_first_and_frees_idle_areas():
+    clusters, now = detector(min_reports=2, region_min_reports=4)
+    report(clusters, "ridgeview", 2, T0, region="harare region")
+    report(clusters, "wendy", 3, T0 + 30, region="harare region")
+    report(clusters, "belvedere", 1, T0 + 30)
+    now[0] = T0 + 60
+    assert [(c["kind"], c["area"], c["count"]) for c in clusters.hotspots()] == [
+        ("region", "harare region", 5),
+        ("location", "wendy", 3),
+        ("location", "ridgeview", 2),
+    ]
+    now[0] = T0 + 2000
+    assert clusters.hotspots() == []
+    assert not clusters._areas
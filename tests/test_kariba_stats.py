@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from kariba_stats import KaribaTrendStats, slope_over
+
+
+def history(days=400, seed=11):
+    """Daily Kariba levels with random gaps, as the real series has."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2023-01-01", periods=days, freq="D")
+    levels = 477 + np.cumsum(rng.normal(0, 0.03, days))
+    kept = rng.random(days) > 0.3
+    kept[:2] = True
+    kept[150:171] = False  # A three-week outage of the ZRA page
+    return pd.DataFrame({"date": dates[kept], "level": levels[kept]}).reset_index(drop=True)
+
+
+def batch_window(data, days):
+    """Slope and volatility of the last ``days`` days, recomputed from scratch."""
+    recent = data[data["date"] > data["date"].iloc[-1] - pd.Timedelta(days=days)]
+    t = ((recent["date"] - recent["date"].iloc[0]) / pd.Timedelta(days=1)).to_numpy()
+    rates = np.diff(recent["level"].to_numpy()) / np.diff(t)
+    return slope_over(data, days), float(np.std(rates)) if len(rates) >= 2 else 0.0, len(recent)
+
+
+def assert_matches_batch(stats, data):
+    for days, summary in stats.snapshot()["windows"].items():
+        slope, volatility, observations = batch_window(data, days)
+        assert summary["observations"] == observations
+        assert summary["slope_m_per_day"] == pytest.approx(slope, abs=1e-9)
+        assert summary["volatility_m_per_day"] == pytest.approx(volatility, abs=1e-9)
+        assert stats.slope(days) == summary["slope_m_per_day"]
+
+
+def test_incremental_windows_match_batch_recomputation():
+    data = history()
+    stats = KaribaTrendStats()
+    for i, (date, level) in enumerate(zip(data["date"], data["level"])):
+        assert stats.add(date, level)
+        if i % 17 == 0 or i == len(data) - 1:
+            assert_matches_batch(stats, data.iloc[:i + 1])
+
+
+def test_rebuild_matches_incremental_updates():
+    data = history()
+    incremental = KaribaTrendStats()
+    for date, level in zip(data["date"], data["level"]):
+        incremental.add(date, level)
+    rebuilt = KaribaTrendStats()
+    rebuilt.rebuild(data)
+    for days, summary in rebuilt.snapshot()["windows"].items():
+        assert summary == pytest.approx(incremental.snapshot()["windows"][days])
+    assert rebuilt.snapshot()["latest"] == incremental.snapshot()["latest"]
+
+
+def test_window_after_a_gap_counts_real_days():
+    data = history()
+    stats = KaribaTrendStats()
+    stats.rebuild(data.iloc[:data.index[data["date"] > "2023-05-31"][0] + 1])
+    week = stats.snapshot()["windows"][7]
+    assert week["observations"] == 1 and week["slope_m_per_day"] == 0.0
+
+
+def test_same_day_correction_replaces_the_last_observation():
+    data = history(120)
+    stats = KaribaTrendStats()
+    for date, level in zip(data["date"], data["level"]):
+        stats.add(date, level)
+    corrected = data.copy()
+    corrected.loc[corrected.index[-1], "level"] += 0.4
+    assert stats.add(corrected["date"].iloc[-1] + pd.Timedelta(hours=9), corrected["level"].iloc[-1])
+    assert_matches_batch(stats, corrected)
+    assert stats.snapshot()["latest"]["level"] == corrected["level"].iloc[-1]
+
+
+def test_back_dated_observation_asks_for_a_rebuild():
+    data = history(60)
+    stats = KaribaTrendStats()
+    stats.rebuild(data)
+    before = stats.snapshot()
+    assert not stats.add(data["date"].iloc[-2] - pd.Timedelta(days=1), 470.0)
+    assert stats.snapshot() is before
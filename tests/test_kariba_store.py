@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kariba_store import BinaryKaribaStore, open_kariba_store
+
+
+@pytest.fixture(params=["csv", "parquet", "binary"])
+def store(request, tmp_path):
+    if request.param == "parquet":
+        pytest.importorskip("pyarrow")
+    return open_kariba_store(str(tmp_path), request.param)
+
+
+def observations(days, start="2024-01-01", offset=0.0):
+    return pd.DataFrame({
+        "date": pd.date_range(start, periods=days, freq="D"),
+        "level": [477.0 + offset + day / 100 for day in range(days)],
+        "percent_full": [40.0 + offset + day / 10 for day in range(days)],
+    })
+
+
+def test_load_resolves_upserts_by_date(store):
+    assert store.load().empty
+    store.upsert(observations(5, start="2024-01-03"))
+    store.upsert(observations(3, offset=1.0))  # Jan 1-3, Jan 3 superseded
+    loaded = store.load()
+    assert list(loaded["date"]) == list(pd.date_range("2024-01-01", periods=7, freq="D"))
+    assert loaded["level"].iloc[2] == pytest.approx(478.02)
+    assert loaded["level"].iloc[3] == pytest.approx(477.01)
+    assert str(loaded["date"].dtype).startswith("datetime64")
+    assert loaded["level"].dtype == loaded["percent_full"].dtype == np.float64
+
+
+def test_upsert_skips_undated_rows(store):
+    store.upsert([{"date": "not a date", "level": 477.0, "percent_full": 40.0}])
+    store.upsert([{"date": "2024-02-01", "level": "477.5", "percent_full": 41}])
+    loaded = store.load()
+    assert len(loaded) == 1 and loaded["level"].iloc[0] == 477.5
+
+
+def test_load_compacts_once_duplicates_pile_up(store):
+    store.upsert(observations(10))
+    store.upsert(observations(2, offset=1.0))  # 2 of 12 rows superseded: kept as is
+    store.load()
+    assert len(store._read()) == 12
+    store.upsert(observations(10, offset=2.0))
+    loaded = store.load()
+    assert len(store._read()) == len(loaded) == 10
+    assert loaded["level"].iloc[0] == pytest.approx(479.0)
+    assert store.load().equals(loaded)
+
+
+def test_upsert_during_compaction_is_kept(store):
+    store.upsert(observations(10))
+    store.upsert(observations(10, offset=1.0))
+    rewrite = store._rewrite
+
+    def slow_rewrite(data):
+        # Another thread writes a new reading while the compaction is under way
+        writer.start()
+        time.sleep(0.2)
+        rewrite(data)
+
+    writer = threading.Thread(target=store.upsert, args=(observations(1, start="2024-03-01"),))
+    store._rewrite = slow_rewrite
+    store.load()
+    writer.join()
+    store._rewrite = rewrite
+    assert pd.Timestamp("2024-03-01") in set(store.load()["date"])
+
+
+def test_binary_store_round_trips_through_the_memory_map(tmp_path):
+    store = BinaryKaribaStore(str(tmp_path))
+    data = observations(4)
+    data.loc[2, "percent_full"] = float("nan")
+    store.upsert(data)
+    assert os.path.getsize(store.path) == 4 * store.record_dtype.itemsize
+    reopened = BinaryKaribaStore(str(tmp_path)).load()
+    pd.testing.assert_frame_equal(reopened, data, check_dtype=False)
+    assert str(reopened["date"].dtype).startswith("datetime64")
+
+
+def test_csv_store_reads_legacy_date_formats(tmp_path):
+    path = tmp_path / "kariba_levels.csv"
+    # As hand-edited: mixed date formats and no trailing newline
+    path.write_text(
+        "date,level,percent_full\n"
+        "01/01/2024 06:00,477.1,40.1\n"
+        "02/01/2024,477.2,40.2\n"
+        "2024-01-03,477.3,40.3"
+    )
+    store = open_kariba_store(str(tmp_path), "csv")
+    store.upsert([{"date": pd.Timestamp("2024-01-04"), "level": 477.4, "percent_full": 40.4}])
+    loaded = store.load()
+    assert [date.day for date in loaded["date"]] == [1, 2, 3, 4]
+    assert list(loaded["level"]) == [477.1, 477.2, 477.3, 477.4]
@@ -0,0 +1,57 @@
+import os
+
+import pytest
+
+from location_index import LocationIndex, is_generic
+from tests.conftest import ROOT
+
+
+@pytest.fixture(scope="module")
+def index():
+    return LocationIndex.from_file(os.path.join(ROOT, "data", "locations.txt"))
+
+
+@pytest.mark.parametrize("query, key", [
+    ("Ridgeview", "ridgeview"),
+    ("  RIDGEVIEW ", "ridgeview"),
+    ("Harare", "harare region"),
+    ("Samora Machel Ave", "samora machel avenue"),
+    ("Samora Machel", "samora machel avenue"),
+    ("Tredgold Drv", "tredgold drive"),
+    ("Clarendon Cct", "clarendon circle"),
+    ("Ridgeveiw", "ridgeview"),
+    ("Garfeild Road", "garfield road"),
+    ("Beat Raod", "beat road"),
+    ("Hrare", "harare region"),
+    ("Harare, Ridgeview", "ridgeview"),
+    ("Harare Ridgeview", "ridgeview"),
+    ("Mcgowan Road", "mcgowan"),
+])
+def test_resolves(index, query, key):
+    match = index.resolve(query)
+    assert match is not None and match.key == key
+
+
+@pytest.mark.parametrize("query", [
+    "Hyde Park",
+    "Road",
+    "Raod",
+    "Avenue",
+    "Park Road",
+    "Wendy Park",
+    "Borrowdale",
+    "Mount Pleasant",
+    "",
+])
+def test_rejects_unrelated_and_generic_names(index, query):
+    assert index.resolve(query) is None
+
+
+def test_region_narrows_other_parts(index):
+    match = index.resolve("Harare Region, Ridgevew")
+    assert (match.key, match.region) == ("ridgeview", "Harare Region")
+
+
+def test_generic_words_and_their_misspellings():
+    assert all(is_generic(word) for word in ["road", "raod", "aroad", "avenu", "region"])
+    assert not any(is_generic(word) for word in ["read", "easy", "beat", "hyde", "park"])
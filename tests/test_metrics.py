@@ -0,0 +1,49 @@
+import gc
+import threading
+
+from metrics import Counter, Histogram
+
+
+def run_threads(target, count=50):
+    for _ in range(count):
+        thread = threading.Thread(target=target)
+        thread.start()
+        thread.join()
+    gc.collect()
+
+
+def test_counter_keeps_counts_of_exited_threads_without_their_shards():
+    counter = Counter("test_total", "Test counter.")
+    run_threads(lambda: counter.inc(2))
+    counter.inc()
+    child = counter.labels()
+    assert child.value == 101
+    assert len(child._values.shards) == 1  # Only this thread's
+
+
+def test_histogram_keeps_observations_of_exited_threads():
+    histogram = Histogram("test_seconds", "Test histogram.", buckets=(0.1, 1.0))
+    run_threads(lambda: histogram.labels().observe(0.5))
+    counts, total, count = histogram.labels().snapshot()
+    assert counts == [0, 50, 0] and total == 25.0 and count == 50
+    assert histogram.labels()._values.shards == []
+
+
+def test_render_sums_live_and_exited_threads():
+    counter = Counter("test_requests_total", "Test counter.", ["route"])
+    started, release = threading.Event(), threading.Event()
+
+    def live():
+        counter.labels("/a").inc()
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=live)
+    thread.start()
+    started.wait(5)
+    run_threads(lambda: counter.labels("/a").inc(), count=3)
+    assert 'test_requests_total{route="/a"} 4' in counter.render()
+    release.set()
+    thread.join()
+    gc.collect()
+    assert 'test_requests_total{route="/a"} 4' in counter.render()
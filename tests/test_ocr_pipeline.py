@@ -0,0 +1,117 @@
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+from PIL import Image
+
+import ocr_pipeline
+from bench_ocr_pipeline import render_bulletin
+from ocr_pipeline import OcrPipeline, preprocess_image
+
+BULLETIN = "POWER GENERATION UPDATE\nHwange 675MW\nKariba 485MW\nIPPs 84MW\nTOTAL 1,244MW"
+
+
+def png(image):
+    buffer = BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def bulletin_png(tmp_path):
+    def render(text=BULLETIN, dark=False):
+        path = tmp_path / f"bulletin_{int(dark)}.png"
+        render_bulletin(text, str(path), dark=dark)
+        return path.read_bytes()
+
+    return render
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    """Runs 'OCR' on threads, answering from ``texts`` (image bytes -> text)."""
+    fake = SimpleNamespace(texts={}, calls=[], release=threading.Event())
+    fake.release.set()
+
+    def ocr_image_bytes(data, **options):
+        fake.calls.append(data)
+        fake.release.wait(5)
+        return fake.texts[data]
+
+    threads = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(ocr_pipeline, "ocr_image_bytes", ocr_image_bytes)
+    monkeypatch.setattr(OcrPipeline, "_pool", lambda self: threads)
+    yield fake
+    fake.release.set()
+    threads.shutdown(wait=True)
+
+
+@pytest.mark.parametrize("dark", [False, True])
+def test_preprocess_gives_black_ink_on_white_cropped_to_the_table(bulletin_png, dark):
+    with Image.open(BytesIO(bulletin_png(dark=dark))) as image:
+        original = image.size
+        prepared = preprocess_image(image, min_width=0)
+    assert prepared.mode == "L"
+    assert sum(prepared.histogram()[1:255]) == 0  # Only black and white
+    assert prepared.getpixel((0, 0)) == 255  # White margin around the ink
+    assert prepared.width < original[0] and prepared.height < original[1]
+
+
+def test_preprocess_upscales_small_images():
+    image = Image.new("RGB", (300, 100), "white")
+    image.paste((0, 0, 0), (20, 20, 280, 80))
+    prepared = preprocess_image(image, crop_box=(0, 0, 300, 100), min_width=1200)
+    assert prepared.size == (1200, 400)
+
+
+def test_results_are_cached_by_content_and_persisted(fake_ocr, tmp_path):
+    image = png(Image.new("RGB", (10, 10), "white"))
+    fake_ocr.texts[image] = BULLETIN
+    cache_path = str(tmp_path / "ocr_cache.jsonl")
+    pipeline = OcrPipeline(cache_path=cache_path)
+    assert pipeline.generation_data([image, image]) == {
+        "Hwange": "675MW", "Kariba": "485MW", "IPPS": "84MW", "TOTAL": "1244MW"
+    }
+    assert pipeline.ocr(image) == BULLETIN
+    assert len(fake_ocr.calls) == 1
+    assert pipeline.stats()["misses"] == 1
+
+    restarted = OcrPipeline(cache_path=cache_path)
+    assert restarted.ocr(image) == BULLETIN
+    assert len(fake_ocr.calls) == 1
+
+
+def test_cached_generation_data_does_not_wait_for_ocr(fake_ocr):
+    image = png(Image.new("RGB", (10, 10), "white"))
+    fake_ocr.texts[image] = BULLETIN
+    fake_ocr.release.clear()
+    pipeline = OcrPipeline()
+    ready = threading.Event()
+
+    assert pipeline.cached_generation_data([image], on_ready=ready.set) == {}
+    assert not ready.is_set()
+    fake_ocr.release.set()
+    assert ready.wait(5)
+    assert pipeline.cached_generation_data([image])["Kariba"] == "485MW"
+    assert len(fake_ocr.calls) == 1
+
+
+def test_failed_ocr_is_skipped(fake_ocr):
+    image = png(Image.new("RGB", (10, 10), "white"))  # No text registered: OCR raises
+    pipeline = OcrPipeline()
+    pipeline.submit(image).exception(timeout=5)
+    assert pipeline.cached_generation_data([image]) == {}
+    assert pipeline.stats()["failures"] == 1
+
+
+@pytest.mark.skipif(not shutil.which("tesseract"), reason="needs the tesseract binary")
+@pytest.mark.parametrize("dark", [False, True])
+def test_tesseract_reads_rendered_bulletins(bulletin_png, dark):
+    pipeline = OcrPipeline(workers=1, timeout=60)
+    try:
+        assert pipeline.generation_data([bulletin_png(dark=dark)], timeout=120)["Kariba"] == "485MW"
+    finally:
+        pipeline.close()
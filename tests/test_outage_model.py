@@ -0,0 +1,117 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from outage_model import (
+    MAX_HOURS,
+    NORMAL_REASON,
+    REASONS,
+    OutageModel,
+    build_training_frame,
+    context_features,
+    load_generation_history,
+    load_outage_model,
+    save_artifact,
+    train_outage_model,
+)
+
+LOCATIONS = {"Ridgeview": 3.0, "Wendy": 0.0, "Belvedere": -2.0}
+
+
+@pytest.fixture(scope="module")
+def history(tmp_path_factory):
+    """A year of Kariba levels, generation figures and outages driven by both."""
+    rng = np.random.default_rng(7)
+    dates = pd.date_range("2024-01-01", periods=365, freq="D")
+    levels = 478.0 - 2.5 * np.sin(np.arange(365) / 58)
+    kariba = pd.DataFrame({"date": dates, "level": levels, "percent_full": (levels - 475.5) * 10})
+    hwange = rng.uniform(300, 800, len(dates))
+    generation_file = tmp_path_factory.mktemp("generation") / "generation_history.csv"
+    pd.DataFrame({
+        "date": dates.strftime("%Y-%m-%d"),
+        "Kariba": [f"{mw:.0f}MW" for mw in (levels - 474) * 200],
+        "Hwange": [f"{mw:.0f}MW" for mw in hwange],
+    }).to_csv(generation_file, index=False)
+    rows = []
+    for date, level, mw in zip(dates, levels, hwange):
+        for location, offset in LOCATIONS.items():
+            hours = 8 + 3 * (478 - level) - (mw - 550) / 100 + offset + rng.normal(0, 0.5)
+            rows.append((date.strftime("%Y-%m-%d"), location, round(float(np.clip(hours, 0, 24)), 1)))
+    outages = pd.DataFrame(rows, columns=["date", "location", "outage_hours"])
+    return outages, kariba, load_generation_history(generation_file)
+
+
+@pytest.fixture(scope="module")
+def artifact(history):
+    return train_outage_model(build_training_frame(*history))
+
+
+def conditions(level, hwange_mw, when="2025-03-05"):
+    return context_features(
+        {"level": level}, -0.01, {"Kariba": "700MW", "Hwange": f"{hwange_mw}MW"},
+        pd.Timestamp(when).date(),
+    )
+
+
+def test_training_frame_joins_inputs_per_day(history):
+    frame = build_training_frame(*history)
+    assert len(frame) == len(history[0])
+    assert set(frame["location"]) == {"ridgeview", "wendy", "belvedere"}
+    assert not frame[["level", "kariba_mw", "hwange_mw", "total_mw"]].isna().any().any()
+    assert (frame["total_mw"] == frame["kariba_mw"] + frame["hwange_mw"]).all()
+
+
+def test_training_learns_the_fixture_relationship(artifact):
+    metrics = artifact["metrics"]
+    assert metrics["samples"] == 365 * len(LOCATIONS)
+    assert metrics["holdout_mae"] < metrics["holdout_baseline_mae"] / 2
+    assert metrics["train_mae"] < 1.0
+    offsets = artifact["locations"]
+    assert offsets["ridgeview"] > offsets["wendy"] > offsets["belvedere"]
+
+
+def test_training_needs_enough_records(history):
+    with pytest.raises(ValueError):
+        train_outage_model(build_training_frame(*history).head(5))
+
+
+def test_artifact_round_trips_through_json(artifact, tmp_path):
+    path = str(tmp_path / "models" / "outage_model.json")
+    save_artifact(artifact, path)
+    with open(path) as f:
+        assert json.load(f) == artifact
+    model = load_outage_model(path)
+    assert model.version == artifact["version"]
+    features, locations = conditions(476.2, 400), list(LOCATIONS)
+    assert model.predict(features, locations) == OutageModel(artifact).predict(features, locations)
+
+
+def test_missing_or_foreign_artifact_falls_back_to_rules(artifact, tmp_path):
+    assert load_outage_model(str(tmp_path / "missing.json")) is None
+    path = str(tmp_path / "outage_model.json")
+    save_artifact(dict(artifact, format=99), path)
+    assert load_outage_model(path) is None
+
+
+def test_predict_returns_bounded_half_hours_per_location(artifact):
+    model = OutageModel(artifact)
+    locations = ["Ridgeview", "wendy ", "Belvedere", "Chitungwiza"]
+    for level, hwange_mw in [(479.5, 800), (476.2, 400), (470.0, 0)]:
+        results = model.predict(conditions(level, hwange_mw), locations)
+        assert len(results) == len(locations)
+        for hours, reason in results:
+            assert 0 <= hours <= MAX_HOURS and hours * 2 == int(hours * 2)
+            assert reason == NORMAL_REASON or reason in REASONS.values()
+    low = model.predict(conditions(476.2, 400), locations)
+    high = model.predict(conditions(479.5, 800), locations)
+    assert all(worse > better for (worse, _), (better, _) in zip(low, high))
+    assert low[0][0] > low[1][0] > low[2][0]  # Location offsets carry through
+    assert model.predict(conditions(470.0, 0), locations)[0][0] == MAX_HOURS
+
+
+def test_unknown_inputs_are_filled_from_training(artifact):
+    model = OutageModel(artifact)
+    [(hours, _)] = model.predict(context_features(None, 0.0, {}), ["Wendy"])
+    assert 0 <= hours <= MAX_HOURS
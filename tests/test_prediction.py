@@ -0,0 +1,118 @@
+import pytest
+
+# Every locations.txt entry plus the kinds of names users type in
+EXTRA_LOCATIONS = [
+    "Harare",
+    "harare region",
+    "  Ridgeview ",
+    "RIDGEVIEW",
+    "Samora Machel Ave",
+    "Cromarty",
+    "Princes Road",
+    "Tredgold Drv",
+    "Belvedere",
+    "Chitungwiza",
+    "",
+]
+
+
+def fixture_locations(engine):
+    return list(engine.location_fault_data) + EXTRA_LOCATIONS
+
+
+def scalar_predictions(engine, locations):
+    engine.prediction_cache.clear()
+    return [engine.predict_outage_hours(location) for location in locations]
+
+
+def test_predict_many_matches_scalar_path(engine):
+    locations = fixture_locations(engine)
+    expected = scalar_predictions(engine, locations)
+    engine.prediction_cache.clear()
+    assert engine.predict_many(locations) == expected
+
+
+def test_predict_many_matches_scalar_path_from_cache(engine):
+    locations = fixture_locations(engine)
+    expected = scalar_predictions(engine, locations)  # Leaves every location cached
+    hits = engine.prediction_cache.hits
+    assert engine.predict_many(locations) == expected
+    assert engine.prediction_cache.hits - hits == len(locations)
+
+
+@pytest.mark.parametrize("reported", ["Ridgeview", "Harare Region"])
+def test_predict_many_matches_scalar_path_with_clusters(engine, reported):
+    for _ in range(20):
+        engine.record_report(reported)
+    assert engine.cluster_detector.hotspots()
+    locations = fixture_locations(engine)
+    expected = scalar_predictions(engine, locations)
+    assert any("outage reports in" in reason for _, reason in expected)
+    engine.prediction_cache.clear()
+    assert engine.predict_many(locations) == expected
+
+
+def test_predict_many_with_duplicates_and_empty_batch(engine):
+    assert engine.predict_many([]) == []
+    expected = scalar_predictions(engine, ["Ridgeview", "Wendy"])
+    engine.prediction_cache.clear()
+    assert engine.predict_many(["Ridgeview", "Wendy", "Ridgeview"]) == expected + expected[:1]
+
+
+def test_fuzzy_match_keeps_computed_reason(engine):
+    _, computed = engine.predict_outage_hours("Chitungwiza")  # Not in locations.txt
+    assert engine.resolve_location_key("Harare") == "harare region"
+    assert engine.predict_outage_hours("Harare") == engine.predict_outage_hours("Chitungwiza")
+    assert engine.predict_outage_hours("Harare Region")[1] == "No fault information available"
+    assert engine.predict_outage_hours("Cromarty")[1] == "Princes Road"
+    assert computed != "No fault information available"
+
+
+def test_cached_prediction_shows_current_cluster_count(engine):
+    engine.predict_many(["Ridgeview"])  # Generation sources settle on first use
+    for _ in range(5):
+        engine.record_report("Ridgeview")
+    assert "(5 outage reports in" in engine.predict_outage_hours("Ridgeview")[1]
+    hits = engine.prediction_cache.hits
+    engine.record_report("Ridgeview")
+    assert "(6 outage reports in" in engine.predict_outage_hours("Ridgeview")[1]
+    assert "(6 outage reports in" in engine.predict_many(["Ridgeview"])[0][1]
+    assert engine.prediction_cache.hits - hits == 2
+
+
+def test_cached_prediction_drops_expired_cluster(engine):
+    now = [1_000_000.0]
+    engine.cluster_detector.clock = lambda: now[0]
+    engine.predict_many(["Ridgeview"])
+    for _ in range(5):
+        engine.record_report("Ridgeview")
+    assert "outage reports in" in engine.predict_outage_hours("Ridgeview")[1]
+    now[0] += engine.cluster_detector.window + engine.cluster_detector.bucket_seconds
+    hits = engine.prediction_cache.hits
+    assert "outage reports in" not in engine.predict_outage_hours("Ridgeview")[1]
+    assert "outage reports in" not in engine.predict_many(["Ridgeview"])[0][1]
+    assert engine.prediction_cache.hits - hits == 2
+
+
+def test_cache_is_keyed_on_the_resolved_location(engine):
+    locations = ["Harare, Ridgeview", "Harare Ridgeview", "Ridgeview", "Harare"]
+    expected = [engine.compute_outage_hours(location) for location in locations]
+    engine.prediction_cache.clear()
+    assert [engine.predict_outage_hours(location) for location in locations] == expected
+    assert [engine.predict_outage_hours(location) for location in reversed(locations)] == expected[::-1]
+    engine.prediction_cache.clear()
+    assert engine.predict_many(locations + locations[::-1]) == expected + expected[::-1]
+
+
+def test_predict_many_keeps_integer_hours(engine, monkeypatch):
+    # The threshold rules give whole hours, the outage model fractional ones
+    monkeypatch.setattr(
+        engine, "predict_base_hours",
+        lambda kariba, generation, names: [(6 if "wendy" in name else 7.5, "Rules") for name in names],
+    )
+    locations = ["Wendy", "Ridgeview"]
+    expected = scalar_predictions(engine, locations)
+    engine.prediction_cache.clear()
+    batch = engine.predict_many(locations)
+    assert batch == expected
+    assert [type(hours) for hours, _ in batch] == [type(hours) for hours, _ in expected] == [int, float]
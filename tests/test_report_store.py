@@ -0,0 +1,109 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from report_store import OutageReportStore, ReportQueueFull, hash_contact
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.delenv("REPORT_CONTACT_SALT", raising=False)
+    return str(tmp_path / "outage_reports.db")
+
+
+def test_reports_are_written_in_batches(db_path):
+    store = OutageReportStore(db_path, batch_size=50)
+    store.start()
+    for i in range(500):
+        store.submit(f"Location {i % 7}", "no power", contact=f"+26377{i:07d}")
+    store.close()
+    assert store.count() == 500
+    assert store.batches < 500
+
+
+def test_contact_salt_is_generated_once_and_kept(db_path):
+    first = OutageReportStore(db_path)
+    second = OutageReportStore(db_path)
+    assert first.contact_salt and first.contact_salt == second.contact_salt
+    assert OutageReportStore(str(db_path) + ".other").contact_salt != first.contact_salt
+
+
+def test_contact_salt_from_environment(db_path, monkeypatch):
+    monkeypatch.setenv("REPORT_CONTACT_SALT", "pepper")
+    store = OutageReportStore(db_path)
+    store.start()
+    store.submit("Ridgeview", contact="+263 77 123 4567")
+    store.close()
+    [report] = store.recent()
+    assert report["contact_hash"] == hash_contact("263771234567", "pepper")
+
+
+def test_hash_contact_requires_a_salt():
+    with pytest.raises(ValueError):
+        hash_contact("+263771234567", "")
+    assert hash_contact(None, "") is None
+
+
+def test_failed_batch_is_retried_until_written(db_path):
+    store = OutageReportStore(db_path, retry_backoff=0.02, max_retry_backoff=0.05)
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "CREATE TRIGGER reject_reports BEFORE INSERT ON outage_reports "
+        "BEGIN SELECT RAISE(ABORT, 'disk full'); END"
+    )
+    conn.commit()
+    store.start()
+    for i in range(20):
+        store.submit("Ridgeview", f"report {i}")
+    deadline = time.monotonic() + 5
+    while store.write_errors < 3:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    conn.execute("DROP TRIGGER reject_reports")
+    conn.commit()
+    conn.close()
+    store.close()
+    assert store.count() == 20
+
+
+def test_submit_after_close_is_refused(db_path):
+    store = OutageReportStore(db_path)
+    store.start()
+    store.close()
+    with pytest.raises(ReportQueueFull):
+        store.submit("Ridgeview")
+
+
+def test_close_without_start_writes_queued_reports(db_path):
+    store = OutageReportStore(db_path)
+    store.submit("Ridgeview")
+    store.submit("Wendy")
+    store.close()
+    assert store.count() == 2
+
+
+def test_no_report_is_accepted_and_lost_while_closing(db_path):
+    store = OutageReportStore(db_path, max_queue=100000)
+    store.start()
+    accepted = []
+    stop = threading.Event()
+
+    def submitter():
+        while not stop.is_set():
+            try:
+                store.submit("Ridgeview")
+            except ReportQueueFull:
+                return
+            accepted.append(1)
+
+    threads = [threading.Thread(target=submitter) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.2)
+    store.close()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    assert store.count() == len(accepted)
@@ -0,0 +1,63 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from mock_servers import mock_zra_server
+from tests.conftest import http_json
+
+
+def test_report_outage_returns_prediction(live_server):
+    status, body = http_json(f"{live_server}/report-outage", {"location": "Ridgeview", "details": ""})
+    assert status == 200
+    assert body["message"] == "Outage report received!"
+    assert "Ridgeview" in body["prediction"]
+
+
+@pytest.mark.stale_kariba
+def test_reports_keep_answering_while_zra_fetch_hangs(engine, live_server):
+    hang = 3.0
+    with mock_zra_server(delay=hang) as zra:
+        engine.kariba_collector.zra_url = zra.url
+        with ThreadPoolExecutor(max_workers=9) as pool:
+            # The first report starts the ZRA fetch and waits on it
+            hung = pool.submit(http_json, f"{live_server}/report-outage", {"location": "Harare"})
+            deadline = time.monotonic() + 2
+            while not engine.kariba_collector._fetch_lock.locked():
+                assert time.monotonic() < deadline, "ZRA fetch never started"
+                time.sleep(0.01)
+
+            start = time.perf_counter()
+            results = list(pool.map(
+                lambda _: http_json(f"{live_server}/report-outage", {"location": "Ridgeview"}),
+                range(16),
+            ))
+            elapsed = time.perf_counter() - start
+
+            assert not hung.done()
+            assert [status for status, _ in results] == [200] * 16
+            assert elapsed < hang / 2
+            assert hung.result(timeout=hang * 3)[0] == 200
+
+
+def test_report_outage_with_non_object_body_still_answers(live_server):
+    status, body = http_json(f"{live_server}/report-outage", ["Ridgeview"])
+    assert status == 200
+    assert body["message"] == "Outage report received, but prediction failed."
+
+
+def test_forecast_is_404_when_disabled(live_server):
+    status, body = http_json(f"{live_server}/forecast/Ridgeview")
+    assert status == 404
+    assert "disabled" in body["detail"]
+
+
+def test_forecast_is_served_once_built(engine, live_server):
+    engine.start_forecasts(horizon=2)
+    deadline = time.monotonic() + 10
+    while engine.forecast_refresher.table is None:
+        assert time.monotonic() < deadline, "forecast table was never built"
+        time.sleep(0.02)
+    status, body = http_json(f"{live_server}/forecast/Ridgeview")
+    assert status == 200
+    assert body["matched"] == "ridgeview" and len(body["days"]) == 2
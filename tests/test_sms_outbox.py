@@ -0,0 +1,194 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import MVP
+from mock_servers import mock_infobip_server
+from sms_outbox import DEAD, PENDING, SENDING, SENT, SmsOutbox
+from tests.conftest import ROOT
+
+NO_ENGINE = object()  # The outbox only needs AlertSystem's Infobip session
+
+
+class FakeInfobip:
+    """An outbox ``send``: accepts every destination, or hangs its first call."""
+
+    def __init__(self, hang_first=False, reject=()):
+        self.delivered = {}
+        self.reject = set(reject)
+        self.hang_first = hang_first
+        self.release = threading.Event()
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, payload):
+        with self.lock:
+            self.calls += 1
+            hang = self.hang_first and self.calls == 1
+        if hang:
+            self.release.wait(10)
+        results = []
+        for message in payload["messages"]:
+            for destination in message["destinations"]:
+                key = destination["messageId"]
+                group = "REJECTED" if destination["to"] in self.reject else "PENDING"
+                with self.lock:
+                    self.delivered[key] = self.delivered.get(key, 0) + 1
+                results.append({"messageId": key, "status": {"groupName": group}})
+        return {"messages": results}, None, False
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "sms_outbox.db")
+
+
+def outbox(send, db_path, **kwargs):
+    options = {"workers": 2, "batch_size": 10, "backoff_base": 0.01, "backoff_max": 0.05,
+               "poll_interval": 0.02}
+    options.update(kwargs)
+    return SmsOutbox(send, db_path, **options)
+
+
+def queue(box, count, prefix="key"):
+    return box.enqueue_many(
+        (f"+2637{i:08d}", f"Alert {i % 5}", f"{prefix}-{i}") for i in range(count)
+    )
+
+
+def test_every_message_is_sent_through_failures(db_path, monkeypatch):
+    with mock_infobip_server(failure_rate=0.2, seed=3) as infobip:
+        monkeypatch.setenv("INFOBIP_SMS_URL", f"{infobip.url}/sms/2/text/advanced")
+        alerts = MVP.AlertSystem(prediction_engine=NO_ENGINE, rate_limit=0)
+        box = outbox(alerts.post_infobip_once, db_path, workers=4, batch_size=50)
+        assert queue(box, 2000) == 2000
+        start = time.perf_counter()
+        box.start()
+        assert box.wait_until_drained(timeout=30)
+        elapsed = time.perf_counter() - start
+        box.stop()
+        alerts.close()
+    assert box.counts()[SENT] == 2000
+    assert box.retried > 0
+    assert sorted(infobip.delivered) == sorted(f"key-{i}" for i in range(2000))
+    assert infobip.stats["duplicates"] == 0
+    assert 2000 / elapsed > 200  # Messages per second, with a fifth of requests failing
+
+
+def test_duplicate_idempotency_key_is_sent_once(db_path):
+    send = FakeInfobip()
+    box = outbox(send, db_path)
+    assert box.enqueue("+263771234567", "Alert", "same-key")
+    assert not box.enqueue("+263771234567", "Alert", "same-key")
+    box.start()
+    assert box.wait_until_drained(timeout=10)
+    assert not box.enqueue("+263771234567", "Alert", "same-key")  # Already sent
+    time.sleep(0.1)
+    box.stop()
+    assert send.delivered == {"same-key": 1}
+    assert box.counts()[SENT] == 1
+
+
+def test_sending_rows_are_requeued_on_restart(db_path):
+    crashed = outbox(FakeInfobip(), db_path, lease_seconds=3600)
+    queue(crashed, 25)
+    conn = crashed._connect()
+    claimed = crashed._claim(conn)  # Claimed, then the process "died" before sending
+    conn.close()
+    assert len(claimed) == 10 and crashed.counts()[SENDING] == 10
+
+    send = FakeInfobip()
+    restarted = outbox(send, db_path, lease_seconds=3600)
+    restarted.start()
+    assert restarted.wait_until_drained(timeout=10)
+    restarted.stop()
+    assert restarted.counts()[SENT] == 25
+    assert sorted(send.delivered) == sorted(f"key-{i}" for i in range(25))
+
+
+def test_expired_lease_hands_messages_to_another_worker(db_path):
+    send = FakeInfobip(hang_first=True)
+    box = outbox(send, db_path, workers=2, batch_size=5, lease_seconds=0.3)
+    queue(box, 5)
+    box.start()
+    try:
+        # The first worker hangs on the whole batch; the second takes it over
+        assert box.wait_until_drained(timeout=10)
+        assert sorted(send.delivered) == sorted(f"key-{i}" for i in range(5))
+    finally:
+        send.release.set()
+        box.stop()
+    assert box.counts()[SENT] == 5
+
+
+def test_rejected_messages_are_dead_lettered_and_can_be_retried(db_path):
+    send = FakeInfobip(reject={"+263700000001"})
+    box = outbox(send, db_path)
+    queue(box, 3)
+    box.start()
+    assert box.wait_until_drained(timeout=10)
+    [dead] = box.dead_letters()
+    assert dead["phone_number"] == "+263700000001" and dead["attempts"] == 1
+    send.reject.clear()
+    assert box.retry_dead() == 1
+    assert box.wait_until_drained(timeout=10)
+    box.stop()
+    assert box.counts() == {PENDING: 0, SENDING: 0, SENT: 3, DEAD: 0}
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs SIGKILL")
+def test_messages_survive_a_killed_sender(db_path, monkeypatch):
+    messages = 1000
+    with mock_infobip_server(delay=0.02) as infobip:
+        monkeypatch.setenv("INFOBIP_SMS_URL", f"{infobip.url}/sms/2/text/advanced")
+        env = {**os.environ, "LOG_LEVEL": "WARNING"}
+        child = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "benchmarks", "bench_sms_outbox.py"), "--child",
+             "--db", db_path, "--messages", str(messages), "--workers", "2", "--batch", "20"],
+            env=env,
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while infobip.stats["destinations"] < 100:
+                assert child.poll() is None and time.monotonic() < deadline, "sender never started"
+                time.sleep(0.01)
+        finally:
+            child.send_signal(signal.SIGKILL)
+            child.wait()
+        assert infobip.stats["destinations"] < messages
+
+        alerts = MVP.AlertSystem(prediction_engine=NO_ENGINE, rate_limit=0)
+        box = outbox(alerts.post_infobip_once, db_path, batch_size=20)
+        box.start()
+        assert box.wait_until_drained(timeout=30)
+        box.stop()
+        alerts.close()
+    assert box.counts()[SENT] == messages
+    assert sorted(infobip.delivered) == sorted(f"bench-{i}" for i in range(messages))
+    assert infobip.stats["duplicates"] <= 2 * 20  # At most what was in flight at the kill
+
+
+def test_worker_recovers_from_a_failed_outcome_write(db_path):
+    send = FakeInfobip()
+    box = outbox(send, db_path, workers=1, lease_seconds=0.2)
+    queue(box, 5)
+    conn = box._connect()
+    conn.execute(
+        "CREATE TRIGGER reject_sent BEFORE UPDATE ON sms_outbox WHEN NEW.status = 'sent' "
+        "BEGIN SELECT RAISE(ABORT, 'disk I/O error'); END"
+    )
+    box.start()
+    deadline = time.monotonic() + 5
+    while send.calls < 2:  # Sent, failed to record, sent again after the lease
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    conn.execute("DROP TRIGGER reject_sent")
+    conn.close()
+    assert box.wait_until_drained(timeout=10)
+    box.stop()
+    assert box.counts()[SENT] == 5
@@ -0,0 +1,72 @@
+import os
+import time
+
+import pytest
+
+import server
+from subscribers import SubscriberRegistry
+from tests.conftest import http_json
+
+
+@pytest.mark.parametrize("quiet_hours", [(-1, 5), (22, 24), (0, -1)])
+def test_quiet_hours_outside_the_day_are_rejected(quiet_hours):
+    registry = SubscriberRegistry()
+    with pytest.raises(ValueError):
+        registry.subscribe("+263771234567", ["Ridgeview"], quiet_hours)
+    assert len(registry) == 0
+
+
+def test_quiet_hours_are_applied():
+    registry = SubscriberRegistry()
+    registry.subscribe("+263771234567", ["Ridgeview"], (22, 6))
+    registry.subscribe("+263771234568", ["Ridgeview"])
+    assert registry.recipients("Ridgeview", hour=23) == ["+263771234568"]
+    assert len(registry.recipients("Ridgeview", hour=12)) == 2
+
+
+def test_index_is_rebuilt_when_locations_are_reloaded(engine, data_dir):
+    registry = SubscriberRegistry(resolve_area=engine.cluster_area)
+    engine.locations_listeners.append(registry.load)
+    registry.subscribe("+263771234567", ["Zengeza"])
+    assert registry.recipients("Chitungwiza Region") == []
+
+    locations = data_dir / "locations.txt"
+    with open(locations, "a") as f:
+        f.write("\n\nChitungwiza Region\nZengeza\n")
+    mtime = os.path.getmtime(locations) + 10
+    os.utime(locations, (mtime, mtime))
+    version = registry.version
+    assert engine.reload_if_changed()
+
+    assert registry.version > version
+    assert registry.recipients("Chitungwiza Region") == ["+263771234567"]
+    assert registry.recipients("Zengeza") == ["+263771234567"]
+
+
+def test_subscribe_and_unsubscribe_over_http(live_server):
+    body = {"phone_number": "+263771234567", "locations": ["Ridgeview"], "quiet_hours": [22, 6]}
+    assert http_json(f"{live_server}/subscribe", body)[0] == 200
+    assert http_json(f"{live_server}/unsubscribe", {"phone_number": "+263771234567"})[0] == 200
+    assert http_json(f"{live_server}/unsubscribe", {"phone_number": "+263771234567"})[0] == 404
+
+
+@pytest.mark.parametrize(
+    "path, body",
+    [
+        ("/subscribe", ["+263771234567"]),
+        ("/subscribe", {"phone_number": "+263771234567", "locations": ["Ridgeview"], "quiet_hours": [-1, 5]}),
+        ("/subscribe", {"phone_number": "0771234567", "locations": ["Ridgeview"]}),
+        ("/unsubscribe", ["+263771234567"]),
+        ("/unsubscribe", {"phone_number": "not a number"}),
+    ],
+)
+def test_bad_subscription_requests_are_400(live_server, path, body):
+    assert http_json(f"{live_server}{path}", body)[0] == 400
+
+
+@pytest.mark.parametrize("method", ["subscribe", "unsubscribe"])
+def test_subscription_timeouts_are_503(live_server, monkeypatch, method):
+    monkeypatch.setattr(server, "PREDICTION_TIMEOUT", 0.05)
+    monkeypatch.setattr(server.app.state.subscribers, method, lambda *args: time.sleep(0.5))
+    body = {"phone_number": "+263771234567", "locations": ["Ridgeview"]}
+    assert http_json(f"{live_server}/{method}", body)[0] == 503
@@ -0,0 +1,92 @@
+import datetime
+import os
+
+import pandas as pd
+import pytest
+
+from bench_zra_backfill import STATIONS, write_site
+from mock_servers import static_fixture_server
+from zra_backfill import ZraBackfill, date_range
+
+START, END = datetime.date(2024, 1, 1), datetime.date(2024, 3, 31)
+
+
+@pytest.fixture
+def site(tmp_path):
+    site_dir = str(tmp_path / "site")
+    expected = write_site(site_dir, date_range(START, END))
+    with static_fixture_server(site_dir) as server:
+        server.dir = site_dir
+        server.template = server.url + "/lake-levels/{date}.html"
+        server.expected = expected
+        yield server
+
+
+def backfill(tmp_path, site, **options):
+    options.setdefault("chunk_days", 30)
+    return ZraBackfill(str(tmp_path / "data"), site.template, backoff_base=0, **options)
+
+
+def stored_levels(backfill):
+    stored = backfill.store.load()
+    return dict(zip(stored["date"].dt.date, stored["level"]))
+
+
+def station_rows(backfill):
+    return pd.read_csv(backfill.stations_file, parse_dates=["date"])
+
+
+def test_backfill_loads_every_page(tmp_path, site):
+    summary = backfill(tmp_path, site).run(START, END)
+    assert summary["completed"] and summary["pages"] == len(site.expected)
+    assert stored_levels(backfill(tmp_path, site)) == site.expected
+    assert len(station_rows(backfill(tmp_path, site))) == len(site.expected) * len(STATIONS)
+
+
+def test_rewritten_dates_replace_station_rows(tmp_path, site):
+    first = backfill(tmp_path, site)
+    first.run(START, END)
+    # As after a crash between writing a chunk and checkpointing it
+    os.remove(first.checkpoint_file)
+    assert backfill(tmp_path, site).run(START, END)["completed"]
+    rows = station_rows(first)
+    assert len(rows) == len(site.expected) * len(STATIONS)
+    assert not rows.duplicated(subset=["date", "station"]).any()
+    assert stored_levels(first) == site.expected
+
+
+def test_page_without_station_rows_is_retried(tmp_path, site):
+    broken = next(iter(site.expected))
+    page = os.path.join(site.dir, "lake-levels", f"{broken.isoformat()}.html")
+    with open(page) as f:
+        content = f.read()
+    with open(page, "w") as f:
+        f.write("<html><body>Down for maintenance</body></html>")
+
+    summary = backfill(tmp_path, site, max_retries=0).run(START, END)
+    assert summary["failed"] == 1 and not summary["completed"]
+    assert broken not in stored_levels(backfill(tmp_path, site))
+
+    with open(page, "w") as f:
+        f.write(content)
+    summary = backfill(tmp_path, site).run(START, END)
+    assert summary == {"pages": 1, "kariba_rows": 1, "failed": 0, "completed": True}
+    assert stored_levels(backfill(tmp_path, site)) == site.expected
+
+
+def test_unreadable_reading_does_not_replace_a_stored_one(tmp_path, site):
+    first = backfill(tmp_path, site)
+    first.run(START, END)
+    date = next(iter(site.expected))
+    page = os.path.join(site.dir, "lake-levels", f"{date.isoformat()}.html")
+    with open(page) as f:
+        content = f.read()
+    with open(page, "w") as f:
+        f.write(content.replace(f">{site.expected[date]}<", ">n/a<"))
+    os.remove(first.checkpoint_file)
+
+    assert backfill(tmp_path, site).run(START, END)["completed"]
+    assert stored_levels(first) == site.expected
+    rows = station_rows(first)
+    assert not rows[["level", "percent_full"]].isna().any().any()
+    assert len(rows) == len(site.expected) * len(STATIONS)
@@ -0,0 +1,118 @@
+import pytest
+import requests
+
+from zra_client import (
+    FETCHED,
+    NOT_MODIFIED,
+    UNCHANGED,
+    ZraClient,
+    ZraReading,
+    extract_row7,
+    extract_row7_soup,
+)
+
+URL = "https://zra.example/lake-levels"
+
+
+def page(level, percent, row="row_7"):
+    return (
+        f'<html><body><table><tr><td class="{row} col_0">Kariba</td>'
+        f'<td class="{row} col_1"> <b>{level}</b> </td>'
+        f'<td class="{row} col_2">{percent}&nbsp;%</td></tr></table></body></html>'
+    ).encode()
+
+
+class StubResponse:
+    def __init__(self, status_code=200, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(f"HTTP {self.status_code}")
+
+
+class StubSession:
+    """Answers each get() with the next queued response and records its headers."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append((url, dict(headers or {})))
+        return self.responses.pop(0)
+
+
+def test_extract_row7_reads_the_kariba_cells():
+    assert extract_row7(page("477.12", "40.5")) == ZraReading("477.12", "40.5\xa0%")
+    assert extract_row7(page("477.12", "40.5").decode()) == ZraReading("477.12", "40.5\xa0%")
+    assert extract_row7(page("471.0", "80", row="row_1")) is None
+
+
+def test_soup_fallback_reads_markup_the_scan_misses():
+    content = page("477.12", "40.5").replace(b'"row_7 ', b'"row_7  ')
+    assert extract_row7(content) is None
+    assert extract_row7_soup(content) == ZraReading("477.12", "40.5\xa0%")
+
+
+def test_validators_are_sent_and_304_reuses_the_reading():
+    session = StubSession(
+        StubResponse(
+            200,
+            page("477.12", "40.5"),
+            {"ETag": '"v1"', "Last-Modified": "Mon, 02 Mar 2026 06:00:00 GMT"},
+        ),
+        StubResponse(304),
+    )
+    client = ZraClient(session=session)
+    outcome, reading = client.fetch(URL)
+    assert outcome == FETCHED and reading.level_text == "477.12"
+    assert session.requests[0] == (URL, {})
+
+    assert client.fetch(URL) == (NOT_MODIFIED, reading)
+    assert session.requests[1][1] == {
+        "If-None-Match": '"v1"',
+        "If-Modified-Since": "Mon, 02 Mar 2026 06:00:00 GMT",
+    }
+    assert client.outcomes == {FETCHED: 1, NOT_MODIFIED: 1, UNCHANGED: 0}
+
+
+def test_identical_body_is_not_parsed_again(monkeypatch):
+    session = StubSession(
+        StubResponse(200, page("477.12", "40.5")),
+        StubResponse(200, page("477.12", "40.5")),
+        StubResponse(200, page("477.30", "41.0")),
+    )
+    client = ZraClient(session=session)
+    _, reading = client.fetch(URL)
+    monkeypatch.setattr("zra_client.extract_row7", lambda content: pytest.fail("page parsed again"))
+    assert client.fetch(URL) == (UNCHANGED, reading)
+    monkeypatch.undo()
+    outcome, reading = client.fetch(URL)
+    assert outcome == FETCHED and reading.level_text == "477.30"
+    assert session.requests[1][1] == {}  # No validators were offered
+
+
+def test_page_without_kariba_row_is_not_cached():
+    session = StubSession(
+        StubResponse(200, b"<html>maintenance</html>"), StubResponse(200, page("477.12", "40.5"))
+    )
+    client = ZraClient(session=session)
+    assert client.fetch(URL) == (FETCHED, None)
+    assert client.fetch(URL)[1].level_text == "477.12"
+
+
+def test_error_status_raises_and_new_url_resets_validators():
+    session = StubSession(
+        StubResponse(200, page("477.12", "40.5"), {"ETag": '"v1"'}),
+        StubResponse(200, page("477.12", "40.5")),
+        StubResponse(503),
+    )
+    client = ZraClient(session=session)
+    client.fetch(URL)
+    client.fetch(URL + "?mirror=1")
+    assert session.requests[1][1] == {}
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.fetch(URL + "?mirror=1")
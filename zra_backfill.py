@@ -0,0 +1,294 @@
+# Historical ZRA hydrology backfill #
+# Crawls a range of daily ZRA lake-level pages and bulk-loads them.
+#
+# Dates are processed in chunks. Each chunk's pages are fetched in parallel
+# over one pooled session with at most ``concurrency`` requests in flight,
+# every station row is read with the targeted cell scan from zra_client, and
+# the chunk is written in one go: Kariba readings into the Kariba store,
+# every station into hydrology_stations.csv, which keeps one row per date and
+# station so a rerun of the same dates replaces them. After each chunk a JSON
+# checkpoint records how far the crawl got, so an interrupted run resumes
+# where it stopped; dates that kept failing are listed there and retried on
+# the next run.
+#
+# The page for a date is found through a URL template with a {date}
+# placeholder (YYYY-MM-DD), so the crawl can be pointed at a local fixture
+# site or a mirror.
+#
+#   python zra_backfill.py --start 2015-01-01 --end 2024-12-31 --concurrency 16
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+
+from kariba_store import open_kariba_store
+from zra_client import extract_stations
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_URL_TEMPLATE = os.environ.get(
+    "ZRA_HISTORY_URL", "https://www.zambezira.org/hydrology/lake-levels/1000?date={date}"
+)
+STATION_COLUMNS = ["date", "station", "level", "percent_full"]
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def _number(text):
+    try:
+        return float(str(text).replace("%", "").replace(",", "").strip())
+    except ValueError:
+        return float("nan")
+
+
+def date_range(start, end):
+    """Every date from start to end, inclusive."""
+    return [start + datetime.timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+class ZraBackfill:
+    """Parallel, resumable crawl of historical ZRA lake-level pages."""
+
+    def __init__(
+        self,
+        data_dir="data",
+        url_template=DEFAULT_URL_TEMPLATE,
+        store_backend="csv",
+        concurrency=8,
+        chunk_days=90,
+        max_retries=2,
+        backoff_base=0.5,
+        timeout=20,
+        kariba_station="Kariba",
+    ):
+        """
+        Initializes the ZraBackfill.
+
+        Args:
+            data_dir (str, optional): Directory of the Kariba store and the
+                station file. Defaults to "data".
+            url_template (str, optional): Page URL with a {date} placeholder.
+                Defaults to the ZRA_HISTORY_URL environment variable.
+            store_backend (str, optional): Kariba store backend. Defaults to "csv".
+            concurrency (int, optional): Most requests in flight. Defaults to 8.
+            chunk_days (int, optional): Days fetched and written per checkpoint. Defaults to 90.
+            max_retries (int, optional): Retries for a page that failed with
+                a 429/5xx or a connection error. Defaults to 2.
+            backoff_base (float, optional): First retry delay in seconds,
+                doubled on each further retry. Defaults to 0.5.
+            timeout (float, optional): Seconds per request. Defaults to 20.
+            kariba_station (str, optional): Station name whose rows go into
+                the Kariba store. Defaults to "Kariba".
+        """
+        self.data_dir = data_dir
+        self.url_template = url_template
+        self.concurrency = concurrency
+        self.chunk_days = chunk_days
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.timeout = timeout
+        self.kariba_station = kariba_station.lower()
+        if not os.path.exists(data_dir):
+            os.makedirs(data_dir)
+        self.store = open_kariba_store(data_dir, store_backend)
+        self.stations_file = os.path.join(data_dir, "hydrology_stations.csv")
+        self.checkpoint_file = os.path.join(data_dir, "zra_backfill.json")
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=max(1, concurrency)
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        """Stops the crawl after the chunk in progress has been written."""
+        self._cancel.set()
+
+    def fetch_page(self, date):
+        """
+        Fetches and parses one day's page.
+
+        Returns:
+            tuple: (date, stations, error). ``stations`` is a list of
+            StationReading, empty when the site has no page for the date;
+            ``error`` is set when the page could not be fetched or had no
+            station rows.
+        """
+        url = self.url_template.format(date=date.isoformat())
+        error = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                if response.status_code == 404:
+                    return date, [], None
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    stations = extract_stations(response.content)
+                    if stations:
+                        return date, stations, None
+                    # A maintenance or truncated page, not a day without a bulletin
+                    error = "no station rows on the page"
+                else:
+                    error = f"HTTP {response.status_code}"
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                error = str(e)
+            except requests.exceptions.RequestException as e:
+                return date, [], str(e)
+            if attempt < self.max_retries:
+                time.sleep(self.backoff_base * 2 ** attempt)
+        return date, [], error
+
+    def load_checkpoint(self, start, end):
+        """Returns the saved checkpoint for this crawl, or None if there is none that matches."""
+        try:
+            with open(self.checkpoint_file) as f:
+                checkpoint = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if (
+            checkpoint.get("url_template") != self.url_template
+            or checkpoint.get("start") != start.isoformat()
+            or checkpoint.get("end") != end.isoformat()
+        ):
+            logger.info("Ignoring a checkpoint from a different backfill.")
+            return None
+        return checkpoint
+
+    def save_checkpoint(self, checkpoint):
+        """Writes the checkpoint atomically."""
+        temp = self.checkpoint_file + ".tmp"
+        with open(temp, "w") as f:
+            json.dump(checkpoint, f, indent=1)
+        os.replace(temp, self.checkpoint_file)
+
+    def write_chunk(self, results):
+        """
+        Writes one chunk of parsed pages: Kariba rows to the store, every station to the CSV.
+
+        A (date, station) already in the CSV is replaced, so dates written
+        again after a crash or a retry are not duplicated. Rows whose level or
+        percent is not a number are left out, so they never replace a reading.
+        """
+        rows = [
+            (pd.Timestamp(date), reading.station, _number(reading.level_text), _number(reading.percent_text))
+            for date, stations, _ in results
+            for reading in stations
+        ]
+        if not rows:
+            return 0
+        frame = pd.DataFrame(rows, columns=STATION_COLUMNS)
+        readable = frame[["level", "percent_full"]].notna().all(axis=1)
+        if not readable.all():
+            logger.warning(f"Skipping {(~readable).sum()} station rows without a numeric level and percent")
+            frame = frame[readable]
+        kariba = frame[frame["station"].str.lower() == self.kariba_station]
+        if not kariba.empty:
+            self.store.upsert(kariba[["date", "level", "percent_full"]])
+        if os.path.exists(self.stations_file):
+            existing = pd.read_csv(self.stations_file, parse_dates=["date"])
+            frame = pd.concat([existing, frame], ignore_index=True)
+        frame = frame.drop_duplicates(subset=["date", "station"], keep="last")
+        temp = self.stations_file + ".tmp"
+        frame.sort_values("date", kind="stable").to_csv(temp, index=False, date_format="%Y-%m-%d")
+        os.replace(temp, self.stations_file)
+        return len(kariba)
+
+    def run(self, start, end):
+        """
+        Backfills every date from start to end, resuming from a matching checkpoint.
+
+        Args:
+            start (datetime.date): First date.
+            end (datetime.date): Last date.
+
+        Returns:
+            dict: Counts of ``pages`` fetched, ``kariba_rows`` written and dates
+            that ``failed``, and whether every date is now ``completed``.
+        """
+        self._cancel.clear()
+        checkpoint = self.load_checkpoint(start, end) or {
+            "url_template": self.url_template,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "through": None,
+            "failed": [],
+        }
+        # Dates that failed last time first, then wherever the crawl stopped
+        retry = checkpoint["failed"]
+        dates = [datetime.date.fromisoformat(value) for value in retry]
+        resume = start
+        if checkpoint["through"]:
+            resume = datetime.date.fromisoformat(checkpoint["through"]) + datetime.timedelta(days=1)
+            logger.info(f"Resuming ZRA backfill from {resume} ({len(retry)} dates to retry)")
+        dates += date_range(resume, end) if resume <= end else []
+
+        failed, pages, kariba_rows = [], 0, 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="zra-backfill") as pool:
+            for offset in range(0, len(dates), self.chunk_days):
+                if self._cancel.is_set():
+                    break
+                chunk = dates[offset:offset + self.chunk_days]
+                results = list(pool.map(self.fetch_page, chunk))
+                kariba_rows += self.write_chunk(results)
+                pages += sum(1 for _, stations, _ in results if stations)
+                failed += [date.isoformat() for date, _, error in results if error]
+                newest = max(chunk).isoformat()
+                if checkpoint["through"] is None or newest > checkpoint["through"]:
+                    checkpoint["through"] = newest
+                # Earlier failures not retried yet stay listed
+                checkpoint["failed"] = failed + retry[offset + len(chunk):]
+                self.save_checkpoint(checkpoint)
+                logger.info(
+                    f"Backfilled through {checkpoint['through']}: {kariba_rows} Kariba rows, "
+                    f"{len(failed)} failed dates, {time.perf_counter() - started:.1f}s"
+                )
+
+        completed = (
+            not self._cancel.is_set()
+            and checkpoint["through"] == end.isoformat()
+            and not checkpoint["failed"]
+        )
+        return {
+            "pages": pages,
+            "kariba_rows": kariba_rows,
+            "failed": len(checkpoint["failed"]),
+            "completed": completed,
+        }
+
+
+def main():
+    from log_config import configure_logging
+
+    parser = argparse.ArgumentParser(description="Backfill Kariba and station levels from ZRA.")
+    parser.add_argument("--start", required=True, type=datetime.date.fromisoformat, help="YYYY-MM-DD")
+    parser.add_argument("--end", type=datetime.date.fromisoformat, default=datetime.date.today())
+    parser.add_argument("--data-dir", default="data")
+    parser.add_argument("--url-template", default=DEFAULT_URL_TEMPLATE)
+    parser.add_argument("--store-backend", default=os.environ.get("KARIBA_STORE_BACKEND", "csv"))
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--chunk-days", type=int, default=90)
+    args = parser.parse_args()
+    configure_logging()
+
+    backfill = ZraBackfill(
+        args.data_dir,
+        args.url_template,
+        args.store_backend,
+        concurrency=args.concurrency,
+        chunk_days=args.chunk_days,
+    )
+    summary = backfill.run(args.start, args.end)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
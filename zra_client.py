@@ -0,0 +1,179 @@
+# ZRA lake-level client #
+# Fetches and parses the Kariba row of the ZRA lake-levels page.
+#
+# One pooled keep-alive session is reused for every fetch, and each request
+# carries the validators of the last response (If-None-Match /
+# If-Modified-Since). A 304, or a 200 whose body hashes the same as last
+# time, reuses the last parsed reading without touching the HTML. New pages
+# are read with a targeted scan for the two row_7 cells; only if that finds
+# nothing is the page handed to BeautifulSoup (lxml when it is installed).
+
+import hashlib
+import html
+import logging
+import re
+from collections import namedtuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+ZraReading = namedtuple("ZraReading", ["level_text", "percent_text"])
+
+# Outcomes of ZraClient.fetch()
+FETCHED, NOT_MODIFIED, UNCHANGED = "fetched", "not_modified", "unchanged"
+
+_ROW7_CELL = re.compile(
+    r"""<td\b[^>]*\bclass\s*=\s*["']row_7 (col_[12])["'][^>]*>(.*?)</td\s*>""",
+    re.IGNORECASE | re.DOTALL,
+)
+_TAG = re.compile(r"<[^>]+>")
+
+try:
+    import lxml  # noqa: F401
+
+    SOUP_PARSER = "lxml"
+except ImportError:
+    SOUP_PARSER = "html.parser"
+
+
+def _cell_text(markup):
+    return html.unescape(_TAG.sub("", markup)).strip()
+
+
+def extract_row7(content):
+    """
+    Finds the Kariba level and percent-full cells (row_7, columns 1 and 2).
+
+    Args:
+        content (bytes or str): The lake-levels page.
+
+    Returns:
+        ZraReading: The two cells' text (the percent still has its "%"), or
+        None if either cell is missing.
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8", errors="replace")
+    cells = {}
+    for match in _ROW7_CELL.finditer(content):
+        cells.setdefault(match.group(1).lower(), _cell_text(match.group(2)))
+        if len(cells) == 2:
+            return ZraReading(cells["col_1"], cells["col_2"])
+    return None
+
+
+_ROW_CELL = re.compile(
+    r"""<td\b[^>]*\bclass\s*=\s*["']row_(\d+) col_([012])["'][^>]*>(.*?)</td\s*>""",
+    re.IGNORECASE | re.DOTALL,
+)
+
+StationReading = namedtuple("StationReading", ["station", "level_text", "percent_text"])
+
+
+def extract_stations(content):
+    """
+    Reads every station row of a lake-levels table (name, level and percent
+    in columns 0, 1 and 2 of each row_N).
+
+    Args:
+        content (bytes or str): The lake-levels page.
+
+    Returns:
+        list of StationReading: One per row that has a name, in page order.
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8", errors="replace")
+    rows = {}
+    for match in _ROW_CELL.finditer(content):
+        rows.setdefault(int(match.group(1)), {}).setdefault(
+            match.group(2), _cell_text(match.group(3))
+        )
+    return [
+        StationReading(cells["0"], cells.get("1", ""), cells.get("2", ""))
+        for _, cells in sorted(rows.items())
+        if cells.get("0")
+    ]
+
+
+def extract_row7_soup(content):
+    """Same as extract_row7, through BeautifulSoup; handles markup the scan does not."""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(content, SOUP_PARSER)
+    level_element = soup.find("td", class_="row_7 col_1")
+    percent_element = soup.find("td", class_="row_7 col_2")
+    if level_element is None or percent_element is None:
+        return None
+    return ZraReading(level_element.text.strip(), percent_element.text.strip())
+
+
+class ZraClient:
+    """Conditional, pooled fetches of the ZRA lake-levels page."""
+
+    def __init__(self, timeout=10, session=None):
+        """
+        Initializes the ZraClient.
+
+        Args:
+            timeout (float, optional): Seconds per request. Defaults to 10.
+            session (requests.Session, optional): Session to reuse. Defaults to a new one.
+        """
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.url = None
+        self.etag = None
+        self.last_modified = None
+        self.content_hash = None
+        self.reading = None
+        self.outcomes = {FETCHED: 0, NOT_MODIFIED: 0, UNCHANGED: 0}
+
+    def reset(self):
+        """Forgets the cached validators and reading, so the next fetch is unconditional."""
+        self.etag = self.last_modified = self.content_hash = self.reading = None
+
+    def fetch(self, url):
+        """
+        Fetches the page and returns the Kariba reading.
+
+        Args:
+            url (str): The lake-levels page.
+
+        Returns:
+            tuple: (outcome, reading). ``outcome`` is FETCHED for a newly parsed
+            page, NOT_MODIFIED for a 304 and UNCHANGED for an identical body;
+            ``reading`` is a ZraReading, or None if the page has no Kariba row.
+
+        Raises:
+            requests.exceptions.RequestException: If the request fails.
+        """
+        if url != self.url:
+            self.reset()
+            self.url = url
+        headers = {}
+        if self.reading is not None:
+            if self.etag:
+                headers["If-None-Match"] = self.etag
+            if self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified
+        response = self.session.get(url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and self.reading is not None:
+            self.outcomes[NOT_MODIFIED] += 1
+            return NOT_MODIFIED, self.reading
+        response.raise_for_status()
+
+        self.etag = response.headers.get("ETag")
+        self.last_modified = response.headers.get("Last-Modified")
+        content = response.content
+        content_hash = hashlib.blake2b(content, digest_size=16).digest()
+        if content_hash == self.content_hash and self.reading is not None:
+            self.outcomes[UNCHANGED] += 1
+            return UNCHANGED, self.reading
+
+        reading = extract_row7(content)
+        if reading is None:
+            logger.debug("row_7 scan found nothing on the ZRA page, falling back to %s", SOUP_PARSER)
+            reading = extract_row7_soup(content)
+        self.content_hash = content_hash if reading is not None else None
+        self.reading = reading
+        self.outcomes[FETCHED] += 1
+        return FETCHED, reading